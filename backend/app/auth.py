@@ -6,10 +6,11 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 import jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import JWT_ALGORITHM, JWT_SECRET
-from app.db import get_db
+from app import user_cache
+from app.db import get_async_db
 from app.models import User
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -44,7 +45,7 @@ def decode_token(token: str) -> str | None:
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials | None = Depends(security),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> User:
     """
     Dependência: extrai token do header Authorization e retorna o usuário.
@@ -63,7 +64,10 @@ async def get_current_user(
             detail="Token inválido ou expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await user_cache.get(user_id)
+    if user is None:
+        db_user = await db.get(User, user_id)
+        user = await user_cache.put(db_user) if db_user else None
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -38,6 +38,117 @@ STORAGE_DIR = BACKEND_DIR / "storage"
 UPLOADS_DIR = STORAGE_DIR / "uploads"
 OUTPUTS_DIR = STORAGE_DIR / "outputs"
 REPORTS_DIR = STORAGE_DIR / "reports"
+CACHE_DIR = STORAGE_DIR / "cache"
+
+# Onde ficam uploads, saídas e reports: "local" (as pastas acima, compartilhadas por API e worker) ou
+# "s3" (bucket S3 compatível; as pastas locais viram só cópias de trabalho de cada host).
+# S3_ENDPOINT_URL vazio = AWS; para MinIO/mock use a URL (endereçamento por caminho).
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_PREFIX = os.getenv("S3_PREFIX", "")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID", "")
+S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY", "")
+# Tamanho das partes do multipart (mínimo 5) e das leituras em paralelo; conexões no pool por processo
+S3_PART_SIZE_MB = int(os.getenv("S3_PART_SIZE_MB", "8"))
+S3_TRANSFER_CONCURRENCY = int(os.getenv("S3_TRANSFER_CONCURRENCY", "4"))
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "20"))
+
+# Engine de transformação: "vectorized" (coluna a coluna) ou "rowwise" (linha a linha, original)
+PROCESSING_ENGINE = os.getenv("PROCESSING_ENGINE", "vectorized")
+
+# Leitura de XLSX: "auto" (calamine se instalado, senão openpyxl read_only), "calamine" ou "openpyxl"
+XLSX_ENGINE = os.getenv("XLSX_ENGINE", "auto")
+
+# CSV: quantos bytes do começo do arquivo são usados para detectar encoding, BOM, separador e aspas
+CSV_SNIFF_BYTES = int(os.getenv("CSV_SNIFF_BYTES", str(64 * 1024)))
+
+# Tamanho do cache LRU de telefones normalizados, por processo (0 desativa)
+PHONE_CACHE_SIZE = int(os.getenv("PHONE_CACHE_SIZE", "100000"))
+
+# Modo streaming: arquivos a partir deste tamanho são lidos/gravados em blocos (0 desativa)
+STREAMING_THRESHOLD_BYTES = int(os.getenv("STREAMING_THRESHOLD_BYTES", str(5 * 1024 * 1024)))
+STREAMING_CHUNK_ROWS = int(os.getenv("STREAMING_CHUNK_ROWS", "50000"))
+
+# Modo paralelo: divide o arquivo em faixas de linhas e converte num pool de processos.
+# PARALLEL_WORKERS=0 usa um processo por núcleo (no pool de workers: núcleos / WORKER_POOL_SIZE por job,
+# no mínimo 1); 1 desativa; valor explícito vale por job (total = WORKER_POOL_SIZE x PARALLEL_WORKERS). Abaixo de PARALLEL_MIN_ROWS linhas não há pool
+# (em streaming: as primeiras PARALLEL_MIN_ROWS são convertidas no próprio processo).
+PARALLEL_WORKERS = int(os.getenv("PARALLEL_WORKERS", "0"))
+PARALLEL_MIN_ROWS = int(os.getenv("PARALLEL_MIN_ROWS", "100000"))
+PARALLEL_CHUNK_ROWS = int(os.getenv("PARALLEL_CHUNK_ROWS", "25000"))
+
+# Tamanho máximo de upload (MB); o upload é gravado em blocos e abortado ao passar do limite
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "10"))
+
+# Cache de resultados por hash do upload: uploads idênticos reaproveitam o resultado.
+# RESULT_CACHE_MAX_MB limita os bytes que só a pasta storage/cache ocupa (eviction LRU): arquivos que ainda
+# são hardlinks dos arquivos de um job não contam, porque remover a entrada não liberaria disco.
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESULT_CACHE_MAX_MB = int(os.getenv("RESULT_CACHE_MAX_MB", "1024"))
+
+# Cache dos usuários autenticados: TTL curto, limite de entradas e backend
+# "memory" (só no processo) ou "redis" (memória + Redis compartilhado). TTL 0 desativa.
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+USER_CACHE_BACKEND = os.getenv("USER_CACHE_BACKEND", "memory")
+
+# Pool de workers (python -m app.worker_pool): processos filhos (0 = um por núcleo),
+# tempo máximo para terminar os jobs em andamento no SIGTERM e reciclagem após N jobs (0 = nunca)
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", "0"))
+WORKER_DRAIN_TIMEOUT_SECONDS = int(os.getenv("WORKER_DRAIN_TIMEOUT_SECONDS", "600"))
+WORKER_MAX_JOBS = int(os.getenv("WORKER_MAX_JOBS", "0"))
+# Workers do pool reservados para a fila fast (jobs pequenos nunca esperam atrás de bulk)
+WORKER_FAST_RESERVED = int(os.getenv("WORKER_FAST_RESERVED", "1"))
+# Workers do pool que só atendem a fila delivery (com GHL_DELIVERY_ENABLED): são os únicos que pegam
+# entregas, então entregas lentas nunca ocupam os workers de conversão
+WORKER_DELIVERY_RESERVED = int(os.getenv("WORKER_DELIVERY_RESERVED", "1"))
+
+# Roteamento: arquivos até FAST_QUEUE_MAX_BYTES e FAST_QUEUE_MAX_ROWS (estimadas) vão para a fila
+# fast, o resto para bulk. MAX_INFLIGHT_PER_USER limita jobs simultâneos por usuário (0 = sem limite);
+# vagas presas por um worker que morreu são liberadas após INFLIGHT_STALE_SECONDS, contados do início da
+# execução do job (antes dele, da entrada na fila RQ).
+FAST_QUEUE_MAX_BYTES = int(os.getenv("FAST_QUEUE_MAX_BYTES", str(1024 * 1024)))
+FAST_QUEUE_MAX_ROWS = int(os.getenv("FAST_QUEUE_MAX_ROWS", "5000"))
+MAX_INFLIGHT_PER_USER = int(os.getenv("MAX_INFLIGHT_PER_USER", "2"))
+INFLIGHT_STALE_SECONDS = int(os.getenv("INFLIGHT_STALE_SECONDS", "3600"))
+
+# Intermediário colunar (Arrow IPC, requer pyarrow) do upload já lido, ao lado do arquivo original:
+# retries e re-execuções leem dele em vez de reprocessar o XLSX/CSV
+INTERMEDIATE_CACHE_ENABLED = os.getenv("INTERMEDIATE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Deduplicação de contatos no arquivo (mesmo email ou telefone E.164 viram uma linha): desligada por padrão
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Índice de linhas do CSV de saída (GET /jobs/{id}/rows): guarda a posição de uma a cada N linhas.
+# Menor = páginas mais rápidas e índice maior (8 bytes por entrada)
+ROW_INDEX_STRIDE = int(os.getenv("ROW_INDEX_STRIDE", "100"))
+
+# Variantes comprimidas do CSV de saída gravadas pelo worker (.gz e, com zstandard instalado, .zst),
+# servidas no download conforme o Accept-Encoding
+PRECOMPRESS_OUTPUTS = os.getenv("PRECOMPRESS_OUTPUTS", "true").lower() in ("1", "true", "yes")
+OUTPUT_GZIP_LEVEL = int(os.getenv("OUTPUT_GZIP_LEVEL", "6"))
+OUTPUT_ZSTD_LEVEL = int(os.getenv("OUTPUT_ZSTD_LEVEL", "3"))
+
+# Entrega dos contatos convertidos numa API de contatos compatível com GHL (app.delivery), depois
+# do processamento. Lotes de GHL_BATCH_SIZE contatos, até GHL_CONCURRENCY requisições simultâneas e no
+# máximo GHL_RATE_PER_SECOND requisições/s (rajada de GHL_RATE_BURST; 0 = sem limite). 429/5xx são
+# repetidos até GHL_MAX_RETRIES vezes com backoff; lotes já aceitos ficam no checkpoint e não são reenviados.
+GHL_DELIVERY_ENABLED = os.getenv("GHL_DELIVERY_ENABLED", "false").lower() in ("1", "true", "yes")
+GHL_API_URL = os.getenv("GHL_API_URL", "http://localhost:8700")
+GHL_API_TOKEN = os.getenv("GHL_API_TOKEN", "")
+GHL_BATCH_PATH = os.getenv("GHL_BATCH_PATH", "/contacts/batch")
+GHL_BATCH_SIZE = int(os.getenv("GHL_BATCH_SIZE", "100"))
+GHL_CONCURRENCY = int(os.getenv("GHL_CONCURRENCY", "4"))
+GHL_RATE_PER_SECOND = float(os.getenv("GHL_RATE_PER_SECOND", "10"))
+GHL_RATE_BURST = int(os.getenv("GHL_RATE_BURST", "10"))
+GHL_MAX_RETRIES = int(os.getenv("GHL_MAX_RETRIES", "6"))
+GHL_TIMEOUT_SECONDS = float(os.getenv("GHL_TIMEOUT_SECONDS", "30"))
+
+# Métricas Prometheus: GET /metrics na API e servidor próprio no worker (porta 0 desativa)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9100"))
 
 
 def get_masked_database_url() -> str:
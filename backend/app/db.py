@@ -1,10 +1,17 @@
 # Conexão com o Postgres (banco de dados)
 # Usa SQLAlchemy para falar com o banco e psycopg3 como driver
+import json
 import re
+import time
+from functools import partial
+
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app.config import DATABASE_URL
+from app.metrics import observe_db_checkout
 
 
 def _mask_url(url: str) -> str:
@@ -21,10 +28,70 @@ _db_url = DATABASE_URL
 if _db_url.startswith("postgresql://") and "+" not in _db_url.split("?")[0]:
     _db_url = _db_url.replace("postgresql://", "postgresql+psycopg://", 1)
 
-engine = create_engine(_db_url)
+
+class _TimedQueuePool(QueuePool):
+    """QueuePool que mede a espera por uma conexão livre (métrica flowbase_db_pool_checkout_seconds)."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            observe_db_checkout("sync", start)
+
+
+class _TimedAsyncPool(AsyncAdaptedQueuePool):
+    """Versão assíncrona do _TimedQueuePool (engine da API, métrica com engine="async")."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            observe_db_checkout("async", start)
+
+
+# Colunas JSON (report e preview do job) gravadas compactas, sem espaços: o texto guardado é o que
+# GET /jobs/{id}/report e /preview devolvem
+json_dumps = partial(json.dumps, ensure_ascii=False, separators=(",", ":"))
+
+engine = create_engine(_db_url, poolclass=_TimedQueuePool, json_serializer=json_dumps)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Engine assíncrona (mesmo driver psycopg3, modo async) para as rotas da API:
+# a espera pelo banco não bloqueia o event loop do uvicorn.
+# expire_on_commit=False: depois do commit os atributos continuam acessíveis sem nova query.
+async_engine = create_async_engine(_db_url, poolclass=_TimedAsyncPool, json_serializer=json_dumps)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+# Alterações em tabelas que já existem (create_all só cria tabelas novas, não adiciona colunas).
+# Cada comando precisa ser idempotente: roda em todo startup.
+SCHEMA_UPGRADES = [
+    "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "CREATE INDEX IF NOT EXISTS ix_jobs_content_hash ON jobs (content_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_jobs_user_status_created ON jobs (user_id, status, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_jobs_user_created ON jobs (user_id, created_at, id)",
+    "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS queue_name VARCHAR(20)",
+    "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS row_estimate INTEGER",
+    "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS queued_at TIMESTAMP WITHOUT TIME ZONE",
+    "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS started_at TIMESTAMP WITHOUT TIME ZONE",
+    "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS column_mapping TEXT",
+    "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS delivery_status VARCHAR(20)",
+    "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS delivery_error TEXT",
+    "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS report JSON",
+    "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS preview JSON",
+    "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS results_etag VARCHAR(64)",
+]
+
+
+def upgrade_schema():
+    """Aplica SCHEMA_UPGRADES (usado no startup, depois do create_all)."""
+    with engine.begin() as conn:
+        for stmt in SCHEMA_UPGRADES:
+            conn.execute(text(stmt))
+
 
 def get_db():
     """Retorna uma sessão do banco. Usado nos endpoints que precisam ler/escrever."""
@@ -35,6 +102,12 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Retorna uma sessão assíncrona do banco. Usado nas rotas async (jobs e autenticação)."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def test_connection():
     """
     Testa a conexão com o Postgres e retorna current_database, current_user.
@@ -0,0 +1,167 @@
+# Deduplicação de contatos dentro do arquivo (DEDUP_ENABLED): linhas GHL com o mesmo email ou o mesmo
+# telefone E.164 viram uma só, na posição da primeira ocorrência, com Additional Emails, Additional
+# Phone Numbers, Tags e Notes unidos. Durante a conversão só guardamos hashes de 64 bits das chaves
+# (arrays NumPy, ~16 bytes por chave); depois o CSV gravado é relido em blocos e regravado sem as repetidas.
+import re
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+KEY_COLUMNS = ("Email", "Phone")
+# Telefones que não viraram E.164 ("sem telefone", "0000"...) não identificam ninguém
+_E164 = re.compile(r"^\+\d{8,15}$")
+
+# Coluna -> (separador para quebrar, separador para juntar) na união dos valores do grupo
+_UNION_COLUMNS = {
+    "Tags": (",", ", "),
+    "Notes": ("|", " | "),
+}
+# Coluna principal -> coluna adicional que recebe os demais valores do grupo
+_CONTACT_COLUMNS = {"Email": "Additional Emails", "Phone": "Additional Phone Numbers"}
+
+
+class DedupIndex:
+    """Hashes das chaves (emails e telefones) de cada linha de saída, acumulados bloco a bloco."""
+
+    def __init__(self):
+        self.rows = 0
+        self._keys: dict[str, list[tuple[np.ndarray, np.ndarray]]] = {col: [] for col in KEY_COLUMNS}
+
+    def add(self, ghl_df: pd.DataFrame) -> None:
+        """Indexa um bloco já convertido (as linhas seguem a numeração dos blocos anteriores)."""
+        for col in KEY_COLUMNS:
+            values = ghl_df[col].to_numpy(dtype=object)
+            present = np.flatnonzero(values != "")
+            if not len(present):
+                continue
+            cells = pd.Series(values[present], index=present, dtype=object)
+            # Uma célula pode ter vários valores ("a@x.com, b@x.com"): cada um é uma chave da linha
+            multi = cells.str.contains(",", regex=False)
+            parts = cells
+            if multi.any():
+                parts = pd.concat([cells[~multi], cells[multi].str.split(",").explode().str.strip()])
+            if col == "Phone":
+                parts = parts[parts.str.match(_E164)]
+            else:
+                parts = parts[parts != ""]
+            if parts.empty:
+                continue
+            hashes = pd.util.hash_array(parts.to_numpy(dtype=object), categorize=False)
+            self._keys[col].append((hashes, parts.index.to_numpy(dtype=np.int64) + self.rows))
+        self.rows += len(ghl_df)
+
+    def _shared_keys(self) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Por tipo de chave: (linhas ordenadas por chave, início de cada chave) só das chaves repetidas."""
+        shared = []
+        for parts in self._keys.values():
+            if not parts:
+                continue
+            hashes = np.concatenate([h for h, _ in parts])
+            rows = np.concatenate([r for _, r in parts])
+            order = np.argsort(hashes, kind="stable")
+            hashes, rows = hashes[order], rows[order]
+            key_id = np.cumsum(np.r_[True, hashes[1:] != hashes[:-1]]) - 1
+            repeated = np.bincount(key_id)[key_id] > 1
+            if not repeated.any():
+                continue
+            rows, key_id = rows[repeated], key_id[repeated]
+            shared.append((rows, np.flatnonzero(np.r_[True, key_id[1:] != key_id[:-1]])))
+        return shared
+
+    def representatives(self) -> np.ndarray:
+        """
+        Para cada linha, a primeira linha do seu grupo. Grupo = linhas ligadas por alguma chave em comum,
+        inclusive indiretamente (A e B com o mesmo email, B e C com o mesmo telefone). Propagação do menor
+        rótulo por chave + pointer jumping, tudo vetorizado: poucas iterações, tempo ~linear.
+        """
+        labels = np.arange(self.rows, dtype=np.int64)
+        shared = self._shared_keys()
+        self._keys = {col: [] for col in KEY_COLUMNS}
+        changed = bool(shared)
+        while changed:
+            changed = False
+            for rows, starts in shared:
+                current = labels[rows]
+                target = np.repeat(np.minimum.reduceat(current, starts), np.diff(np.r_[starts, len(rows)]))
+                lower = target < current
+                if lower.any():
+                    np.minimum.at(labels, rows[lower], target[lower])
+                    changed = True
+            # labels[i] <= i e aponta para uma linha do mesmo grupo: segue os ponteiros até estabilizar
+            while True:
+                jumped = labels[labels]
+                if np.array_equal(jumped, labels):
+                    break
+                labels = jumped
+        return labels
+
+
+def _read_chunks(path: Path, chunk_rows: int) -> Iterator[tuple[int, pd.DataFrame]]:
+    """(linha inicial, bloco) do CSV GHL gravado, com todas as células como string."""
+    start = 0
+    with pd.read_csv(path, dtype=object, na_filter=False, encoding="utf-8-sig", chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            chunk.index = np.arange(start, start + len(chunk))
+            yield start, chunk
+            start += len(chunk)
+
+
+def _union(values: pd.Series, split: str, join: str, exclude: pd.Series | None = None) -> pd.Series:
+    """Valores distintos de cada grupo (índice = grupo), na ordem em que aparecem, unidos por join."""
+    parts = values.str.split(split, regex=False).explode().str.strip()
+    frame = pd.DataFrame({"group": parts.index, "value": parts.to_numpy()})
+    frame = frame[frame["value"] != ""].drop_duplicates()
+    if exclude is not None:
+        seen = pd.DataFrame({"group": exclude.index, "value": exclude.to_numpy(), "_skip": True})
+        frame = frame.merge(seen, on=["group", "value"], how="left", sort=False)
+        frame = frame[frame["_skip"].isna()]
+    # groupby().agg(join) chamaria Python por grupo via pandas; aqui é um join por fatia já ordenada
+    frame = frame.sort_values("group", kind="stable")
+    groups = frame["group"].to_numpy()
+    values = frame["value"].to_numpy(dtype=object)
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if len(groups) else np.array([], dtype=np.int64)
+    ends = np.r_[starts[1:], len(groups)]
+    return pd.Series([join.join(values[s:e]) for s, e in zip(starts, ends)], index=groups[starts], dtype=object)
+
+
+def merge_groups(members: pd.DataFrame, groups: np.ndarray) -> pd.DataFrame:
+    """
+    Une as linhas de cada grupo (members em ordem de arquivo, groups = representante de cada linha).
+    Demais colunas: primeiro valor não vazio. Email/Phone: o primeiro não vazio; os outros emails/telefones
+    do grupo vão para Additional Emails/Additional Phone Numbers. Tags e Notes: união sem repetição.
+    """
+    members = members.set_axis(groups)
+    index = pd.Index(pd.unique(groups))
+    merged = {}
+    for col in members.columns:
+        if col in _CONTACT_COLUMNS.values() or col in _UNION_COLUMNS:
+            continue
+        merged[col] = members[col].where(members[col] != "").groupby(level=0, sort=False).first()
+    for col, extra_col in _CONTACT_COLUMNS.items():
+        primary = merged[col].dropna()
+        both = members[col].str.cat(members[extra_col], sep=",")
+        merged[extra_col] = _union(both, ",", ", ", exclude=primary.str.split(",").explode().str.strip())
+    for col, (split, join) in _UNION_COLUMNS.items():
+        merged[col] = _union(members[col], split, join)
+    return pd.DataFrame({col: merged[col].reindex(index).fillna("") for col in members.columns}, index=index)
+
+
+def iter_deduplicated(path: Path, representatives: np.ndarray, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Relê o CSV GHL gravado e gera os blocos sem as linhas repetidas; a primeira linha de cada grupo
+    sai com os valores unidos. Só as linhas de grupos com repetição ficam em memória.
+    """
+    duplicate = representatives != np.arange(len(representatives))
+    in_group = duplicate.copy()
+    in_group[representatives[duplicate]] = True
+    members = [chunk[in_group[chunk.index]] for _, chunk in _read_chunks(path, chunk_rows)]
+    members = pd.concat(members) if members else pd.DataFrame()
+    merged = merge_groups(members, representatives[members.index.to_numpy()])
+    for _, chunk in _read_chunks(path, chunk_rows):
+        chunk = chunk[~duplicate[chunk.index]]
+        heads = chunk.index.intersection(merged.index)
+        if len(heads):
+            chunk.loc[heads, merged.columns] = merged.loc[heads].to_numpy()
+        yield chunk.reset_index(drop=True)
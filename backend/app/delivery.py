@@ -0,0 +1,372 @@
+# Entrega dos contatos convertidos numa API de contatos compatível com GHL, depois do processamento
+# (GHL_DELIVERY_ENABLED). Roda como tarefa RQ na fila "delivery": lê o CSV de saída em blocos, monta
+# lotes de GHL_BATCH_SIZE contatos e envia com um cliente httpx assíncrono (pool de conexões, até
+# GHL_CONCURRENCY requisições em voo, token bucket de GHL_RATE_PER_SECOND). 429/5xx/erros de rede são
+# repetidos com backoff. Cada lote aceito é marcado num bitmap no Redis: se o worker cair, a próxima
+# execução pula os lotes já entregues. Para testar offline: python -m benchmarks.mock_ghl
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+import httpx
+import pandas as pd
+from redis import asyncio as aioredis
+
+from app import metrics, queue_rq, storage
+from app.config import (
+    GHL_API_TOKEN,
+    GHL_API_URL,
+    GHL_BATCH_PATH,
+    GHL_BATCH_SIZE,
+    GHL_CONCURRENCY,
+    GHL_MAX_RETRIES,
+    GHL_RATE_BURST,
+    GHL_RATE_PER_SECOND,
+    GHL_TIMEOUT_SECONDS,
+    REDIS_URL,
+)
+from app.db import SessionLocal
+from app.models import Job
+from app.queue_rq import redis_conn
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "flowbase:delivery:"
+# Checkpoint guardado por uma semana: dá tempo de retomar uma entrega interrompida
+TTL_SECONDS = 7 * 24 * 3600
+# Limite da tarefa RQ: entregas grandes com rate limit baixo levam horas
+JOB_TIMEOUT_SECONDS = 12 * 3600
+# Linhas lidas do CSV por vez (vários lotes por leitura)
+READ_CHUNK_ROWS = 10000
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_BACKOFF_SECONDS = 60
+# Entrega "running" sem nenhum lote confirmado nesse tempo: o worker morreu, pode ser retomada
+STALLED_SECONDS = 15 * 60
+
+_aioredis = aioredis.Redis.from_url(REDIS_URL)
+
+
+class DeliveryError(Exception):
+    """Lote recusado pela API ou tentativas esgotadas: a entrega para (e pode ser retomada)."""
+
+
+def _split(value: str) -> list[str]:
+    return [p.strip() for p in value.split(",") if p.strip()]
+
+
+def to_contact(row: dict) -> dict:
+    """Linha do CSV GHL -> contato no formato da API (campos vazios omitidos)."""
+    contact = {
+        "name": row.get("Full Name", ""),
+        "companyName": row.get("Company Name", ""),
+        "email": row.get("Email", ""),
+        "additionalEmails": _split(row.get("Additional Emails", "")),
+        "phone": row.get("Phone", ""),
+        "additionalPhones": _split(row.get("Additional Phone Numbers", "")),
+        "website": row.get("Website", ""),
+        "city": row.get("City", ""),
+        "state": row.get("State", ""),
+        "tags": _split(row.get("Tags", "")),
+        "notes": row.get("Notes", ""),
+        "source": row.get("Source", ""),
+    }
+    return {k: v for k, v in contact.items() if v}
+
+
+class Checkpoint:
+    """Lotes já aceitos pela API, em memória (benchmark). RedisCheckpoint persiste para retomar."""
+
+    def __init__(self, run: str | None = None, batch_size: int = GHL_BATCH_SIZE):
+        self.run = run or uuid.uuid4().hex
+        # Numeração dos lotes depende do tamanho: uma entrega retomada mantém o da primeira execução
+        self.batch_size = batch_size
+        self.done: set[int] = set()
+        self.rows_sent = 0
+
+    def is_done(self, batch_no: int) -> bool:
+        return batch_no in self.done
+
+    def mark_done(self, batch_no: int, rows: int) -> None:
+        self.done.add(batch_no)
+        self.rows_sent += rows
+
+    def set_total(self, rows_total: int) -> None:
+        pass
+
+
+class RedisCheckpoint(Checkpoint):
+    """
+    Checkpoint no Redis: hash com contadores + bitmap com um bit por lote (1 = entregue).
+    O run identifica a entrega: entra na Idempotency-Key, então um lote reenviado depois de uma
+    queda (enviado mas não marcado) é reconhecido como repetido pela API.
+    """
+
+    def __init__(self, job_id: str):
+        self.key = KEY_PREFIX + job_id
+        self.bits_key = self.key + ":batches"
+        data = {k.decode(): v.decode() for k, v in redis_conn.hgetall(self.key).items()}
+        super().__init__(data.get("run"), int(data.get("batch_size") or GHL_BATCH_SIZE))
+        if "run" not in data:
+            fields = {"run": self.run, "batch_size": self.batch_size, "rows_sent": 0, "batches_done": 0}
+            redis_conn.hset(self.key, mapping=fields)
+            redis_conn.expire(self.key, TTL_SECONDS)
+        self.rows_sent = int(data.get("rows_sent") or 0)
+        self._bitmap = redis_conn.get(self.bits_key) or b""
+
+    @classmethod
+    def reset(cls, job_id: str) -> None:
+        """Descarta o checkpoint (o resultado do job mudou: tudo precisa ser reenviado)."""
+        redis_conn.delete(KEY_PREFIX + job_id, KEY_PREFIX + job_id + ":batches")
+
+    def is_done(self, batch_no: int) -> bool:
+        byte = batch_no >> 3
+        # SETBIT numera do bit mais significativo de cada byte
+        if byte < len(self._bitmap) and self._bitmap[byte] >> (7 - (batch_no & 7)) & 1:
+            return True
+        return super().is_done(batch_no)
+
+    def mark_done(self, batch_no: int, rows: int) -> None:
+        super().mark_done(batch_no, rows)
+        pipe = redis_conn.pipeline()
+        pipe.setbit(self.bits_key, batch_no, 1)
+        pipe.hincrby(self.key, "rows_sent", rows)
+        pipe.hincrby(self.key, "batches_done", 1)
+        pipe.hset(self.key, "updated_at", datetime.utcnow().isoformat() + "Z")
+        pipe.expire(self.key, TTL_SECONDS)
+        pipe.expire(self.bits_key, TTL_SECONDS)
+        pipe.execute()
+
+    def set_total(self, rows_total: int) -> None:
+        redis_conn.hset(self.key, "rows_total", rows_total)
+
+
+async def get_delivery_progress(job_id: str) -> dict | None:
+    """Contadores do checkpoint (usado pela API) ou None se não houver."""
+    try:
+        raw = await _aioredis.hgetall(KEY_PREFIX + job_id)
+    except Exception as e:
+        logger.warning(f"[DELIVERY] Redis indisponível: {e}")
+        return None
+    if not raw:
+        return None
+    data = {k.decode(): v.decode() for k, v in raw.items()}
+    out = {name: int(data[name]) if data.get(name) else None for name in ("rows_total", "rows_sent", "batches_done")}
+    out["updated_at"] = data.get("updated_at")
+    if out["rows_total"]:
+        out["pct"] = round(100 * (out["rows_sent"] or 0) / out["rows_total"], 1)
+    return out
+
+
+def is_stalled(job_updated_at: datetime, progress: dict | None) -> bool:
+    """True se nem o job nem o checkpoint mudam há STALLED_SECONDS."""
+    last = job_updated_at
+    if progress and progress.get("updated_at"):
+        last = max(last, datetime.fromisoformat(progress["updated_at"].rstrip("Z")))
+    return (datetime.utcnow() - last).total_seconds() > STALLED_SECONDS
+
+
+class TokenBucket:
+    """
+    Limita requisições/s entre todas as tarefas. Depois de um 429, pause() segura todo mundo e
+    slow_down() reduz a taxa em 20%: o cliente se ajusta a um limite do servidor menor que o configurado.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def slow_down(self) -> None:
+        if self.rate > 0:
+            self.rate = max(self.rate * 0.8, 0.1)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                if self.rate <= 0:
+                    return
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def iter_batches(csv_path: Path, batch_size: int, checkpoint: Checkpoint) -> Iterator[tuple[int, list[dict]]]:
+    """(número do lote, contatos) do CSV GHL, pulando os lotes que o checkpoint já tem."""
+    # Leitura em múltiplos do lote: o número de cada lote não depende do tamanho da leitura
+    per_read = max(READ_CHUNK_ROWS // batch_size, 1) * batch_size
+    batch_no = 0
+    with pd.read_csv(csv_path, dtype=object, na_filter=False, encoding="utf-8-sig", chunksize=per_read) as reader:
+        for chunk in reader:
+            records = chunk.to_dict(orient="records")
+            for start in range(0, len(records), batch_size):
+                if not checkpoint.is_done(batch_no):
+                    yield batch_no, [to_contact(r) for r in records[start:start + batch_size]]
+                batch_no += 1
+
+
+def _backoff(attempt: int) -> float:
+    """Exponencial com jitter: 0.5s, 1s, 2s... (até MAX_BACKOFF_SECONDS), sorteado entre 50% e 100%."""
+    return min(MAX_BACKOFF_SECONDS, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    try:
+        return max(float(response.headers["Retry-After"]), 0.0)
+    except (KeyError, ValueError):
+        return None
+
+
+async def _post_batch(
+    client: httpx.AsyncClient, bucket: TokenBucket, contacts: list[dict], key: str, max_retries: int, stats: dict
+) -> None:
+    """Envia um lote, repetindo 429/5xx/erros de rede; levanta DeliveryError se não der."""
+    for attempt in range(max_retries + 1):
+        await bucket.acquire()
+        try:
+            response = await client.post(GHL_BATCH_PATH, json={"contacts": contacts}, headers={"Idempotency-Key": key})
+        except httpx.TransportError as e:
+            outcome, wait, error = "network_error", _backoff(attempt), f"{type(e).__name__}: {e}"
+        else:
+            if response.status_code < 300:
+                metrics.DELIVERY_REQUESTS.labels("ok").inc()
+                metrics.DELIVERY_CONTACTS.inc(len(contacts))
+                return
+            error = f"API respondeu {response.status_code}: {response.text[:200]}"
+            if response.status_code not in RETRY_STATUSES:
+                metrics.DELIVERY_REQUESTS.labels("rejected").inc()
+                raise DeliveryError(error)
+            # Retry-After é o mínimo: com várias tarefas disputando, o backoff evita 429 em sequência
+            wait = max(_retry_after(response) or 0.0, _backoff(attempt))
+            if response.status_code == 429:
+                outcome = "rate_limited"
+                # Todas as tarefas esperam: insistir só gera mais 429
+                bucket.pause(wait)
+                bucket.slow_down()
+            else:
+                outcome = "server_error"
+        metrics.DELIVERY_REQUESTS.labels(outcome).inc()
+        stats[outcome] = stats.get(outcome, 0) + 1
+        if attempt == max_retries:
+            raise DeliveryError(f"{error} (após {max_retries + 1} tentativas)")
+        await asyncio.sleep(wait)
+
+
+async def deliver_csv(
+    csv_path: Path,
+    checkpoint: Checkpoint,
+    *,
+    base_url: str = GHL_API_URL,
+    concurrency: int = GHL_CONCURRENCY,
+    rate: float = GHL_RATE_PER_SECOND,
+    burst: int = GHL_RATE_BURST,
+    max_retries: int = GHL_MAX_RETRIES,
+) -> dict:
+    """
+    Envia o CSV GHL para a API em lotes de checkpoint.batch_size, com no máximo concurrency lotes em voo.
+    Retorna estatísticas (contatos e lotes enviados agora, repetições por motivo, segundos).
+    """
+    concurrency = max(concurrency, 1)
+    stats = {"contacts_sent": 0, "batches_sent": 0}
+    started = time.perf_counter()
+    headers = {"Authorization": f"Bearer {GHL_API_TOKEN}"} if GHL_API_TOKEN else {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    bucket = TokenBucket(rate, burst)
+    # Fila curta: a leitura do CSV fica no máximo dois lotes por tarefa à frente do envio
+    pending: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def produce() -> None:
+        batches = iter_batches(csv_path, checkpoint.batch_size, checkpoint)
+        while True:
+            item = await asyncio.to_thread(next, batches, None)
+            if item is None:
+                break
+            await pending.put(item)
+        for _ in range(concurrency):
+            await pending.put(None)
+
+    async def send(client: httpx.AsyncClient) -> None:
+        while (item := await pending.get()) is not None:
+            batch_no, contacts = item
+            await _post_batch(client, bucket, contacts, f"{checkpoint.run}:{batch_no}", max_retries, stats)
+            checkpoint.mark_done(batch_no, len(contacts))
+            stats["contacts_sent"] += len(contacts)
+            stats["batches_sent"] += 1
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=GHL_TIMEOUT_SECONDS) as client:
+        async with asyncio.TaskGroup() as group:
+            group.create_task(produce())
+            for _ in range(concurrency):
+                group.create_task(send(client))
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def schedule(job_id: str, restart: bool = True) -> None:
+    """Enfileira a entrega do job. restart=True recomeça do zero; False retoma do checkpoint."""
+    if restart:
+        RedisCheckpoint.reset(job_id)
+    queue_rq.delivery_queue.enqueue(deliver_job, job_id, job_timeout=JOB_TIMEOUT_SECONDS)
+
+
+def _rows_output(report_json_path: str | None) -> int | None:
+    try:
+        return json.loads(storage.read_bytes(report_json_path))["rows_output"]
+    except Exception:
+        return None
+
+
+def deliver_job(job_id: str) -> None:
+    """Tarefa RQ: entrega o CSV do job concluído e grava delivery_status/delivery_error no banco."""
+    db = SessionLocal()
+    csv_path = None
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if not job or job.status != "done" or not job.output_csv_path:
+            return
+        job.delivery_status = "running"
+        job.delivery_error = None
+        db.commit()
+        try:
+            checkpoint = RedisCheckpoint(job_id)
+            rows_total = _rows_output(job.report_json_path)
+            if rows_total is not None:
+                checkpoint.set_total(rows_total)
+            # Com armazenamento remoto o CSV é baixado para este host
+            csv_path = storage.ensure_local(job.output_csv_path)
+            stats = asyncio.run(deliver_csv(csv_path, checkpoint))
+        except BaseException as e:
+            # TaskGroup junta as falhas das tarefas num ExceptionGroup: mostra a primeira
+            while isinstance(e, BaseExceptionGroup):
+                e = e.exceptions[0]
+            job.delivery_status = "failed"
+            job.delivery_error = str(e) or type(e).__name__
+            db.commit()
+            logger.warning(f"[DELIVERY] Job {job_id}: entrega interrompida ({job.delivery_error})")
+            if not isinstance(e, Exception):
+                raise
+            return
+        job.delivery_status = "done"
+        db.commit()
+        logger.info(f"[DELIVERY] Job {job_id}: {stats}")
+    finally:
+        storage.release(csv_path)
+        db.close()
@@ -0,0 +1,223 @@
+# Download dos CSVs gerados: o worker grava variantes já comprimidas (.gz e, com zstandard, .zst) junto
+# com o CSV, e a API escolhe pelo Accept-Encoding sem comprimir nada na requisição. As respostas têm
+# ETag/Last-Modified (304 em requisições condicionais) e aceitam Range de um intervalo (206), para
+# retomar downloads interrompidos. O Range vale sobre a variante servida (o ETag muda com ela).
+import gzip
+import importlib.util
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from app.config import OUTPUT_GZIP_LEVEL, OUTPUT_ZSTD_LEVEL, PRECOMPRESS_OUTPUTS
+from app.object_store import ObjectInfo, get_store
+from app.storage import storage_key
+
+_HAS_ZSTANDARD = importlib.util.find_spec("zstandard") is not None
+
+# Ordem de preferência quando o cliente aceita mais de uma
+_SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+
+
+def compressed_paths(csv_path: Path) -> dict[str, Path]:
+    """Caminhos de todas as variantes possíveis do CSV (para gravar, remover ou copiar)."""
+    csv_path = Path(csv_path)
+    return {encoding: csv_path.with_name(csv_path.name + suffix) for encoding, suffix in _SUFFIXES.items()}
+
+
+def _enabled_encodings() -> list[str]:
+    if not PRECOMPRESS_OUTPUTS:
+        return []
+    return ["zstd", "gzip"] if _HAS_ZSTANDARD else ["gzip"]
+
+
+class CompressedCopies:
+    """
+    Recebe os bytes do CSV na ordem do arquivo e grava as variantes comprimidas em arquivos temporários;
+    commit() as renomeia para os nomes finais, abort() as descarta.
+    """
+
+    def __init__(self, csv_path: Path):
+        self._files: list[tuple[Path, Path, object, object]] = []
+        paths = compressed_paths(csv_path)
+        for encoding in _enabled_encodings():
+            final = paths[encoding]
+            tmp = final.with_name(f"{final.name}.tmp-{os.getpid()}")
+            raw = open(tmp, "wb")
+            if encoding == "zstd":
+                import zstandard
+
+                stream = zstandard.ZstdCompressor(level=OUTPUT_ZSTD_LEVEL).stream_writer(raw, closefd=False)
+            else:
+                # mtime=0: mesmo conteúdo, mesmo .gz
+                stream = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=OUTPUT_GZIP_LEVEL, mtime=0)
+            self._files.append((final, tmp, raw, stream))
+
+    def write(self, data: bytes) -> None:
+        for _, _, _, stream in self._files:
+            stream.write(data)
+
+    def _close(self) -> None:
+        for _, _, raw, stream in self._files:
+            stream.close()
+            raw.close()
+
+    def commit(self) -> None:
+        self._close()
+        for final, tmp, _, _ in self._files:
+            os.replace(tmp, final)
+
+    def abort(self) -> None:
+        try:
+            self._close()
+        finally:
+            for _, tmp, _, _ in self._files:
+                tmp.unlink(missing_ok=True)
+
+
+def _accepted_encodings(header: str) -> dict[str, float]:
+    """Accept-Encoding -> {codificação: q}."""
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def choose_variant(csv_path: Path, accept_encoding: str) -> tuple[str, str | None, ObjectInfo]:
+    """
+    Variante a servir (chave no armazenamento, codificação, tamanho/mtime): a de maior q entre as aceitas
+    pelo cliente e existentes (empate: zstd antes de gzip), senão o CSV puro. FileNotFoundError sem o CSV.
+    """
+    store = get_store()
+    csv_key = storage_key(csv_path)
+    csv_info = store.stat(csv_key)
+    if csv_info is None:
+        raise FileNotFoundError(csv_key)
+    accepted = _accepted_encodings(accept_encoding or "")
+    candidates = []
+    for encoding, path in compressed_paths(csv_path).items():
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            candidates.append((-q, len(candidates), encoding, path))
+    for _, _, encoding, path in sorted(candidates):
+        key = storage_key(path)
+        info = store.stat(key)
+        # Variante mais velha que o CSV (arquivo regravado sem ela) é ignorada
+        if info is not None and info.mtime_ns >= csv_info.mtime_ns:
+            return key, encoding, info
+    return csv_key, None, csv_info
+
+
+def _etag(info: ObjectInfo) -> str:
+    return f'"{info.size:x}-{info.mtime_ns:x}"'
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _byte_range(request: Request, etag: str, mtime: float, size: int) -> tuple[int, int] | None:
+    """
+    (início, fim inclusivo) do header Range, ou None para responder o arquivo inteiro (sem Range, vários
+    intervalos, sintaxe inválida ou If-Range que não bate). Intervalo fora do arquivo: ValueError.
+    """
+    header = request.headers.get("range", "")
+    if not header.startswith("bytes=") or "," in header:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range:
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            if if_range != etag:
+                return None
+        else:
+            try:
+                if int(mtime) > parsedate_to_datetime(if_range).timestamp():
+                    return None
+            except (TypeError, ValueError):
+                return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise ValueError("intervalo fora do arquivo")
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def _content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def file_response(request: Request, csv_path: Path, filename: str, media_type: str = "text/csv") -> Response:
+    """
+    Resposta do download: variante por Accept-Encoding, 304 condicional, 206 com Range ou 200 inteiro.
+    No armazenamento local o arquivo sai direto do disco; no bucket, por leitura com Range.
+    """
+    store = get_store()
+    key, encoding, info = choose_variant(csv_path, request.headers.get("accept-encoding", ""))
+    mtime = info.mtime_ns / 1_000_000_000
+    etag = _etag(info)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+    }
+    # 304 e 416 vão sem corpo e sem Content-Encoding (clientes tentariam descomprimir um corpo vazio)
+    if _not_modified(request, etag, mtime):
+        return Response(status_code=304, headers=headers)
+    try:
+        byte_range = _byte_range(request, etag, mtime, info.size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{info.size}"})
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    headers["Content-Disposition"] = _content_disposition(filename)
+    if byte_range is None:
+        local = store.local_path(key) if not store.remote else None
+        if local is not None:
+            return FileResponse(local, headers=headers, media_type=media_type)
+        start, end, status = 0, info.size - 1, 200
+    else:
+        start, end = byte_range
+        status = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    if info.size == 0:
+        return Response(status_code=status, headers=headers, media_type=media_type)
+    return StreamingResponse(
+        store.iter_range(key, start, end), status_code=status, headers=headers, media_type=media_type
+    )
@@ -0,0 +1,146 @@
+# Eventos de status dos jobs: o worker e a API publicam no Redis (pub/sub) e cada processo da API
+# mantém uma única assinatura que distribui os eventos para as conexões SSE abertas.
+import asyncio
+import json
+import logging
+from datetime import datetime
+
+from redis import asyncio as aioredis
+
+from app.config import REDIS_URL
+from app.queue_rq import redis_conn
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "flowbase:job:"
+TERMINAL_STATUSES = ("done", "failed")
+
+# Intervalo do comentário de keep-alive no SSE (proxies derrubam conexões ociosas)
+HEARTBEAT_SECONDS = 15
+
+
+def format_sse(event: dict) -> str:
+    """Formata um evento de status no protocolo Server-Sent Events."""
+    return f"event: status\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def publish_job_status(job_id: str, status: str, error_message: str | None = None) -> None:
+    """Publica a mudança de status do job (síncrono: usado pelo worker e via threadpool na API)."""
+    payload = {
+        "job_id": job_id,
+        "status": status,
+        "error_message": error_message,
+        "at": datetime.utcnow().isoformat() + "Z",
+    }
+    try:
+        redis_conn.publish(CHANNEL_PREFIX + job_id, json.dumps(payload, ensure_ascii=False))
+    except Exception as e:
+        # Evento perdido não quebra o job: o cliente ainda pode consultar GET /jobs/{id}
+        logger.warning(f"[EVENTS] Não foi possível publicar status do job {job_id}: {e}")
+
+
+# Sinal na fila de uma conexão SSE: a assinatura do Redis caiu (ou não ficou pronta) e eventos podem
+# ter sido perdidos; o stream fecha e o dashboard volta ao polling de GET /jobs/{id}
+STREAM_INTERRUPTED = None
+
+# Espera máxima para a assinatura ficar ativa antes de ler o status no banco
+SUBSCRIBE_TIMEOUT_SECONDS = 5
+# Backoff entre tentativas de reconectar a assinatura
+RECONNECT_MIN_SECONDS = 0.5
+RECONNECT_MAX_SECONDS = 30
+
+
+class JobEventHub:
+    """
+    Uma assinatura psubscribe por processo da API; cada conexão SSE recebe uma asyncio.Queue
+    com os eventos do job que está acompanhando. Se a conexão com o Redis cair, as filas abertas
+    recebem STREAM_INTERRUPTED e a assinatura é refeita com backoff.
+    """
+
+    def __init__(self, redis_url: str):
+        self._redis_url = redis_url
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._task: asyncio.Task | None = None
+        self._ready: asyncio.Event | None = None
+
+    async def subscribe(self, job_id: str) -> asyncio.Queue:
+        """
+        Registra a fila e espera o psubscribe estar ativo: a partir do retorno nenhuma transição se perde
+        (quem chama lê o status atual depois). Se o Redis não responder a tempo, a fila já sai com
+        STREAM_INTERRUPTED.
+        """
+        if self._task is None or self._task.done():
+            self._ready = asyncio.Event()
+            self._task = asyncio.create_task(self._listen())
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=SUBSCRIBE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            queue.put_nowait(STREAM_INTERRUPTED)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(job_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[job_id]
+
+    def _interrupt_all(self) -> None:
+        for queues in list(self._subscribers.values()):
+            for queue in list(queues):
+                queue.put_nowait(STREAM_INTERRUPTED)
+
+    async def _listen(self) -> None:
+        """Mantém a assinatura: reconecta com backoff exponencial enquanto a API estiver no ar."""
+        delay = RECONNECT_MIN_SECONDS
+        while True:
+            try:
+                await self._listen_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[EVENTS] Assinatura do Redis caiu: {e}")
+            if self._ready.is_set():
+                # Chegou a ficar ativa: volta ao menor intervalo
+                delay = RECONNECT_MIN_SECONDS
+            self._ready.clear()
+            # Eventos podem ter se perdido: as conexões abertas fecham e o cliente volta ao polling
+            self._interrupt_all()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+    async def _listen_once(self) -> None:
+        client = aioredis.Redis.from_url(self._redis_url)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.psubscribe(CHANNEL_PREFIX + "*")
+            self._ready.set()
+            async for message in pubsub.listen():
+                if message["type"] != "pmessage":
+                    continue
+                job_id = message["channel"].decode()[len(CHANNEL_PREFIX):]
+                queues = self._subscribers.get(job_id)
+                if not queues:
+                    continue
+                event = json.loads(message["data"])
+                for queue in list(queues):
+                    queue.put_nowait(event)
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        self._ready = None
+
+
+hub = JobEventHub(REDIS_URL)
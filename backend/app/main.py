@@ -1,16 +1,30 @@
 # Servidor principal: FastAPI (expõe os endpoints HTTP)
+import base64
 import logging
 import os
+import time
+from datetime import datetime
 from pathlib import Path
 from contextlib import asynccontextmanager
-from fastapi import Depends, FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import FileResponse, Response
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import get_current_user
-from app.config import get_env_loaded_path
-from app.db import Base, engine, get_db, get_driver_info, get_effective_url_masked, test_connection
+from app.config import METRICS_ENABLED, get_env_loaded_path
+from app.db import (
+    Base,
+    async_engine,
+    engine,
+    get_async_db,
+    get_driver_info,
+    get_effective_url_masked,
+    test_connection,
+    upgrade_schema,
+)
+from app import events, metrics, result_cache, user_cache
 from app import models  # Registra as tabelas no Base antes de create_all
 from app.models import Job, User
 from app.routes_auth import router as auth_router
@@ -43,10 +57,13 @@ async def lifespan(app: FastAPI):
         raise
 
     Base.metadata.create_all(bind=engine)
-    logger.info("[STARTUP] Tabelas criadas/verificadas (create_all)")
+    upgrade_schema()
+    logger.info("[STARTUP] Tabelas criadas/verificadas (create_all + upgrades)")
 
     yield
-    # Ao desligar: nada especial por enquanto
+    # Ao desligar: encerra a assinatura de eventos e fecha as conexões do pool assíncrono
+    await events.hub.close()
+    await async_engine.dispose()
 
 
 app = FastAPI(
@@ -74,28 +91,80 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Latência por rota (template do path, ex.: /jobs/{job_id}) para o /metrics."""
+    if not METRICS_ENABLED:
+        return await call_next(request)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_DURATION.labels(
+            request.method, getattr(route, "path", "unmatched"), str(status)
+        ).observe(time.perf_counter() - start)
+
+
 app.include_router(auth_router)
 
 
+def _encode_cursor(job: Job) -> str:
+    """Cursor opaco da paginação: posição (created_at, id) do último job da página."""
+    raw = f"{job.created_at.isoformat()}|{job.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Inverso de _encode_cursor. Levanta 400 se o cursor não for válido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, job_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), job_id
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="cursor inválido")
+
+
 @app.get("/jobs", summary="Listar jobs")
-def list_jobs_root(
-    limit: int = 20,
+async def list_jobs_root(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
     offset: int = 0,
     status: str | None = None,
-    db: Session = Depends(get_db),
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Lista os jobs do usuário (ordenados por created_at decrescente). Parâmetros: limit, offset, status."""
-    query = db.query(Job).filter(Job.user_id == current_user.id)
+    """
+    Lista os jobs do usuário (ordenados por created_at decrescente). Parâmetros: limit, cursor, status.
+    Paginação por cursor (keyset em created_at, id): passe o next_cursor da resposta para a próxima
+    página; o custo não cresce com a profundidade. offset continua aceito (sem cursor), mas fica
+    mais caro em páginas fundas. O total exato só é calculado com include_total=true.
+    """
+    query = select(Job).where(Job.user_id == current_user.id)
     if status:
-        query = query.filter(Job.status == status)
-    query = query.order_by(Job.created_at.desc())
-    total = query.count()
-    jobs = query.offset(offset).limit(limit).all()
+        query = query.where(Job.status == status)
+    total = None
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+    if cursor:
+        created_at, job_id = _decode_cursor(cursor)
+        query = query.where(tuple_(Job.created_at, Job.id) < tuple_(created_at, job_id))
+    elif offset:
+        query = query.offset(offset)
+    # Busca uma linha a mais só para saber se existe próxima página
+    result = await db.execute(query.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit + 1))
+    jobs = result.scalars().all()
+    has_more = len(jobs) > limit
+    jobs = jobs[:limit]
     return {
         "total": total,
         "limit": limit,
         "offset": offset,
+        "next_cursor": _encode_cursor(jobs[-1]) if has_more else None,
         "jobs": [
             {
                 "id": j.id,
@@ -127,6 +196,21 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """Métricas no formato texto do Prometheus (API + filas RQ; com multiprocess, soma todos os processos)."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Métricas desativadas")
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/health/cache")
+def health_cache():
+    """Taxa de acerto dos caches: resultados (uploads idênticos) e usuários autenticados."""
+    return {"result_cache": result_cache.stats(), "user_cache": user_cache.stats()}
+
+
 if os.getenv("ENV", "development") != "production":
     @app.get("/debug/db")
     def debug_db():
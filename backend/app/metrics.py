@@ -0,0 +1,131 @@
+# Métricas no formato Prometheus (texto), expostas pela API em GET /metrics e pelo worker num
+# servidor HTTP próprio (WORKER_METRICS_PORT). Com vários processos (uvicorn --workers, pool de
+# workers), defina PROMETHEUS_MULTIPROC_DIR: cada processo grava seus valores ali e a coleta soma todos.
+import logging
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import REGISTRY
+
+from app.config import METRICS_ENABLED
+
+logger = logging.getLogger(__name__)
+
+# Buckets em segundos: de requisições rápidas (ms) a jobs de vários minutos
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_JOB_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+_SIZE_BUCKETS = tuple(1024 * kb for kb in (1, 10, 100, 512, 1024, 5 * 1024, 10 * 1024, 50 * 1024, 100 * 1024))
+
+HTTP_REQUEST_DURATION = Histogram(
+    "flowbase_http_request_duration_seconds",
+    "Latência das requisições HTTP por rota",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+JOB_STAGE_DURATION = Histogram(
+    "flowbase_job_stage_duration_seconds",
+    "Tempo por etapa do processamento (read, map, normalize, write, dedup, report, total)",
+    ["stage"],
+    buckets=_JOB_BUCKETS,
+)
+JOBS_FINISHED = Counter("flowbase_jobs_finished_total", "Jobs concluídos por status final e fila", ["status", "queue"])
+ROWS_PROCESSED = Counter("flowbase_rows_processed_total", "Linhas de entrada processadas pelos workers")
+JOB_FILE_SIZE = Histogram("flowbase_job_file_size_bytes", "Tamanho dos arquivos processados", buckets=_SIZE_BUCKETS)
+QUEUE_WAIT = Histogram(
+    "flowbase_queue_wait_seconds", "Espera entre entrar na fila e começar a processar", ["queue"], buckets=_JOB_BUCKETS
+)
+DB_POOL_CHECKOUT = Histogram(
+    "flowbase_db_pool_checkout_seconds",
+    "Tempo para obter uma conexão do pool do banco",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5, 30),
+)
+DELIVERY_REQUESTS = Counter(
+    "flowbase_delivery_requests_total", "Requisições de lote à API de contatos por resultado", ["outcome"]
+)
+DELIVERY_CONTACTS = Counter("flowbase_delivery_contacts_total", "Contatos aceitos pela API de contatos")
+CACHE_REQUESTS = Counter("flowbase_cache_requests_total", "Consultas aos caches por resultado", ["cache", "result"])
+# Cache LRU de telefones vive em cada processo de worker: soma dos processos vivos
+PHONE_CACHE = Gauge(
+    "flowbase_phone_cache", "Contadores do cache de telefones (hits, misses, size)", ["field"], multiprocess_mode="livesum"
+)
+
+
+def observe_db_checkout(engine_name: str, start: float) -> None:
+    DB_POOL_CHECKOUT.labels(engine_name).observe(time.perf_counter() - start)
+
+
+def count_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+class QueueCollector:
+    """Profundidade das filas RQ e jobs em execução, lidos do Redis a cada coleta."""
+
+    def collect(self):
+        from rq.registry import StartedJobRegistry
+
+        from app.queue_rq import DELIVERY_QUEUE, WORKER_QUEUES, redis_conn
+
+        depth = GaugeMetricFamily("flowbase_queue_depth", "Jobs aguardando em cada fila RQ", labels=["queue"])
+        started = GaugeMetricFamily("flowbase_queue_started", "Jobs em execução em cada fila RQ", labels=["queue"])
+        try:
+            for name in [*WORKER_QUEUES, DELIVERY_QUEUE]:
+                depth.add_metric([name], redis_conn.llen(f"rq:queue:{name}"))
+                started.add_metric([name], StartedJobRegistry(name, connection=redis_conn).count)
+        except Exception as e:
+            logger.warning(f"[METRICS] Não foi possível ler as filas: {e}")
+            return
+        yield depth
+        yield started
+
+
+def _registry() -> CollectorRegistry:
+    """Registro da coleta: soma dos processos (modo multiprocess) ou o padrão deste processo."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return registry
+
+
+_scrape_registry: CollectorRegistry | None = None
+
+
+def scrape_registry() -> CollectorRegistry:
+    global _scrape_registry
+    if _scrape_registry is None:
+        _scrape_registry = _registry()
+        _scrape_registry.register(QueueCollector())
+    return _scrape_registry
+
+
+def render() -> tuple[bytes, str]:
+    """Corpo e content-type da resposta de /metrics."""
+    return generate_latest(scrape_registry()), CONTENT_TYPE_LATEST
+
+
+def start_worker_server(port: int) -> None:
+    """Servidor HTTP de métricas do worker (thread em segundo plano)."""
+    if not METRICS_ENABLED or not port:
+        return
+    start_http_server(port, registry=scrape_registry())
+    logger.info(f"[METRICS] Métricas do worker em http://0.0.0.0:{port}/metrics")
+
+
+def mark_process_dead(pid: int) -> None:
+    """Remove os gauges "live" de um processo que morreu (modo multiprocess)."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
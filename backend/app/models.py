@@ -1,5 +1,5 @@
 # Modelos das tabelas do banco (cada classe = uma tabela)
-from sqlalchemy import String, DateTime, Text, ForeignKey
+from sqlalchemy import JSON, String, DateTime, Text, ForeignKey, Index, Integer
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 
@@ -19,14 +19,36 @@ class User(Base):
 class Job(Base):
     """Tabela jobs: um registro por arquivo enviado (um job = um processamento)."""
     __tablename__ = "jobs"
+    # Listagem GET /jobs: keyset em (created_at, id) por usuário, com e sem filtro de status
+    __table_args__ = (
+        Index("ix_jobs_user_status_created", "user_id", "status", "created_at", "id"),
+        Index("ix_jobs_user_created", "user_id", "created_at", "id"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     user_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("users.id"), nullable=True, index=True)
     status: Mapped[str] = mapped_column(String(20), nullable=False, default="queued")
     filename_original: Mapped[str] = mapped_column(String(255), nullable=False)
     file_path: Mapped[str] = mapped_column(String(512), nullable=False)
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
     output_csv_path: Mapped[str | None] = mapped_column(String(512), nullable=True)
     report_json_path: Mapped[str | None] = mapped_column(String(512), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Roteamento (app.scheduler): fila escolhida, linhas estimadas e tempos para medir a espera na fila
+    queue_name: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    row_estimate: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    queued_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Mapeamento de colunas informado pelo usuário (JSON coluna GHL -> coluna da planilha); None = automático
+    column_mapping: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Entrega na API de contatos (app.delivery): queued, running, done, failed; None = não pedida
+    delivery_status: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    delivery_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Report e preview do job concluído, lidos só pelas rotas /report e /preview (deferred: o resto das
+    # consultas não carrega os dois). JSON e não JSONB: mantém a ordem das chaves (colunas do preview).
+    # results_etag = hash dos dois, para respostas 304
+    report: Mapped[dict | None] = mapped_column(JSON(none_as_null=True), nullable=True, deferred=True)
+    preview: Mapped[list | None] = mapped_column(JSON(none_as_null=True), nullable=True, deferred=True)
+    results_etag: Mapped[str | None] = mapped_column(String(64), nullable=True)
@@ -0,0 +1,351 @@
+# Armazenamento dos arquivos (uploads, CSVs gerados, reports, cache de resultados) por chave relativa
+# ("uploads/<job>.csv", "outputs/<job>.csv", ...). STORAGE_BACKEND=local usa a pasta backend/storage/
+# (API e worker no mesmo volume); STORAGE_BACKEND=s3 usa um bucket S3 compatível (AWS, MinIO,
+# benchmarks/mock_s3.py), e cada host guarda só cópias locais de trabalho em backend/storage/.
+# Requer boto3 para o S3 (importado só quando usado).
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from app.config import (
+    S3_ACCESS_KEY_ID,
+    S3_BUCKET,
+    S3_ENDPOINT_URL,
+    S3_MAX_POOL_CONNECTIONS,
+    S3_PART_SIZE_MB,
+    S3_PREFIX,
+    S3_REGION,
+    S3_SECRET_ACCESS_KEY,
+    S3_TRANSFER_CONCURRENCY,
+    STORAGE_BACKEND,
+    STORAGE_DIR,
+)
+
+_READ_CHUNK_BYTES = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ObjectInfo:
+    size: int
+    mtime_ns: int
+
+
+class LocalStore:
+    """Arquivos na pasta local: a chave é o caminho relativo a STORAGE_DIR."""
+
+    remote = False
+
+    def __init__(self, root: Path = STORAGE_DIR):
+        self.root = root
+
+    def local_path(self, key: str) -> Path:
+        return self.root / key
+
+    def stat(self, key: str) -> ObjectInfo | None:
+        try:
+            st = self.local_path(key).stat()
+        except FileNotFoundError:
+            return None
+        return ObjectInfo(st.st_size, st.st_mtime_ns)
+
+    def exists(self, key: str) -> bool:
+        return self.local_path(key).is_file()
+
+    @contextmanager
+    def open_writer(self, key: str) -> Iterator[BinaryIO]:
+        """Grava num .part ao lado e renomeia no final (quem lê nunca vê o arquivo pela metade)."""
+        path = self.local_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".part")
+        try:
+            with open(tmp, "wb") as f:
+                yield f
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def put_file(self, key: str, path: Path) -> None:
+        target = self.local_path(key)
+        if Path(path).resolve() == target.resolve():
+            return
+        with self.open_writer(key) as dst, open(path, "rb") as src:
+            shutil.copyfileobj(src, dst, _READ_CHUNK_BYTES)
+
+    def fetch(self, key: str, path: Path) -> None:
+        source = self.local_path(key)
+        if not source.is_file():
+            raise FileNotFoundError(key)
+        if Path(path).resolve() != source.resolve():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(source, path)
+
+    def read_bytes(self, key: str) -> bytes:
+        return self.local_path(key).read_bytes()
+
+    def read_range(self, key: str, start: int, end: int | None = None) -> bytes:
+        """Bytes [start, end] (end inclusivo; None = até o fim)."""
+        with open(self.local_path(key), "rb") as f:
+            f.seek(start)
+            return f.read() if end is None else f.read(end - start + 1)
+
+    def iter_range(self, key: str, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+        with open(self.local_path(key), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                data = f.read(_READ_CHUNK_BYTES if remaining is None else min(_READ_CHUNK_BYTES, remaining))
+                if not data:
+                    break
+                if remaining is not None:
+                    remaining -= len(data)
+                yield data
+
+    def copy(self, src_key: str, dst_key: str) -> None:
+        """Hardlink (não ocupa espaço extra); se o sistema de arquivos não suportar, copia."""
+        src, dst = self.local_path(src_key), self.local_path(dst_key)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        dst.unlink(missing_ok=True)
+        try:
+            os.link(src, dst)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            shutil.copyfile(src, dst)
+
+    def delete(self, key: str) -> None:
+        self.local_path(key).unlink(missing_ok=True)
+
+
+class _MultipartWriter:
+    """
+    Envia o que for escrito em partes de part_size (multipart upload) sem guardar o arquivo inteiro.
+    Objeto menor que uma parte vira um PutObject simples.
+    """
+
+    def __init__(self, store: "S3Store", key: str):
+        self._store = store
+        self._key = key
+        self._buffer = bytearray()
+        self._upload_id: str | None = None
+        self._parts: list[dict] = []
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        while len(self._buffer) >= self._store.part_size:
+            self._send_part(bytes(self._buffer[: self._store.part_size]))
+            del self._buffer[: self._store.part_size]
+        return len(data)
+
+    def _send_part(self, body: bytes) -> None:
+        client = self._store.client
+        if self._upload_id is None:
+            created = client.create_multipart_upload(Bucket=self._store.bucket, Key=self._key)
+            self._upload_id = created["UploadId"]
+        number = len(self._parts) + 1
+        response = client.upload_part(
+            Bucket=self._store.bucket, Key=self._key, UploadId=self._upload_id, PartNumber=number, Body=body
+        )
+        self._parts.append({"PartNumber": number, "ETag": response["ETag"]})
+
+    def close(self) -> None:
+        client = self._store.client
+        if self._upload_id is None:
+            client.put_object(Bucket=self._store.bucket, Key=self._key, Body=bytes(self._buffer))
+            return
+        if self._buffer:
+            self._send_part(bytes(self._buffer))
+        client.complete_multipart_upload(
+            Bucket=self._store.bucket,
+            Key=self._key,
+            UploadId=self._upload_id,
+            MultipartUpload={"Parts": self._parts},
+        )
+
+    def abort(self) -> None:
+        if self._upload_id is not None:
+            self._store.client.abort_multipart_upload(
+                Bucket=self._store.bucket, Key=self._key, UploadId=self._upload_id
+            )
+
+
+class S3Store:
+    """
+    Bucket S3 compatível. Um cliente boto3 por processo (criado depois do fork dos workers), com pool
+    de S3_MAX_POOL_CONNECTIONS conexões; envios em multipart de S3_PART_SIZE_MB e leituras por Range.
+    """
+
+    remote = True
+
+    def __init__(self):
+        self.bucket = S3_BUCKET
+        self.prefix = S3_PREFIX.strip("/") + "/" if S3_PREFIX.strip("/") else ""
+        self.part_size = max(S3_PART_SIZE_MB, 5) * 1024 * 1024  # mínimo do S3 para partes
+        self._client = None
+        self._client_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None or self._client_pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._client_pid != os.getpid():
+                    import boto3
+                    from botocore.config import Config
+
+                    config = Config(
+                        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                        retries={"max_attempts": 5, "mode": "standard"},
+                        s3={"addressing_style": "path"} if S3_ENDPOINT_URL else None,
+                        # Checksums só quando a operação exige: compatível com MinIO e afins
+                        request_checksum_calculation="when_required",
+                        response_checksum_validation="when_required",
+                    )
+                    self._client = boto3.session.Session().client(
+                        "s3",
+                        endpoint_url=S3_ENDPOINT_URL or None,
+                        region_name=S3_REGION or None,
+                        aws_access_key_id=S3_ACCESS_KEY_ID or None,
+                        aws_secret_access_key=S3_SECRET_ACCESS_KEY or None,
+                        config=config,
+                    )
+                    self._client_pid = os.getpid()
+        return self._client
+
+    def _transfer_config(self):
+        from boto3.s3.transfer import TransferConfig
+
+        return TransferConfig(
+            multipart_threshold=self.part_size,
+            multipart_chunksize=self.part_size,
+            max_concurrency=S3_TRANSFER_CONCURRENCY,
+        )
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    @staticmethod
+    def _missing(error) -> bool:
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def local_path(self, key: str) -> Path | None:
+        return None
+
+    def stat(self, key: str) -> ObjectInfo | None:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if self._missing(e):
+                return None
+            raise
+        return ObjectInfo(head["ContentLength"], int(head["LastModified"].timestamp() * 1_000_000_000))
+
+    def exists(self, key: str) -> bool:
+        return self.stat(key) is not None
+
+    @contextmanager
+    def open_writer(self, key: str) -> Iterator[_MultipartWriter]:
+        """Escrita em streaming (multipart); em caso de erro o upload é abortado."""
+        writer = _MultipartWriter(self, self._key(key))
+        try:
+            yield writer
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+
+    def put_file(self, key: str, path: Path) -> None:
+        """Envia um arquivo local (multipart com partes em paralelo acima de part_size)."""
+        self.client.upload_file(str(path), self.bucket, self._key(key), Config=self._transfer_config())
+
+    def fetch(self, key: str, path: Path) -> None:
+        """Baixa para path (Ranges em paralelo acima de part_size); FileNotFoundError se não existir."""
+        from botocore.exceptions import ClientError
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.part-{os.getpid()}")
+        try:
+            self.client.download_file(self.bucket, self._key(key), str(tmp), Config=self._transfer_config())
+            os.replace(tmp, path)
+        except ClientError as e:
+            tmp.unlink(missing_ok=True)
+            if self._missing(e):
+                raise FileNotFoundError(key) from e
+            raise
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def _get(self, key: str, start: int = 0, end: int | None = None):
+        from botocore.exceptions import ClientError
+
+        kwargs = {"Bucket": self.bucket, "Key": self._key(key)}
+        if start or end is not None:
+            kwargs["Range"] = f"bytes={start}-{'' if end is None else end}"
+        try:
+            return self.client.get_object(**kwargs)["Body"]
+        except ClientError as e:
+            if self._missing(e):
+                raise FileNotFoundError(key) from e
+            raise
+
+    def read_bytes(self, key: str) -> bytes:
+        body = self._get(key)
+        try:
+            return body.read()
+        finally:
+            body.close()
+
+    def read_range(self, key: str, start: int, end: int | None = None) -> bytes:
+        body = self._get(key, start, end)
+        try:
+            return body.read()
+        finally:
+            body.close()
+
+    def iter_range(self, key: str, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+        body = self._get(key, start, end)
+        try:
+            yield from body.iter_chunks(_READ_CHUNK_BYTES)
+        finally:
+            body.close()
+
+    def copy(self, src_key: str, dst_key: str) -> None:
+        """Cópia no próprio servidor (os bytes não passam por este processo)."""
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.copy_object(
+                Bucket=self.bucket,
+                Key=self._key(dst_key),
+                CopySource={"Bucket": self.bucket, "Key": self._key(src_key)},
+            )
+        except ClientError as e:
+            if self._missing(e):
+                raise FileNotFoundError(src_key) from e
+            raise
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+_store = None
+
+
+def get_store() -> LocalStore | S3Store:
+    """Backend configurado em STORAGE_BACKEND (um por processo)."""
+    global _store
+    if _store is None:
+        if STORAGE_BACKEND == "s3":
+            if not S3_BUCKET:
+                raise ValueError("STORAGE_BACKEND=s3 requer S3_BUCKET")
+            _store = S3Store()
+        else:
+            _store = LocalStore()
+    return _store
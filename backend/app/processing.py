@@ -1,16 +1,61 @@
 # Pipeline de processamento: lê planilha, mapeia colunas, normaliza, gera CSV GHL, report e preview
+import codecs
+import csv
+import glob
+import hashlib
+import importlib.util
 import json
+import logging
+import os
 import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
+from typing import Iterable, Iterator
 
+import numpy as np
 import pandas as pd
 import phonenumbers
+from openpyxl import load_workbook
+from pandas.api.types import infer_dtype, is_bool_dtype, is_float_dtype, is_integer_dtype, is_numeric_dtype
 from sqlalchemy.orm import Session
 
-from app.config import OUTPUTS_DIR, REPORTS_DIR
-from app.db import SessionLocal
+from app.config import (
+    CSV_SNIFF_BYTES,
+    DEDUP_ENABLED,
+    GHL_DELIVERY_ENABLED,
+    INTERMEDIATE_CACHE_ENABLED,
+    OUTPUTS_DIR,
+    PARALLEL_CHUNK_ROWS,
+    PARALLEL_MIN_ROWS,
+    PARALLEL_WORKERS,
+    PHONE_CACHE_SIZE,
+    PROCESSING_ENGINE,
+    REPORTS_DIR,
+    STREAMING_CHUNK_ROWS,
+    STREAMING_THRESHOLD_BYTES,
+    XLSX_ENGINE,
+)
+from app import dedup, delivery, metrics, result_cache, storage
+from app.events import publish_job_status
+from app.db import SessionLocal, json_dumps
 from app.models import Job
+from app.downloads import CompressedCopies, compressed_paths
+from app.progress import ProgressTracker
+from app.row_index import RowIndexWriter, row_index_path
+
+logger = logging.getLogger(__name__)
+
+# Versão da lógica de conversão. Aumente sempre que a saída mudar para invalidar o cache de resultados.
+PROCESSING_VERSION = "4"
+
+# python-calamine (opcional, pandas >= 2.2) lê XLSX bem mais rápido que o openpyxl
+_HAS_CALAMINE = importlib.util.find_spec("python_calamine") is not None
 
 # Colunas do CSV no padrão de importação do GoHighLevel (ordem fixa)
 GHL_COLUMNS = [
@@ -28,6 +73,9 @@ GHL_COLUMNS = [
     "Source",
 ]
 
+# Quantidade de linhas guardadas no preview.json
+PREVIEW_ROWS = 20
+
 # Sinônimos PT/EN para encontrar colunas na planilha (chave = nome normalizado, valor = coluna GHL)
 COLUMN_SYNONYMS = {
     "full name": "Full Name",
@@ -79,18 +127,46 @@ def _normalize_col_name(s: str) -> str:
     return s
 
 
-def _find_column_mapping(df: pd.DataFrame) -> dict[str, str]:
-    """Mapeia cada coluna GHL para o nome da coluna na planilha (ou vazio)."""
+def detect_column_mapping(columns: Iterable, overrides: dict | None = None) -> dict[str, str]:
+    """
+    Mapeia cada coluna GHL para o nome da coluna na planilha (ou vazio).
+    overrides (coluna GHL -> coluna da planilha, ou None para desmapear) vence a detecção por
+    sinônimos; uma coluna da planilha escolhida num override sai do mapeamento automático.
+    """
+    columns = list(columns)
     mapping = {ghl: None for ghl in GHL_COLUMNS}
-    for col in df.columns:
+    for col in columns:
         key = _normalize_col_name(str(col))
         if key and key in COLUMN_SYNONYMS:
             ghl = COLUMN_SYNONYMS[key]
             if mapping[ghl] is None:
                 mapping[ghl] = col
+    if overrides:
+        by_name = {str(c): c for c in columns}
+        chosen = {str(v) for v in overrides.values() if v is not None}
+        for ghl in GHL_COLUMNS:
+            if ghl not in overrides and mapping[ghl] is not None and str(mapping[ghl]) in chosen:
+                mapping[ghl] = None
+        for ghl, source in overrides.items():
+            mapping[ghl] = None if source is None else by_name[str(source)]
     return mapping
 
 
+def validate_mapping_overrides(overrides: dict, columns: Iterable) -> None:
+    """Levanta ValueError se o override cita coluna GHL inexistente ou coluna que não está no cabeçalho."""
+    names = {str(c) for c in columns}
+    unknown_ghl = [k for k in overrides if k not in GHL_COLUMNS]
+    if unknown_ghl:
+        raise ValueError(f"Colunas GHL desconhecidas: {', '.join(unknown_ghl)}. Válidas: {', '.join(GHL_COLUMNS)}")
+    missing = [v for v in overrides.values() if v is not None and str(v) not in names]
+    if missing:
+        raise ValueError(f"Colunas não encontradas no cabeçalho da planilha: {', '.join(map(str, missing))}")
+
+
+def _find_column_mapping(df: pd.DataFrame, overrides: dict | None = None) -> dict[str, str]:
+    return detect_column_mapping(df.columns, overrides)
+
+
 def _normalize_emails(val) -> str:
     """Lowercase, separar por , ; espaço, deduplicar."""
     if pd.isna(val) or val == "":
@@ -111,6 +187,13 @@ def _normalize_phone(val, default_region="BR") -> str:
     """Tenta converter para E.164 (default BR +55). Retorna vazio se inválido."""
     if pd.isna(val) or val == "":
         return ""
+    if isinstance(val, str):
+        return _normalize_phone_cached(val, default_region)
+    return _normalize_phone_uncached(val, default_region)
+
+
+def _normalize_phone_uncached(val, default_region: str) -> str:
+    """Parse real com phonenumbers (sem cache). Use _normalize_phone."""
     s = str(val).strip()
     s = re.sub(r"[\s\-\(\)]", "", s)
     if not s or not s.replace("+", "").isdigit():
@@ -124,6 +207,24 @@ def _normalize_phone(val, default_region="BR") -> str:
     return str(val).strip()
 
 
+# Cache LRU por processo, chave (valor bruto, região): listas repetem muito os mesmos números
+# (PABX compartilhado, linhas duplicadas, re-uploads) e o worker reaproveita entre jobs.
+_normalize_phone_cached = lru_cache(maxsize=PHONE_CACHE_SIZE)(_normalize_phone_uncached)
+
+
+def phone_cache_info() -> dict:
+    """Contadores do cache de telefones (hits, misses, tamanho atual e máximo)."""
+    info = _normalize_phone_cached.cache_info()
+    total = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+        "hit_rate": round(info.hits / total, 4) if total else 0.0,
+    }
+
+
 def _normalize_phones_field(val) -> str:
     """Vários telefones separados por , ; espaço -> E.164 separados por vírgula."""
     if pd.isna(val) or val == "":
@@ -168,26 +269,449 @@ def _row_to_ghl(row: pd.Series, mapping: dict, unmapped_cols: list) -> dict:
     return ghl_row
 
 
-def read_file(path: str) -> pd.DataFrame:
-    """Lê XLSX ou CSV com pandas."""
+def _xlsx_engine() -> str:
+    """Engine de leitura de XLSX: XLSX_ENGINE, ou no modo auto calamine se instalado, senão openpyxl."""
+    if XLSX_ENGINE == "auto":
+        return "calamine" if _HAS_CALAMINE else "openpyxl"
+    return XLSX_ENGINE
+
+
+def _read_xlsx(path: str) -> pd.DataFrame:
+    """
+    Lê a primeira aba do XLSX com todas as células como string (sem inferência de tipos).
+    calamine: parser em Rust via pandas. openpyxl: leitor read_only linha a linha, sem
+    montar o modelo completo da planilha.
+    """
+    engine = _xlsx_engine()
+    if engine == "calamine":
+        return pd.read_excel(path, engine="calamine", dtype=str, keep_default_na=False, na_values=[""])
+    if engine == "openpyxl":
+        return next(_iter_xlsx_chunks(path, sys.maxsize))
+    raise ValueError(f"Engine de XLSX desconhecida: {engine}")
+
+
+# ---------------------------------------------------------------------------
+# Detecção de dialeto do CSV: olha só o começo do arquivo (CSV_SNIFF_BYTES) uma vez
+# e o arquivo é lido uma única vez com encoding, separador e aspas detectados.
+# ---------------------------------------------------------------------------
+
+CSV_DELIMITERS = ",;\t|"
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def _latin1_fallback(err: UnicodeDecodeError):
+    """Handler de erro: bytes que não são UTF-8 válido são lidos como latin-1 (em vez de falhar)."""
+    return err.object[err.start:err.end].decode("latin-1"), err.end
+
+
+codecs.register_error("flowbase_latin1", _latin1_fallback)
+
+
+def sniff_csv(path: str, sample_bytes: int = CSV_SNIFF_BYTES) -> dict:
+    """
+    Detecta encoding, BOM, separador e aspas a partir do começo do arquivo.
+    Retorna o dialeto (gravado no report) com encoding, encoding_errors, bom, delimiter e quotechar.
+    """
+    with open(path, "rb") as f:
+        sample = f.read(sample_bytes)
+
+    dialect = {"encoding": "utf-8", "encoding_errors": "flowbase_latin1", "bom": None, "delimiter": ",", "quotechar": '"'}
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            dialect.update(encoding=encoding, encoding_errors="strict", bom=encoding)
+            break
+    else:
+        try:
+            # final=False: um caractere cortado no fim da amostra não conta como erro
+            codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        except UnicodeDecodeError:
+            dialect.update(encoding="latin-1", encoding_errors="strict")
+
+    text = sample.decode(dialect["encoding"], errors="replace")
+    if len(sample) == sample_bytes and "\n" in text:
+        text = text[: text.rindex("\n")]  # descarta a última linha, que pode estar cortada
+    try:
+        sniffed = csv.Sniffer().sniff(text, delimiters=CSV_DELIMITERS)
+        dialect["delimiter"] = sniffed.delimiter
+        dialect["quotechar"] = sniffed.quotechar or '"'
+    except csv.Error:
+        # Sniffer não decidiu: usa o separador que mais aparece no cabeçalho
+        header = text.splitlines()[0] if text else ""
+        counts = {d: header.count(d) for d in CSV_DELIMITERS}
+        best = max(counts, key=counts.get)
+        if counts[best] > 0:
+            dialect["delimiter"] = best
+    return dialect
+
+
+def estimate_rows(path: str, sample_bytes: int = CSV_SNIFF_BYTES, size: int | None = None) -> int | None:
+    """
+    Estimativa barata do número de linhas de dados (sem ler o arquivo inteiro), usada no roteamento.
+    CSV: quebras de linha na amostra do começo extrapoladas pelo tamanho (size, se path for só o começo
+    do arquivo). XLSX: dimensão da planilha. Retorna None se não der para estimar.
+    """
+    try:
+        if Path(path).suffix.lower() == ".csv":
+            size = os.path.getsize(path) if size is None else size
+            with open(path, "rb") as f:
+                sample = f.read(sample_bytes)
+            if not sample:
+                return 0
+            lines = sample.count(b"\n") + (0 if sample.endswith(b"\n") else 1)
+            if len(sample) < size:
+                lines = round(size * sample.count(b"\n") / len(sample))
+            return max(lines - 1, 0)
+        wb = load_workbook(path, read_only=True)
+        try:
+            max_row = wb.worksheets[0].max_row if wb.worksheets else 0
+        finally:
+            wb.close()
+        return None if max_row is None else max(max_row - 1, 0)
+    except Exception:
+        return None
+
+
+def _csv_read_kwargs(dialect: dict) -> dict:
+    """
+    Parâmetros do pd.read_csv para um dialeto detectado por sniff_csv. Células sempre como string e só
+    vazio vira NA (como no XLSX): a saída não depende do tamanho do arquivo nem da inferência de tipos.
+    """
+    return {
+        "dtype": str,
+        "keep_default_na": False,
+        "na_values": [""],
+        "encoding": dialect["encoding"],
+        "encoding_errors": dialect["encoding_errors"],
+        "sep": dialect["delimiter"],
+        "quotechar": dialect["quotechar"],
+    }
+
+
+def read_file(path: str, dialect: dict | None = None) -> pd.DataFrame:
+    """Lê XLSX ou CSV com pandas. Para CSV, usa o dialeto informado ou detecta com sniff_csv."""
+    p = Path(path)
+    if not p.exists():
+        raise FileNotFoundError(f"Arquivo não encontrado: {path}")
+    suf = p.suffix.lower()
+    if suf == ".xlsx":
+        return _read_xlsx(path)
+    if suf == ".csv":
+        dialect = dialect or sniff_csv(path)
+        return pd.read_csv(path, **_csv_read_kwargs(dialect))
+    raise ValueError("Aceito apenas .xlsx ou .csv")
+
+
+# ---------------------------------------------------------------------------
+# Leitura em blocos (modo streaming): memória depende do tamanho do bloco, não do arquivo.
+# Todas as células são lidas como string para que o tipo de uma coluna não mude entre blocos.
+# ---------------------------------------------------------------------------
+
+
+def _xlsx_header(values: tuple) -> list[str]:
+    """Cabeçalho do XLSX no mesmo formato do pandas: vazios viram "Unnamed: i", repetidos ganham ".1"."""
+    header = []
+    seen: dict[str, int] = {}
+    for i, v in enumerate(values):
+        name = f"Unnamed: {i}" if v is None or str(v).strip() == "" else str(v)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        header.append(name)
+    return header
+
+
+def _iter_xlsx_chunks(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Lê a primeira aba do XLSX linha a linha (openpyxl read_only) e agrupa em DataFrames.
+    Sempre gera pelo menos um DataFrame (vazio, só com o cabeçalho, se não houver linhas).
+    """
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        first = next(rows, None)
+        if first is None:
+            yield pd.DataFrame()
+            return
+        header = _xlsx_header(first)
+        width = len(header)
+        buf = []
+        yielded = False
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            cells = [None if v is None else str(v) for v in row[:width]]
+            cells.extend([None] * (width - len(cells)))
+            buf.append(cells)
+            if len(buf) >= chunk_rows:
+                yield pd.DataFrame(buf, columns=header, dtype=object)
+                buf = []
+                yielded = True
+        if buf or not yielded:
+            yield pd.DataFrame(buf, columns=header, dtype=object)
+    finally:
+        wb.close()
+
+
+def iter_file_chunks(
+    path: str, chunk_rows: int = STREAMING_CHUNK_ROWS, dialect: dict | None = None
+) -> Iterator[pd.DataFrame]:
+    """Lê XLSX ou CSV em blocos de até chunk_rows linhas (células como string)."""
     p = Path(path)
     if not p.exists():
         raise FileNotFoundError(f"Arquivo não encontrado: {path}")
     suf = p.suffix.lower()
     if suf == ".xlsx":
-        return pd.read_excel(path)
+        yield from _iter_xlsx_chunks(path, chunk_rows)
+        return
     if suf == ".csv":
+        dialect = dialect or sniff_csv(path)
+        with pd.read_csv(path, chunksize=chunk_rows, **_csv_read_kwargs(dialect)) as reader:
+            yield from reader
+        return
+    raise ValueError("Aceito apenas .xlsx ou .csv")
+
+
+# ---------------------------------------------------------------------------
+# Intermediário colunar: depois da primeira leitura, o upload já parseado vai para um arquivo
+# Arrow IPC ao lado do original. Retries e re-execuções abrem esse arquivo com memory-map em vez
+# de ler o XLSX/CSV de novo. O nome leva o hash do upload e PARSER_VERSION: mudou, não bate mais.
+# ---------------------------------------------------------------------------
+
+# Versão da leitura (sniff_csv, read_file, leitores de XLSX). Aumente quando o DataFrame lido mudar.
+PARSER_VERSION = "2"
+
+# pyarrow é opcional: sem ele o intermediário fica desligado e toda execução lê o upload
+_HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+_DIALECT_META = b"flowbase.csv_dialect"
+
+
+def intermediate_path(file_path: str, content_hash: str | None) -> Path | None:
+    """Caminho do intermediário do upload (None se desligado, sem pyarrow ou sem hash)."""
+    if not (INTERMEDIATE_CACHE_ENABLED and _HAS_PYARROW and content_hash):
+        return None
+    p = Path(file_path)
+    # O engine de XLSX entra no nome: calamine e openpyxl não geram exatamente as mesmas strings
+    reader = _xlsx_engine() if p.suffix.lower() == ".xlsx" else "csv"
+    return p.with_name(f"{p.name}.{content_hash[:16]}-p{PARSER_VERSION}-{reader}.arrow")
+
+
+class _IntermediateWriter:
+    """
+    Grava os blocos lidos num Arrow IPC temporário; commit() publica com os.replace.
+    Falha ao gravar só desliga o intermediário (o job segue normalmente).
+    """
+
+    def __init__(self, path: Path, dialect: dict | None):
+        self.path = path
+        self.tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        self.dialect = dialect
+        self.schema = None
+        self.writer = None
+        self.failed = False
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.failed:
+            return
+        import pyarrow as pa
+
         try:
-            return pd.read_csv(path, encoding="utf-8")
-        except UnicodeDecodeError:
-            return pd.read_csv(path, encoding="latin-1")
+            table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+            if self.writer is None:
+                meta = {**(table.schema.metadata or {}), _DIALECT_META: json.dumps(self.dialect).encode()}
+                self.schema = table.schema.with_metadata(meta)
+                table = table.replace_schema_metadata(meta)
+                self.writer = pa.ipc.new_file(str(self.tmp), self.schema)
+            self.writer.write_table(table)
+        except Exception as e:
+            # Ex.: coluna com tipos misturados que o Arrow não representa
+            logger.warning(f"[INTERMEDIATE] Não foi possível gravar {self.path.name}: {e}")
+            self.abort()
+
+    def tee(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        for chunk in chunks:
+            self.write(chunk)
+            yield chunk
+
+    def commit(self) -> None:
+        if self.failed or self.writer is None:
+            self.abort()
+            return
+        try:
+            self.writer.close()
+            os.replace(self.tmp, self.path)
+        except Exception as e:
+            logger.warning(f"[INTERMEDIATE] Não foi possível publicar {self.path.name}: {e}")
+            self.abort()
+            return
+        # Intermediários do mesmo upload com outra versão do parser/engine não servem mais
+        upload_name = self.path.name.rsplit(".", 2)[0]
+        for old in self.path.parent.glob(f"{glob.escape(upload_name)}.*.arrow"):
+            if old != self.path:
+                old.unlink(missing_ok=True)
+
+    def abort(self) -> None:
+        self.failed = True
+        if self.writer is not None:
+            try:
+                self.writer.close()
+            except Exception:
+                pass
+        self.tmp.unlink(missing_ok=True)
+
+
+def _open_intermediate(path: Path):
+    import pyarrow as pa
+
+    return pa.ipc.open_file(pa.memory_map(str(path)))
+
+
+def intermediate_dialect(path: Path) -> dict | None:
+    """Dialeto CSV detectado na primeira leitura (guardado nos metadados do intermediário)."""
+    meta = _open_intermediate(path).schema.metadata or {}
+    return json.loads(meta[_DIALECT_META]) if _DIALECT_META in meta else None
+
+
+def read_intermediate(path: Path) -> pd.DataFrame:
+    """DataFrame inteiro a partir do intermediário (memory-map, sem reparsear o upload)."""
+    return _open_intermediate(path).read_all().to_pandas()
+
+
+def iter_intermediate_chunks(path: Path) -> Iterator[pd.DataFrame]:
+    """Blocos do intermediário, um por record batch (os mesmos blocos gravados no streaming)."""
+    import pyarrow as pa
+
+    reader = _open_intermediate(path)
+    for i in range(reader.num_record_batches):
+        yield pa.Table.from_batches([reader.get_batch(i)]).to_pandas()
+
+
+def read_header(path: str, content_hash: str | None = None) -> list[str]:
+    """
+    Só o cabeçalho do upload, sem ler as linhas: nomes do schema do intermediário se ele existir,
+    senão a primeira linha do arquivo (CSV: nrows=0 com o dialeto detectado; XLSX: openpyxl read_only).
+    """
+    parsed = intermediate_path(path, content_hash)
+    if parsed is not None and parsed.exists():
+        return list(_open_intermediate(parsed).schema.names)
+    p = Path(path)
+    if not p.exists():
+        raise FileNotFoundError(f"Arquivo não encontrado: {path}")
+    suf = p.suffix.lower()
+    if suf == ".csv":
+        return [str(c) for c in pd.read_csv(path, nrows=0, **_csv_read_kwargs(sniff_csv(path))).columns]
+    if suf == ".xlsx":
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            first = next(wb.active.iter_rows(values_only=True, max_row=1), None)
+        finally:
+            wb.close()
+        return _xlsx_header(first) if first else []
     raise ValueError("Aceito apenas .xlsx ou .csv")
 
 
-def process_to_ghl(df: pd.DataFrame) -> pd.DataFrame:
-    """Mapeia e normaliza o DataFrame para as colunas GHL."""
-    mapping = _find_column_mapping(df)
-    unmapped = [c for c in df.columns if not any(mapping[ghl] == c for ghl in GHL_COLUMNS if mapping[ghl])]
+# ---------------------------------------------------------------------------
+# Engine vetorizado: aplica as mesmas regras de _row_to_ghl coluna a coluna
+# (Series inteiras), sem criar um dict por linha. Saída idêntica ao modo linha a linha.
+# ---------------------------------------------------------------------------
+
+EMAIL_COLUMNS = ("Email", "Additional Emails")
+PHONE_COLUMNS = ("Phone", "Additional Phone Numbers")
+
+
+def _cell_to_str(val) -> str:
+    """Mesma regra de _row_to_ghl para um valor isolado (NaN/0/vazio -> "", senão str + strip)."""
+    if pd.isna(val):
+        val = ""
+    return str(val).strip() if val else ""
+
+
+def _is_text_series(s: pd.Series) -> bool:
+    """True se a coluna só tem strings (ou vazios), caso em que dá para usar os métodos .str."""
+    if isinstance(s.dtype, pd.StringDtype):
+        return True
+    return s.dtype == object and infer_dtype(s, skipna=True) in ("string", "empty")
+
+
+def _series_to_str(s: pd.Series) -> pd.Series:
+    """Versão vetorizada de _cell_to_str para uma coluna inteira."""
+    if _is_text_series(s):
+        return s.fillna("").astype(object).str.strip()
+    if is_bool_dtype(s.dtype):
+        return s.map(_cell_to_str).astype(object)
+    if is_integer_dtype(s.dtype) or is_float_dtype(s.dtype):
+        # 0 é "falsy" no modo linha a linha, então vira vazio (igual a NaN)
+        out = s.astype(str).astype(object)
+        return out.where(s.notna() & (s != 0), "")
+    return s.map(_cell_to_str).astype(object)
+
+
+def _series_to_raw_str(s: pd.Series) -> pd.Series:
+    """Equivalente vetorizado de f"{val}" (sem strip), usado nas Notes das colunas não mapeadas."""
+    if _is_text_series(s):
+        return s.astype(object)
+    if (is_integer_dtype(s.dtype) or is_float_dtype(s.dtype)) and not is_bool_dtype(s.dtype):
+        return s.astype(str).astype(object)
+    return s.map(lambda v: f"{v}").astype(object)
+
+
+def _normalize_emails_series(s: pd.Series) -> pd.Series:
+    """
+    _normalize_emails para uma coluna já convertida em string.
+    Caminho rápido: célula com um único email (sem separador) vira só lowercase.
+    """
+    lowered = s.str.lower()
+    has_at = lowered.str.contains("@", regex=False)
+    has_sep = lowered.str.contains(r"[,;\s]", regex=True)
+    out = pd.Series("", index=s.index, dtype=object)
+    simple = has_at & ~has_sep
+    out[simple] = lowered[simple]
+    complex_ = has_at & has_sep
+    if complex_.any():
+        out[complex_] = s[complex_].map(_normalize_emails)
+    return out
+
+
+def _normalize_phones_series(s: pd.Series) -> pd.Series:
+    """
+    _normalize_phones_field para uma coluna já convertida em string (ignora células vazias).
+    Fatoriza a coluna: cada valor distinto é normalizado uma vez e o resultado é espalhado de volta.
+    """
+    out = pd.Series("", index=s.index, dtype=object)
+    filled = s != ""
+    if filled.any():
+        codes, uniques = pd.factorize(s[filled])
+        normalized = np.array([_normalize_phones_field(u) for u in uniques], dtype=object)
+        out[filled] = normalized[codes]
+    return out
+
+
+def _coerce_like_iterrows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    iterrows() converte cada linha para o tipo comum das colunas. Se todas as colunas são
+    numéricas (ex.: int + float), os inteiros viram float ("5" -> "5.0"). Replica isso.
+    """
+    dtypes = list(df.dtypes)
+    if len(set(dtypes)) > 1 and all(is_numeric_dtype(t) and not is_bool_dtype(t) for t in dtypes):
+        return df.astype(np.result_type(*dtypes))
+    return df
+
+
+def _unmapped_columns(df: pd.DataFrame, mapping: dict) -> list:
+    """Colunas da planilha que não foram mapeadas para nenhuma coluna GHL (vão para Notes)."""
+    return [c for c in df.columns if not any(mapping[ghl] == c for ghl in GHL_COLUMNS if mapping[ghl])]
+
+
+def _process_to_ghl_rowwise(df: pd.DataFrame, overrides: dict | None = None) -> pd.DataFrame:
+    """Engine original: uma linha por vez via iterrows + _row_to_ghl (mantido para comparação)."""
+    mapping = _find_column_mapping(df, overrides)
+    unmapped = _unmapped_columns(df, mapping)
 
     rows = []
     for _, row in df.iterrows():
@@ -196,6 +720,414 @@ def process_to_ghl(df: pd.DataFrame) -> pd.DataFrame:
     return pd.DataFrame(rows, columns=GHL_COLUMNS)
 
 
+def _process_to_ghl_vectorized(
+    df: pd.DataFrame, timings: dict | None = None, overrides: dict | None = None
+) -> pd.DataFrame:
+    """
+    Engine coluna a coluna: mesmas regras de _row_to_ghl aplicadas em Series inteiras.
+    Se timings for informado, soma em timings["normalize"] o tempo de email/telefone
+    e em timings["map"] o restante (mapeamento, cópia e Notes).
+    """
+    start = time.perf_counter()
+    normalize_seconds = 0.0
+    mapping = _find_column_mapping(df, overrides)
+    unmapped = _unmapped_columns(df, mapping)
+    if len(df) == 0:
+        return pd.DataFrame([], columns=GHL_COLUMNS)
+    df = _coerce_like_iterrows(df).reset_index(drop=True)
+
+    out = {}
+    for ghl_col in GHL_COLUMNS:
+        source_col = mapping[ghl_col]
+        if source_col is None:
+            out[ghl_col] = pd.Series("", index=df.index, dtype=object)
+            continue
+        values = _series_to_str(df[source_col])
+        if ghl_col in EMAIL_COLUMNS or ghl_col in PHONE_COLUMNS:
+            t0 = time.perf_counter()
+            if ghl_col in EMAIL_COLUMNS:
+                values = _normalize_emails_series(values)
+            else:
+                values = _normalize_phones_series(values)
+            normalize_seconds += time.perf_counter() - t0
+        out[ghl_col] = values
+
+    # Colunas não mapeadas: "col: valor" unidos por " | " e anexados às Notes
+    extra = pd.Series("", index=df.index, dtype=object)
+    for col in unmapped:
+        s = df[col]
+        raw = _series_to_raw_str(s)
+        present = s.notna() & (raw.str.strip() != "")
+        if not present.any():
+            continue
+        piece = f"{col}: " + raw[present]
+        has_extra = extra[present] != ""
+        extra[present] = piece.where(~has_extra, extra[present] + " | " + piece)
+    with_extra = extra != ""
+    if with_extra.any():
+        notes = out["Notes"]
+        notes[with_extra] = (notes[with_extra] + " | " + extra[with_extra]).str.strip(" | ")
+
+    result = pd.DataFrame(out, columns=GHL_COLUMNS)
+    if timings is not None:
+        timings["normalize"] = timings.get("normalize", 0.0) + normalize_seconds
+        timings["map"] = timings.get("map", 0.0) + time.perf_counter() - start - normalize_seconds
+    return result
+
+
+def process_to_ghl(
+    df: pd.DataFrame, engine: str | None = None, timings: dict | None = None, overrides: dict | None = None
+) -> pd.DataFrame:
+    """
+    Mapeia e normaliza o DataFrame para as colunas GHL.
+    engine: "vectorized" (padrão, coluna a coluna) ou "rowwise" (linha a linha, original).
+    Sem engine, usa PROCESSING_ENGINE do .env. timings (opcional) acumula segundos de map/normalize.
+    overrides (opcional): mapeamento informado pelo usuário (ver detect_column_mapping).
+    """
+    engine = engine or PROCESSING_ENGINE
+    if engine == "rowwise":
+        # Linha a linha não separa as etapas: todo o tempo conta como normalize
+        start = time.perf_counter()
+        result = _process_to_ghl_rowwise(df, overrides)
+        if timings is not None:
+            timings["normalize"] = timings.get("normalize", 0.0) + time.perf_counter() - start
+        return result
+    if engine == "vectorized":
+        return _process_to_ghl_vectorized(df, timings, overrides)
+    raise ValueError(f"Engine de processamento desconhecida: {engine}")
+
+
+def result_cache_key(content_hash: str, file_path: str, overrides: dict | None = None) -> str:
+    """
+    Chave do cache de resultados: hash do conteúdo + extensão (define o parser) + versão da lógica,
+    mais o hash do mapeamento quando o usuário informou um e a marca da deduplicação quando ligada.
+    No XLSX entra também o engine de leitura, como no nome do intermediário.
+    """
+    ext = Path(file_path).suffix.lower().lstrip(".")
+    if ext == "xlsx":
+        ext += f"-{_xlsx_engine()}"
+    key = f"{content_hash}-{ext}-v{PROCESSING_VERSION}"
+    if DEDUP_ENABLED:
+        key += "-dedup"
+    if overrides:
+        digest = hashlib.sha256(json.dumps(overrides, sort_keys=True).encode()).hexdigest()[:16]
+        key += f"-m{digest}"
+    return key
+
+
+def job_results(report: dict | None, preview: list | None) -> dict:
+    """
+    Valores das colunas report, preview e results_etag do job. O ETag é o hash do JSON compacto dos dois
+    (o mesmo texto guardado no banco). Sem report ou preview, tudo None: as rotas leem os arquivos.
+    """
+    if report is None or preview is None:
+        return {"report": None, "preview": None, "results_etag": None}
+    digest = hashlib.sha256(f"{json_dumps(report)}\n{json_dumps(preview)}".encode()).hexdigest()[:32]
+    return {"report": report, "preview": preview, "results_etag": digest}
+
+
+def load_job_results(job_id: str) -> dict:
+    """job_results a partir dos arquivos do job (resultado copiado do cache de resultados)."""
+    loaded = []
+    for name in (f"{job_id}_report.json", f"{job_id}_preview.json"):
+        data = storage.read_bytes(REPORTS_DIR / name)
+        loaded.append(json.loads(data) if data is not None else None)
+    return job_results(*loaded)
+
+
+def _use_streaming(path: str) -> bool:
+    """Arquivos a partir de STREAMING_THRESHOLD_BYTES são processados em blocos."""
+    return STREAMING_THRESHOLD_BYTES > 0 and Path(path).stat().st_size >= STREAMING_THRESHOLD_BYTES
+
+
+# Workers dividindo esta máquina: app.worker_pool informa o tamanho do pool antes do fork (1 = worker avulso)
+_worker_processes = 1
+
+
+def set_worker_processes(count: int) -> None:
+    """Chamado pelo pool de workers: com PARALLEL_WORKERS=0 os núcleos são divididos entre os workers."""
+    global _worker_processes
+    _worker_processes = max(count, 1)
+
+
+def _parallel_workers() -> int:
+    """
+    Número de processos do modo paralelo de um job: PARALLEL_WORKERS, ou com 0 os núcleos divididos
+    entre os workers do pool (no mínimo 1, ou seja, sem pool de conversão quando há um worker por núcleo).
+    """
+    if PARALLEL_WORKERS > 0:
+        return PARALLEL_WORKERS
+    return max((os.cpu_count() or 1) // _worker_processes, 1)
+
+
+def _split_rows(df: pd.DataFrame, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Divide o DataFrame em faixas de linhas consecutivas."""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def _transform_chunk(df: pd.DataFrame, overrides: dict | None = None) -> tuple[int, pd.DataFrame, dict]:
+    """Converte um bloco para GHL. Função de módulo para poder rodar no pool de processos."""
+    timings: dict = {}
+    return len(df), process_to_ghl(df, timings=timings, overrides=overrides), timings
+
+
+def _track_reads(chunks: Iterable[pd.DataFrame], tracker: ProgressTracker) -> Iterator[pd.DataFrame]:
+    """Mede o tempo de leitura de cada bloco e conta as linhas lidas."""
+    it = iter(chunks)
+    while True:
+        with tracker.track("read"):
+            chunk = next(it, None)
+        if chunk is None:
+            return
+        tracker.update(rows_read=tracker.counters["rows_read"] + len(chunk))
+        tracker.set_stage("normalize")
+        yield chunk
+
+
+def _transform_chunks(
+    chunks: Iterable[pd.DataFrame], workers: int = 1, overrides: dict | None = None, min_rows: int = 0
+) -> Iterator[tuple[int, pd.DataFrame, dict]]:
+    """
+    Converte os blocos para GHL devolvendo (linhas de entrada, DataFrame GHL, tempos) na ordem original.
+    Com workers > 1 usa um pool de processos; no máximo 2 blocos por processo ficam em voo,
+    para a memória não crescer com o tamanho do arquivo. O pool só sobe depois de min_rows linhas
+    convertidas no próprio processo e se ainda restarem pelo menos 2 blocos (streaming, em que o total
+    de linhas não é conhecido de antemão): arquivo pequeno não paga o custo de subir o pool.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield _transform_chunk(chunk, overrides)
+        return
+    chunks = iter(chunks)
+    converted = 0
+    chunk = next(chunks, None)
+    while True:
+        if chunk is None:
+            return
+        following = next(chunks, None)
+        if converted >= min_rows and following is not None:
+            break
+        converted += len(chunk)
+        yield _transform_chunk(chunk, overrides)
+        chunk = following
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chain([chunk, following], chunks):
+            pending.append(pool.submit(_transform_chunk, chunk, overrides))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _write_ghl_output(
+    chunks: Iterable[tuple[int, pd.DataFrame, dict]],
+    output_csv_path: Path,
+    tracker: ProgressTracker | None = None,
+    index_path: Path | None = None,
+    compress_as: Path | None = None,
+) -> dict:
+    """
+    Grava os blocos já convertidos (linhas de entrada, DataFrame GHL, tempos) no CSV de saída, em ordem.
+    Acumula os contadores do report e guarda as primeiras PREVIEW_ROWS linhas para o preview.
+    Com tracker, registra tempo de escrita, linhas convertidas e bytes gravados.
+    Com index_path, grava também o índice de linhas (app.row_index) a partir dos mesmos bytes, e com
+    compress_as as variantes comprimidas para download (app.downloads) com o nome desse CSV.
+    """
+    stats = {"total_rows": 0, "rows_output": 0, "with_email": 0, "with_phone": 0, "preview": []}
+    # O BOM do utf-8-sig vem antes da primeira linha
+    rows_index = RowIndexWriter(position=len(codecs.BOM_UTF8)) if index_path is not None else None
+    copies = CompressedCopies(compress_as) if compress_as is not None else None
+    if copies is not None:
+        copies.write(codecs.BOM_UTF8)
+
+    def write(df: pd.DataFrame, header: bool) -> None:
+        text = df.to_csv(index=False, header=header)
+        f.write(text)
+        if rows_index is not None or copies is not None:
+            data = text.encode("utf-8")
+            if rows_index is not None:
+                rows_index.add(data)
+            if copies is not None:
+                copies.write(data)
+
+    try:
+        with open(output_csv_path, "w", encoding="utf-8-sig", newline="") as f:
+            header = True
+            for rows_in, ghl_df, timings in chunks:
+                if tracker is None:
+                    write(ghl_df, header)
+                else:
+                    for stage, seconds in timings.items():
+                        tracker.add_seconds(stage, seconds)
+                    with tracker.track("write"):
+                        write(ghl_df, header)
+                        f.flush()
+                    tracker.update(
+                        rows_transformed=tracker.counters["rows_transformed"] + rows_in,
+                        bytes_written=os.fstat(f.fileno()).st_size,
+                    )
+                header = False
+                stats["total_rows"] += rows_in
+                stats["rows_output"] += len(ghl_df)
+                stats["with_email"] += int((ghl_df["Email"].astype(str).str.strip() != "").sum())
+                stats["with_phone"] += int((ghl_df["Phone"].astype(str).str.strip() != "").sum())
+                missing = PREVIEW_ROWS - len(stats["preview"])
+                if missing > 0:
+                    stats["preview"].extend(ghl_df.head(missing).to_dict(orient="records"))
+            if header:
+                # Nenhum bloco (arquivo vazio): grava só o cabeçalho
+                write(pd.DataFrame([], columns=GHL_COLUMNS), True)
+    except Exception:
+        if copies is not None:
+            copies.abort()
+        raise
+    if rows_index is not None:
+        rows_index.save(index_path)
+    if copies is not None:
+        copies.commit()
+    return stats
+
+
+def _index_for_dedup(
+    chunks: Iterable[tuple[int, pd.DataFrame, dict]], index: dedup.DedupIndex
+) -> Iterator[tuple[int, pd.DataFrame, dict]]:
+    """Indexa emails/telefones de cada bloco convertido antes da escrita (tempo conta como dedup)."""
+    for rows_in, ghl_df, timings in chunks:
+        start = time.perf_counter()
+        index.add(ghl_df)
+        timings["dedup"] = timings.get("dedup", 0.0) + time.perf_counter() - start
+        yield rows_in, ghl_df, timings
+
+
+def _deduplicate_output(
+    predup_path: Path, output_csv_path: Path, index: dedup.DedupIndex, stats: dict, tracker: ProgressTracker
+) -> dict:
+    """
+    Segunda passada da deduplicação: regrava o CSV sem as linhas repetidas (só renomeia se não houver
+    nenhuma). Recalcula os contadores do report sobre a saída final e acrescenta rows_merged.
+    """
+    try:
+        with tracker.track("dedup"):
+            representatives = index.representatives()
+            merged = int((representatives != np.arange(len(representatives))).sum())
+            if merged:
+                chunks = dedup.iter_deduplicated(predup_path, representatives, STREAMING_CHUNK_ROWS)
+                deduped = _write_ghl_output(
+                    ((0, df, {}) for df in chunks),
+                    output_csv_path,
+                    index_path=row_index_path(output_csv_path),
+                    compress_as=output_csv_path,
+                )
+                stats = {**deduped, "total_rows": stats["total_rows"], "input_source": stats["input_source"]}
+            else:
+                os.replace(predup_path, output_csv_path)
+    finally:
+        predup_path.unlink(missing_ok=True)
+    stats["rows_merged"] = merged
+    return stats
+
+
+def convert_file(
+    file_path: str,
+    output_csv_path: Path,
+    tracker: ProgressTracker,
+    workers: int | None = None,
+    content_hash: str | None = None,
+    overrides: dict | None = None,
+    deduplicate: bool | None = None,
+) -> tuple[dict, dict | None]:
+    """
+    Lê o arquivo e grava o CSV GHL (streaming/paralelo conforme o tamanho), sem tocar no banco.
+    Com content_hash, lê do intermediário colunar se ele existir, ou o grava durante a leitura.
+    overrides: mapeamento de colunas informado pelo usuário (None = detecção automática).
+    deduplicate: junta contatos repetidos (None = DEDUP_ENABLED); acrescenta rows_merged aos contadores.
+    Retorna (contadores de _write_ghl_output + input_source, dialeto CSV ou None).
+    Usado por process_job e pelo benchmark.
+    """
+    workers = _parallel_workers() if workers is None else workers
+    parsed = intermediate_path(file_path, content_hash)
+    from_intermediate = parsed is not None and parsed.exists()
+    writer = None
+    with tracker.track("read"):
+        streaming = _use_streaming(file_path)
+        if from_intermediate:
+            dialect = intermediate_dialect(parsed)
+            df = None if streaming else read_intermediate(parsed)
+        else:
+            dialect = sniff_csv(file_path) if Path(file_path).suffix.lower() == ".csv" else None
+            df = None if streaming else read_file(file_path, dialect)
+            if parsed is not None:
+                writer = _IntermediateWriter(parsed, dialect)
+                if df is not None:
+                    writer.write(df)
+                    writer.commit()
+
+    if streaming:
+        if from_intermediate:
+            source = iter_intermediate_chunks(parsed)
+        else:
+            source = iter_file_chunks(file_path, STREAMING_CHUNK_ROWS, dialect)
+            if writer is not None:
+                source = writer.tee(source)
+        # Em streaming o total de linhas só é conhecido no fim
+        chunks = _track_reads(source, tracker)
+    else:
+        tracker.update(rows_read=len(df), total_rows=len(df))
+        tracker.set_stage("normalize")
+        if workers > 1 and len(df) >= PARALLEL_MIN_ROWS:
+            # Abaixo de PARALLEL_MIN_ROWS o custo de subir o pool não compensa
+            chunks = _split_rows(df, PARALLEL_CHUNK_ROWS)
+        else:
+            chunks = [df]
+            workers = 1
+
+    deduplicate = DEDUP_ENABLED if deduplicate is None else deduplicate
+    # Em streaming o limite de PARALLEL_MIN_ROWS é aplicado durante a conversão
+    converted = _transform_chunks(chunks, workers, overrides, PARALLEL_MIN_ROWS if streaming else 0)
+    # Com deduplicação a primeira escrita vai para um arquivo temporário, regravado depois sem as repetidas
+    # (índice de linhas e variantes comprimidas já ficam com o nome final: valem se nenhuma linha for juntada)
+    target = output_csv_path
+    if deduplicate:
+        index = dedup.DedupIndex()
+        converted = _index_for_dedup(converted, index)
+        target = output_csv_path.with_name(f"{output_csv_path.name}.predup")
+    try:
+        stats = _write_ghl_output(
+            converted, target, tracker, index_path=row_index_path(output_csv_path), compress_as=output_csv_path
+        )
+    except Exception:
+        if streaming and writer is not None:
+            writer.abort()
+        if deduplicate:
+            target.unlink(missing_ok=True)
+        raise
+    if streaming and writer is not None:
+        writer.commit()
+    tracker.update(total_rows=stats["total_rows"])
+    stats["input_source"] = "intermediate" if from_intermediate else "upload"
+    if deduplicate:
+        stats = _deduplicate_output(target, output_csv_path, index, stats, tracker)
+    return stats, dialect
+
+
+def _record_job_metrics(job: Job, timings: dict, total_rows: int, file_size: int | None) -> None:
+    """
+    Histogramas por etapa, linhas, tamanho do arquivo e cache de telefones (GET /metrics do worker).
+    file_size vem da cópia local do worker: job.file_path é o caminho gravado pela API.
+    """
+    for stage, seconds in timings.items():
+        metrics.JOB_STAGE_DURATION.labels(stage).observe(seconds)
+    metrics.ROWS_PROCESSED.inc(total_rows)
+    if file_size is not None:
+        metrics.JOB_FILE_SIZE.observe(file_size)
+    metrics.JOBS_FINISHED.labels("done", job.queue_name or "default").inc()
+    info = phone_cache_info()
+    for field in ("hits", "misses", "size"):
+        metrics.PHONE_CACHE.labels(field).set(info[field])
+
+
 def process_job(job_id: str) -> None:
     """
     Processa um job: lê o arquivo, gera CSV GHL, report.json e preview.
@@ -203,57 +1135,112 @@ def process_job(job_id: str) -> None:
     Roda no worker RQ (processo separado do FastAPI).
     """
     db: Session | None = None
+    local_files: list[Path] = []
     try:
         db = SessionLocal()
         job = db.query(Job).filter(Job.id == job_id).first()
         if not job:
             return
         job.status = "processing"
+        job.started_at = datetime.utcnow()
         db.commit()
+        publish_job_status(job_id, "processing")
+        if job.queued_at:
+            metrics.QUEUE_WAIT.labels(job.queue_name or "default").observe(
+                (job.started_at - job.queued_at).total_seconds()
+            )
 
+        # Com armazenamento remoto o upload (e o intermediário, se já existir) é baixado para este host
         try:
-            df = read_file(job.file_path)
-        except Exception as e:
-            job.status = "failed"
-            job.error_message = str(e)
-            db.commit()
-            return
-
-        ghl_df = process_to_ghl(df)
+            file_path = str(storage.ensure_local(job.file_path))
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Arquivo não encontrado: {job.file_path}")
+        local_files.append(Path(file_path))
+        parsed = intermediate_path(file_path, job.content_hash)
+        if parsed is not None:
+            storage.ensure_local(parsed, missing_ok=True)
+            local_files.append(parsed)
+        tracker = ProgressTracker(job_id, Path(file_path).stat().st_size)
 
         OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
         REPORTS_DIR.mkdir(parents=True, exist_ok=True)
 
         output_csv_path = OUTPUTS_DIR / f"{job_id}.csv"
-        ghl_df.to_csv(output_csv_path, index=False, encoding="utf-8-sig")
-
-        total_rows = len(df)
-        rows_output = len(ghl_df)
-        with_email = (ghl_df["Email"].astype(str).str.strip() != "").sum()
-        with_phone = (ghl_df["Phone"].astype(str).str.strip() != "").sum()
-        pct_email = round(100 * with_email / rows_output, 1) if rows_output else 0
-        pct_phone = round(100 * with_phone / rows_output, 1) if rows_output else 0
-
-        report = {
-            "total_rows": total_rows,
-            "rows_output": rows_output,
-            "pct_with_email": pct_email,
-            "pct_with_phone": pct_phone,
-            "created_at": datetime.utcnow().isoformat() + "Z",
-        }
         report_path = REPORTS_DIR / f"{job_id}_report.json"
-        report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
-
-        preview_df = ghl_df.head(20)
-        preview_data = preview_df.to_dict(orient="records")
         preview_path = REPORTS_DIR / f"{job_id}_preview.json"
-        preview_path.write_text(json.dumps(preview_data, ensure_ascii=False, indent=2), encoding="utf-8")
+        # Os arquivos podem ser hardlinks do cache de resultados: remove antes de regravar
+        sidecars = [row_index_path(output_csv_path), *compressed_paths(output_csv_path).values()]
+        outputs = [output_csv_path, *sidecars, preview_path, report_path]
+        storage.remove(*outputs)
+        local_files.extend(outputs)
+        overrides = json.loads(job.column_mapping) if job.column_mapping else None
+        stats, dialect = convert_file(
+            file_path, output_csv_path, tracker, content_hash=job.content_hash, overrides=overrides
+        )
+
+        with tracker.track("report"):
+            rows_output = stats["rows_output"]
+            pct_email = round(100 * stats["with_email"] / rows_output, 1) if rows_output else 0
+            pct_phone = round(100 * stats["with_phone"] / rows_output, 1) if rows_output else 0
+
+            report = {
+                "total_rows": stats["total_rows"],
+                "rows_output": rows_output,
+                "pct_with_email": pct_email,
+                "pct_with_phone": pct_phone,
+                "csv_dialect": dialect,
+                "input_source": stats["input_source"],
+                # Linhas removidas por serem o mesmo contato (email/telefone) de uma linha anterior
+                "rows_merged": stats.get("rows_merged", 0),
+                "column_mapping_overrides": overrides,
+                "created_at": datetime.utcnow().isoformat() + "Z",
+            }
+            preview_path.write_text(json_dumps(stats["preview"]), encoding="utf-8")
+        # Em modo paralelo map/normalize somam o tempo de CPU de todos os workers
+        report["timings"] = tracker.timings()
+        # Os arquivos ficam para o cache de resultados; as rotas leem report e preview das colunas do job
+        report_path.write_text(json_dumps(report), encoding="utf-8")
+        # CSV antes das variantes e do índice (que não podem parecer mais velhos que ele)
+        storage.publish(*outputs)
+        if stats["input_source"] == "upload":
+            try:
+                storage.publish(parsed)
+            except Exception:
+                pass  # o intermediário é só otimização para retries
+        tracker.flush(force=True)
 
         job.status = "done"
         job.output_csv_path = str(output_csv_path.resolve())
         job.report_json_path = str(report_path.resolve())
+        for name, value in job_results(report, stats["preview"]).items():
+            setattr(job, name, value)
         job.error_message = None
+        job.delivery_status = "queued" if GHL_DELIVERY_ENABLED else None
+        job.delivery_error = None
         db.commit()
+        publish_job_status(job_id, "done")
+        if GHL_DELIVERY_ENABLED:
+            try:
+                delivery.schedule(job_id)
+            except Exception as e:
+                # A conversão continua concluída; a entrega pode ser refeita por POST /jobs/{id}/delivery
+                logger.warning(f"[DELIVERY] Job {job_id}: não foi possível enfileirar a entrega: {e}")
+                job.delivery_status = "failed"
+                job.delivery_error = str(e)
+                db.commit()
+        try:
+            _record_job_metrics(job, report["timings"], stats["total_rows"], tracker.file_size_bytes)
+        except Exception as e:
+            # Métricas nunca mudam o status de um job já concluído
+            logger.warning(f"[METRICS] Não foi possível registrar as métricas do job {job_id}: {e}")
+
+        if job.content_hash:
+            try:
+                result_cache.store(
+                    result_cache_key(job.content_hash, job.file_path, overrides), output_csv_path, report_path, preview_path
+                )
+            except Exception:
+                pass  # o cache é só otimização: o job já está concluído
     except Exception as e:
         if db is not None:
             try:
@@ -262,8 +1249,11 @@ def process_job(job_id: str) -> None:
                     job.status = "failed"
                     job.error_message = str(e)
                     db.commit()
+                    publish_job_status(job_id, "failed", job.error_message)
+                    metrics.JOBS_FINISHED.labels("failed", job.queue_name or "default").inc()
             except Exception:
                 pass
     finally:
+        storage.release(*local_files)
         if db is not None:
             db.close()
@@ -0,0 +1,115 @@
+# Progresso dos jobs em processamento: o worker grava num hash do Redis (barato de atualizar,
+# sem commits repetidos no Job) e a API lê esse hash em GET /jobs/{job_id}.
+import json
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from redis import asyncio as aioredis
+
+from app.config import REDIS_URL
+from app.queue_rq import redis_conn
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "flowbase:progress:"
+# O progresso só interessa enquanto o job roda; depois expira sozinho
+TTL_SECONDS = 24 * 3600
+# Intervalo mínimo entre gravações no Redis (mudança de etapa sempre grava)
+FLUSH_INTERVAL_SECONDS = 0.5
+
+STAGES = ("read", "map", "normalize", "write", "dedup", "report")
+
+_aioredis = aioredis.Redis.from_url(REDIS_URL)
+
+
+class ProgressTracker:
+    """Contadores e tempo por etapa de um job; publica no Redis com throttle."""
+
+    def __init__(self, job_id: str, file_size_bytes: int | None = None, publish: bool = True):
+        self.job_id = job_id
+        # publish=False: só mede (benchmark/uso local), sem gravar no Redis
+        self.publish = publish
+        self.started = time.perf_counter()
+        self.stage = "read"
+        self.counters = {"rows_read": 0, "rows_transformed": 0, "bytes_written": 0, "total_rows": None}
+        self.file_size_bytes = file_size_bytes
+        self.stage_seconds = {s: 0.0 for s in STAGES}
+        self._last_flush = 0.0
+
+    @contextmanager
+    def track(self, stage: str):
+        """Marca a etapa atual e soma o tempo gasto dentro do bloco."""
+        self.set_stage(stage)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[stage] += time.perf_counter() - start
+
+    def set_stage(self, stage: str) -> None:
+        if stage != self.stage:
+            self.stage = stage
+            self.flush(force=True)
+
+    def add_seconds(self, stage: str, seconds: float) -> None:
+        """Soma tempo medido fora do processo (ex.: blocos convertidos no pool paralelo)."""
+        self.stage_seconds[stage] += seconds
+
+    def update(self, **counters) -> None:
+        for name, value in counters.items():
+            self.counters[name] = value
+        self.flush()
+
+    def timings(self) -> dict:
+        """Segundos por etapa + total (em modo paralelo, map/normalize somam o tempo de todos os processos)."""
+        out = {s: round(v, 4) for s, v in self.stage_seconds.items()}
+        out["total"] = round(time.perf_counter() - self.started, 4)
+        return out
+
+    def flush(self, force: bool = False) -> None:
+        if not self.publish:
+            return
+        now = time.perf_counter()
+        if not force and now - self._last_flush < FLUSH_INTERVAL_SECONDS:
+            return
+        self._last_flush = now
+        data = {
+            "stage": self.stage,
+            **{k: "" if v is None else str(v) for k, v in self.counters.items()},
+            "file_size_bytes": "" if self.file_size_bytes is None else str(self.file_size_bytes),
+            "stage_seconds": json.dumps(self.timings()),
+            "updated_at": datetime.utcnow().isoformat() + "Z",
+        }
+        key = KEY_PREFIX + self.job_id
+        try:
+            pipe = redis_conn.pipeline()
+            pipe.hset(key, mapping=data)
+            pipe.expire(key, TTL_SECONDS)
+            pipe.execute()
+        except Exception as e:
+            # Progresso é informativo: falha no Redis não interrompe o job
+            logger.warning(f"[PROGRESS] Não foi possível gravar progresso do job {self.job_id}: {e}")
+
+
+def _decode(raw: dict) -> dict:
+    data = {k.decode(): v.decode() for k, v in raw.items()}
+    out: dict = {"stage": data.get("stage"), "updated_at": data.get("updated_at")}
+    for name in ("rows_read", "rows_transformed", "bytes_written", "total_rows", "file_size_bytes"):
+        value = data.get(name)
+        out[name] = int(value) if value else None
+    out["stage_seconds"] = json.loads(data["stage_seconds"]) if data.get("stage_seconds") else {}
+    if out["total_rows"]:
+        out["pct"] = round(100 * (out["rows_transformed"] or 0) / out["total_rows"], 1)
+    return out
+
+
+async def get_progress(job_id: str) -> dict | None:
+    """Progresso atual do job (usado pela API) ou None se não houver registro."""
+    try:
+        raw = await _aioredis.hgetall(KEY_PREFIX + job_id)
+    except Exception as e:
+        logger.warning(f"[PROGRESS] Redis indisponível: {e}")
+        return None
+    return _decode(raw) if raw else None
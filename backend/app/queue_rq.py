@@ -4,5 +4,14 @@ from rq import Queue
 
 from app.config import REDIS_URL
 
-_redis = Redis.from_url(REDIS_URL)
-queue = Queue("default", connection=_redis)
+redis_conn = Redis.from_url(REDIS_URL)
+# Filas por tamanho (ver app.scheduler); "default" fica para jobs enfileirados antes da divisão
+FAST_QUEUE = "fast"
+BULK_QUEUE = "bulk"
+# Entrega para a API de contatos (app.delivery): passa horas esperando a API (429/backoff), então
+# fica fora das filas padrão e tem workers próprios (WORKER_DELIVERY_RESERVED no pool)
+DELIVERY_QUEUE = "delivery"
+WORKER_QUEUES = [FAST_QUEUE, BULK_QUEUE, "default"]
+queue = Queue("default", connection=redis_conn)
+delivery_queue = Queue(DELIVERY_QUEUE, connection=redis_conn)
+queues = {name: Queue(name, connection=redis_conn) for name in (FAST_QUEUE, BULK_QUEUE)}
@@ -0,0 +1,219 @@
+# Cache de resultados por conteúdo: uploads idênticos reaproveitam CSV, report e preview
+# de um job já concluído, sem passar pela fila. Cada entrada é uma pasta em storage/cache/
+# com hardlinks dos arquivos gerados; a eviction (LRU por mtime) segura o espaço em disco que só o
+# cache ocupa: arquivos ainda ligados a um job (hardlink com outro nome) não contam, porque remover
+# a entrada não liberaria nada enquanto o job existir.
+# Com STORAGE_BACKEND=s3 as entradas ficam no bucket (cache/<chave>/) e são copiadas no servidor.
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+from app.config import CACHE_DIR, OUTPUTS_DIR, REPORTS_DIR, RESULT_CACHE_ENABLED, RESULT_CACHE_MAX_MB
+from app.downloads import compressed_paths
+from app import storage
+from app.metrics import count_cache
+from app.object_store import get_store
+from app.queue_rq import redis_conn
+from app.row_index import row_index_path
+
+logger = logging.getLogger(__name__)
+
+# Contadores no Redis para a taxa de acerto ser a mesma vista pela API e pelo worker
+_STATS_KEY = "flowbase:result_cache:stats"
+
+_OUTPUT_NAME = "output.csv"
+_REPORT_NAME = "report.json"
+_PREVIEW_NAME = "preview.json"
+_INDEX_NAME = "rows.idx.npy"
+# Variantes comprimidas do CSV (app.downloads), por Content-Encoding
+_COMPRESSED_NAMES = {"gzip": "output.csv.gz", "zstd": "output.csv.zst"}
+_REQUIRED_NAMES = (_OUTPUT_NAME, _REPORT_NAME, _PREVIEW_NAME)
+
+
+def _count(field: str) -> None:
+    """Incrementa hits/misses no Redis. Falha no Redis não pode derrubar o upload."""
+    count_cache("result", field == "hits")
+    try:
+        redis_conn.hincrby(_STATS_KEY, field, 1)
+    except Exception as e:
+        logger.warning(f"[CACHE] Não foi possível atualizar contadores: {e}")
+
+
+def _result_files(output_csv_path: Path, report_path: Path, preview_path: Path) -> dict[str, Path]:
+    """
+    Nome na entrada -> arquivo do job. O CSV vem antes do índice e das variantes (não podem parecer mais
+    velhos que ele) e o report por último (no bucket, entrada sem report = incompleta).
+    """
+    files = {_OUTPUT_NAME: output_csv_path, _INDEX_NAME: row_index_path(output_csv_path)}
+    for encoding, path in compressed_paths(output_csv_path).items():
+        files[_COMPRESSED_NAMES[encoding]] = path
+    files[_PREVIEW_NAME] = preview_path
+    files[_REPORT_NAME] = report_path
+    return files
+
+
+def _entry_key(key: str) -> str:
+    return storage.storage_key(CACHE_DIR / key)
+
+
+def lookup(key: str, job_id: str) -> tuple[str, str] | None:
+    """
+    Procura um resultado pronto para a chave. Se existir, cria CSV, report e preview do job_id
+    a partir dele e retorna (output_csv_path, report_json_path). Senão retorna None.
+    No armazenamento local são hardlinks; no bucket, cópias feitas pelo próprio servidor S3.
+    """
+    if not RESULT_CACHE_ENABLED:
+        return None
+    object_store = get_store()
+    output_csv_path = OUTPUTS_DIR / f"{job_id}.csv"
+    report_path = REPORTS_DIR / f"{job_id}_report.json"
+    preview_path = REPORTS_DIR / f"{job_id}_preview.json"
+    files = _result_files(output_csv_path, report_path, preview_path)
+    try:
+        for name, path in files.items():
+            source = f"{_entry_key(key)}/{name}"
+            # Índice de linhas e variantes comprimidas são opcionais (entradas antigas não têm): sem o
+            # índice, GET /rows o refaz; sem variante, o download sai sem compressão
+            if name in _REQUIRED_NAMES or object_store.exists(source):
+                object_store.copy(source, storage.storage_key(path))
+            else:
+                storage.remove(path)
+        if not object_store.remote:
+            os.utime(CACHE_DIR / key)  # marca como usado recentemente (LRU)
+    except FileNotFoundError:
+        # Entrada inexistente (ou removida pela eviction no meio do caminho)
+        storage.remove(output_csv_path, report_path, preview_path)
+        _count("misses")
+        return None
+    _count("hits")
+    return str(output_csv_path.resolve()), str(report_path.resolve())
+
+
+def store(key: str, output_csv_path: Path, report_path: Path, preview_path: Path) -> None:
+    """Guarda o resultado de um job concluído no cache (chamado pelo worker) e roda a eviction."""
+    if not RESULT_CACHE_ENABLED:
+        return
+    files = _result_files(output_csv_path, report_path, preview_path)
+    if get_store().remote:
+        _store_remote(key, files)
+        return
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    entry = CACHE_DIR / key
+    if entry.exists():
+        return
+    # Monta numa pasta temporária e renomeia: quem faz lookup nunca vê entrada pela metade
+    tmp = CACHE_DIR / f".tmp-{uuid.uuid4()}"
+    tmp.mkdir()
+    store = get_store()
+    try:
+        for name, path in files.items():
+            if name in _REQUIRED_NAMES or path.exists():
+                # Hardlink (ou cópia, se o sistema de arquivos não suportar)
+                store.copy(storage.storage_key(path), storage.storage_key(tmp / name))
+        os.rename(tmp, entry)
+    except OSError:
+        # Outro worker gravou a mesma chave antes
+        shutil.rmtree(tmp, ignore_errors=True)
+        return
+    evict()
+
+
+def _store_remote(key: str, files: dict[str, Path]) -> None:
+    """
+    No bucket: copia os arquivos já publicados do job para cache/<chave>/, com o report por último.
+    A eviction fica com uma regra de ciclo de vida do bucket no prefixo cache/ (RESULT_CACHE_MAX_MB
+    vale só para o armazenamento local).
+    """
+    object_store = get_store()
+    entry = _entry_key(key)
+    if object_store.exists(f"{entry}/{_REPORT_NAME}"):
+        return
+    for name, path in files.items():
+        source = storage.storage_key(path)
+        if name in _REQUIRED_NAMES or object_store.exists(source):
+            object_store.copy(source, f"{entry}/{name}")
+
+
+def _entry_size(entry: Path) -> tuple[int, int]:
+    """
+    (bytes só do cache, bytes compartilhados). Arquivo com um único link existe só na entrada; com mais
+    links ainda é o CSV/report de algum job e remover a entrada não libera espaço.
+    """
+    own = shared = 0
+    for f in entry.iterdir():
+        if not f.is_file():
+            continue
+        st = f.stat()
+        if st.st_nlink > 1:
+            shared += st.st_size
+        else:
+            own += st.st_size
+    return own, shared
+
+
+def evict(max_bytes: int | None = None) -> int:
+    """
+    Remove as entradas menos usadas até os bytes que só o cache ocupa ficarem abaixo de max_bytes
+    (padrão RESULT_CACHE_MAX_MB). Entradas cujos arquivos ainda são de algum job ficam: removê-las não
+    liberaria disco. Retorna quantas entradas foram removidas.
+    """
+    if max_bytes is None:
+        max_bytes = RESULT_CACHE_MAX_MB * 1024 * 1024
+    if not CACHE_DIR.exists():
+        return 0
+    entries = []
+    for entry in CACHE_DIR.iterdir():
+        if not entry.is_dir() or entry.name.startswith(".tmp-"):
+            continue
+        try:
+            entries.append((entry.stat().st_mtime, _entry_size(entry)[0], entry))
+        except FileNotFoundError:
+            continue
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, entry in sorted(entries, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        if not size:
+            continue
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def stats() -> dict:
+    """Hits, misses, taxa de acerto e tamanho atual do cache (só do cache e compartilhado com jobs)."""
+    try:
+        raw = redis_conn.hgetall(_STATS_KEY)
+    except Exception:
+        raw = {}
+    hits = int(raw.get(b"hits", 0))
+    misses = int(raw.get(b"misses", 0))
+    total = hits + misses
+    entries = 0
+    size_bytes = 0
+    shared_bytes = 0
+    if CACHE_DIR.exists():
+        for entry in CACHE_DIR.iterdir():
+            if entry.is_dir() and not entry.name.startswith(".tmp-"):
+                entries += 1
+                try:
+                    own, shared = _entry_size(entry)
+                except FileNotFoundError:
+                    continue
+                size_bytes += own
+                shared_bytes += shared
+    return {
+        "enabled": RESULT_CACHE_ENABLED,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+        "entries": entries,
+        # size_bytes: só do cache (o que RESULT_CACHE_MAX_MB limita); shared_bytes: hardlinks com jobs
+        "size_bytes": size_bytes,
+        "shared_bytes": shared_bytes,
+        "max_bytes": RESULT_CACHE_MAX_MB * 1024 * 1024,
+    }
@@ -1,20 +1,34 @@
 # Endpoints de jobs: upload, status, preview, download, report
+import asyncio
 import json
 import re
 import uuid
+from datetime import datetime
 from pathlib import Path
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Text, cast, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import get_current_user
-from app.config import REPORTS_DIR
-from app.db import get_db
+from app.config import CSV_SNIFF_BYTES, GHL_DELIVERY_ENABLED, MAX_UPLOAD_MB, REPORTS_DIR
+from app.db import get_async_db
 from app.models import Job, User
-from app.processing import process_job
-from app.queue_rq import queue
-from app.storage import allowed_file, save_upload
+from app import delivery, downloads, events, progress, result_cache, row_index, scheduler, storage
+from app.processing import (
+    GHL_COLUMNS,
+    detect_column_mapping,
+    job_results,
+    load_job_results,
+    read_header,
+    result_cache_key,
+    validate_mapping_overrides,
+)
+from app.storage import FileTooLargeError
+from app.uploads import UPLOAD_OPENAPI, InvalidUploadError, receive_upload
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
@@ -22,6 +36,11 @@ router = APIRouter(prefix="/jobs", tags=["jobs"])
 UUID_PATTERN = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
 
 
+class MappingRequest(BaseModel):
+    # Coluna GHL -> coluna da planilha (null desmapeia). Vazio volta para a detecção automática.
+    mapping: dict[str, str | None]
+
+
 def _validate_job_id(job_id: str) -> None:
     """Valida que job_id é um UUID válido. Levanta 422 se inválido (ex: 'GET /jobs/' concatenado)."""
     if not job_id or not isinstance(job_id, str):
@@ -34,62 +53,122 @@ def _validate_job_id(job_id: str) -> None:
         )
 
 
-def _get_job_or_404(job_id: str, db: Session, current_user: User) -> Job:
+async def _get_job_or_404(job_id: str, db: AsyncSession, current_user: User) -> Job:
     _validate_job_id(job_id)
-    job = db.query(Job).filter(
-        Job.id == job_id.strip(),
-        Job.user_id == current_user.id,
-    ).first()
+    result = await db.execute(
+        select(Job).where(
+            Job.id == job_id.strip(),
+            Job.user_id == current_user.id,
+        )
+    )
+    job = result.scalar_one_or_none()
     if not job:
         raise HTTPException(status_code=404, detail="Job não encontrado")
     return job
 
 
-@router.post("", status_code=201)
-def create_job(
-    file: UploadFile = File(..., description="Planilha .xlsx ou .csv"),
-    db: Session = Depends(get_db),
+async def _schedule_delivery(job: Job, db: AsyncSession, restart: bool = True) -> bool:
+    """Enfileira a entrega do job; se o Redis falhar, grava delivery_status=failed (o job continua done)."""
+    try:
+        await run_in_threadpool(delivery.schedule, job.id, restart)
+    except Exception as e:
+        job.delivery_status = "failed"
+        job.delivery_error = str(e)
+        await db.commit()
+        return False
+    return True
+
+
+def _read_json(path: Path):
+    """Lê um JSON do armazenamento (None se não existir). Chamado via threadpool nas rotas async."""
+    data = storage.read_bytes(path)
+    if data is None:
+        return None
+    return json.loads(data.decode("utf-8"))
+
+
+async def _get_results_or_404(job_id: str, db: AsyncSession, current_user: User, column):
+    """
+    Status, ETag e o JSON guardado na coluna (report ou preview) como texto, numa consulta só:
+    o texto vai direto para a resposta, sem carregar o job nem decodificar o JSON.
+    """
+    _validate_job_id(job_id)
+    result = await db.execute(
+        select(Job.status, Job.results_etag, Job.report_json_path, cast(column, Text).label("payload")).where(
+            Job.id == job_id.strip(),
+            Job.user_id == current_user.id,
+        )
+    )
+    row = result.one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return row
+
+
+def _json_response(request: Request, payload: str, results_etag: str) -> Response:
+    """JSON já serializado com ETag; If-None-Match igual responde 304 sem corpo."""
+    etag = f'"{results_etag}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}:
+        return Response(status_code=304, headers=headers)
+    return Response(payload, media_type="application/json", headers=headers)
+
+
+@router.post("", status_code=201, openapi_extra=UPLOAD_OPENAPI)
+async def create_job(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """
-    Recebe o upload de um arquivo, salva no disco, cria o job no banco e enfileira o processamento.
+    Recebe o upload de um arquivo (multipart, campo file: .xlsx ou .csv), salva, cria o job no banco e
+    enfileira o processamento. O corpo é lido em streaming e gravado direto no destino, sem arquivo
+    temporário; passou de MAX_UPLOAD_MB (já pelo Content-Length ou durante a leitura), responde 413.
     Retorna o id do job para consultar status e baixar o resultado depois.
     """
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="Nome do arquivo é obrigatório")
-    if not allowed_file(file.filename):
-        raise HTTPException(
-            status_code=400,
-            detail="Aceito apenas .xlsx ou .csv",
-        )
-
     job_id = str(uuid.uuid4())
-    content = file.file.read()
-
-    MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
-    if len(content) > MAX_FILE_SIZE:
+    try:
+        filename, file_path, content_hash = await receive_upload(request, job_id, MAX_UPLOAD_MB * 1024 * 1024)
+    except InvalidUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileTooLargeError:
         raise HTTPException(
             status_code=413,
-            detail="Arquivo excede o tamanho máximo permitido de 10 MB",
+            detail=f"Arquivo excede o tamanho máximo permitido de {MAX_UPLOAD_MB} MB",
         )
 
-    file_path = save_upload(job_id, file.filename, content)
+    # Mesmo conteúdo já processado (por qualquer usuário): reaproveita o resultado sem enfileirar
+    cached = await run_in_threadpool(result_cache.lookup, result_cache_key(content_hash, file_path), job_id)
+    results = await run_in_threadpool(load_job_results, job_id) if cached else job_results(None, None)
+    route = None if cached else await run_in_threadpool(scheduler.classify, file_path)
+    # Com armazenamento remoto o upload já está no bucket: a cópia local só servia para o roteamento
+    await run_in_threadpool(storage.release, Path(file_path))
 
     job = Job(
         id=job_id,
         user_id=current_user.id,
-        status="queued",
-        filename_original=file.filename,
+        status="done" if cached else "queued",
+        filename_original=filename,
         file_path=file_path,
-        output_csv_path=None,
-        report_json_path=None,
+        content_hash=content_hash,
+        output_csv_path=cached[0] if cached else None,
+        report_json_path=cached[1] if cached else None,
         error_message=None,
+        queue_name=route["queue_name"] if route else None,
+        row_estimate=route["row_estimate"] if route else None,
+        queued_at=None if cached else datetime.utcnow(),
+        delivery_status="queued" if cached and GHL_DELIVERY_ENABLED else None,
+        **results,
     )
     db.add(job)
-    db.commit()
-    db.refresh(job)
+    await db.commit()
+    await db.refresh(job)
 
-    queue.enqueue(process_job, job_id)
+    if not cached:
+        await run_in_threadpool(scheduler.submit, job_id, current_user.id, job.queue_name)
+    elif GHL_DELIVERY_ENABLED:
+        await _schedule_delivery(job, db)
 
     return {
         "id": job.id,
@@ -100,13 +179,13 @@ def create_job(
 
 
 @router.get("/{job_id}")
-def get_job(
+async def get_job(
     job_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Retorna o status e metadados do job."""
-    job = _get_job_or_404(job_id, db, current_user)
+    """Retorna o status e metadados do job (com progresso enquanto estiver em processamento)."""
+    job = await _get_job_or_404(job_id, db, current_user)
     return {
         "id": job.id,
         "status": job.status,
@@ -116,89 +195,347 @@ def get_job(
         "created_at": job.created_at.isoformat(),
         "updated_at": job.updated_at.isoformat(),
         "error_message": job.error_message,
+        "queue_name": job.queue_name,
+        "row_estimate": job.row_estimate,
+        "queue_wait_seconds": (
+            round((job.started_at - job.queued_at).total_seconds(), 3)
+            if job.started_at and job.queued_at
+            else None
+        ),
+        "progress": await progress.get_progress(job.id) if job.status == "processing" else None,
+        "delivery": (
+            {
+                "status": job.delivery_status,
+                "error": job.delivery_error,
+                "progress": await delivery.get_delivery_progress(job.id),
+            }
+            if job.delivery_status
+            else None
+        ),
     }
 
 
+@router.get("/{job_id}/events")
+async def job_events(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Stream (Server-Sent Events) das mudanças de status do job: queued, processing, done, failed.
+    O primeiro evento é o status atual; a conexão fecha sozinha quando o job termina (done/failed).
+    Substitui o polling de GET /jobs/{job_id}.
+    """
+    _validate_job_id(job_id)
+    job_id = job_id.strip()
+    # Assina (e espera o psubscribe ficar ativo) antes de ler o status no banco para não perder uma
+    # transição entre as duas coisas
+    queue = await events.hub.subscribe(job_id)
+    try:
+        job = await _get_job_or_404(job_id, db, current_user)
+    except HTTPException:
+        events.hub.unsubscribe(job_id, queue)
+        raise
+    current = {
+        "job_id": job.id,
+        "status": job.status,
+        "error_message": job.error_message,
+        "at": job.updated_at.isoformat() + "Z",
+    }
+    # Não segura uma conexão do pool enquanto o stream estiver aberto
+    await db.close()
+
+    async def stream():
+        try:
+            yield events.format_sse(current)
+            if current["status"] in events.TERMINAL_STATUSES:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=events.HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event is events.STREAM_INTERRUPTED:
+                    # Assinatura do Redis caiu: fecha antes do fim do job e o cliente volta ao polling
+                    return
+                yield events.format_sse(event)
+                if event["status"] in events.TERMINAL_STATUSES:
+                    return
+        finally:
+            events.hub.unsubscribe(job_id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{job_id}/preview")
-def get_preview(
+async def get_preview(
     job_id: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Retorna as primeiras 20 linhas do CSV gerado em JSON. Só disponível quando status=done."""
-    job = _get_job_or_404(job_id, db, current_user)
-    if job.status != "done":
+    """
+    Retorna as primeiras 20 linhas do CSV gerado em JSON. Só disponível quando status=done.
+    Vem da coluna preview do job, com ETag (304 se o cliente já tiver a mesma versão).
+    """
+    row = await _get_results_or_404(job_id, db, current_user, Job.preview)
+    if row.status != "done":
         raise HTTPException(status_code=409, detail="Preview só disponível quando o job estiver concluído")
-    preview_path = REPORTS_DIR / f"{job.id}_preview.json"
-    if not preview_path.exists():
+    if row.payload is not None and row.results_etag:
+        return _json_response(request, row.payload, row.results_etag)
+    # Jobs concluídos antes das colunas: lê o arquivo
+    data = await run_in_threadpool(_read_json, REPORTS_DIR / f"{job_id.strip()}_preview.json")
+    if data is None:
         raise HTTPException(status_code=404, detail="Arquivo de preview não encontrado")
-    data = json.loads(preview_path.read_text(encoding="utf-8"))
     return data
 
 
 @router.get("/{job_id}/download")
-def download_csv(
+async def download_csv(
     job_id: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Faz o download do CSV no padrão GHL. Só disponível quando status=done."""
-    job = _get_job_or_404(job_id, db, current_user)
+    """
+    Faz o download do CSV no padrão GHL. Só disponível quando status=done.
+    Serve a variante já comprimida pelo worker conforme o Accept-Encoding (gzip/zstd) e aceita
+    Range (retomar download), If-None-Match e If-Modified-Since.
+    """
+    job = await _get_job_or_404(job_id, db, current_user)
     if job.status != "done":
         raise HTTPException(status_code=409, detail="Download só disponível quando o job estiver concluído")
-    path = Path(job.output_csv_path)
-    if not path.exists():
+    try:
+        return await run_in_threadpool(
+            downloads.file_response, request, Path(job.output_csv_path), f"ghl_import_{job.id}.csv"
+        )
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Arquivo CSV não encontrado")
-    return FileResponse(
-        path,
-        filename=f"ghl_import_{job.id}.csv",
-        media_type="text/csv",
-    )
 
 
-@router.get("/{job_id}/report")
-def get_report(
+@router.get("/{job_id}/rows")
+async def get_rows(
     job_id: str,
-    db: Session = Depends(get_db),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Retorna o report.json com métricas do processamento. Só disponível quando status=done."""
-    job = _get_job_or_404(job_id, db, current_user)
+    """
+    Página de linhas do CSV GHL ([offset, offset + limit)), para navegar além do preview.
+    Usa o índice de linhas: vai direto à posição, sem ler o arquivo desde o começo.
+    """
+    job = await _get_job_or_404(job_id, db, current_user)
     if job.status != "done":
+        raise HTTPException(status_code=409, detail="Linhas só disponíveis quando o job estiver concluído")
+    try:
+        return await run_in_threadpool(row_index.read_rows, Path(job.output_csv_path), offset, limit)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Arquivo CSV não encontrado")
+
+
+@router.get("/{job_id}/report")
+async def get_report(
+    job_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Retorna o report.json com métricas do processamento. Só disponível quando status=done.
+    Vem da coluna report do job, com ETag (304 se o cliente já tiver a mesma versão).
+    """
+    row = await _get_results_or_404(job_id, db, current_user, Job.report)
+    if row.status != "done":
         raise HTTPException(status_code=409, detail="Report só disponível quando o job estiver concluído")
-    path = Path(job.report_json_path)
-    if not path.exists():
+    if row.payload is not None and row.results_etag:
+        return _json_response(request, row.payload, row.results_etag)
+    # Jobs concluídos antes das colunas: lê o arquivo
+    data = await run_in_threadpool(_read_json, Path(row.report_json_path))
+    if data is None:
         raise HTTPException(status_code=404, detail="Arquivo de report não encontrado")
-    data = json.loads(path.read_text(encoding="utf-8"))
     return data
 
 
 @router.post("/{job_id}/retry", status_code=202)
-def retry_job(
+async def retry_job(
     job_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Reprocessa um job que falhou. Só disponível quando status=failed.
     Reseta status para queued, limpa error_message e enfileira novamente.
     """
-    job = _get_job_or_404(job_id, db, current_user)
+    job = await _get_job_or_404(job_id, db, current_user)
     if job.status != "failed":
         raise HTTPException(
             status_code=409,
             detail="Retry só disponível para jobs com status=failed",
         )
+    if not job.queue_name:
+        try:
+            _, route = await run_in_threadpool(_inspect_upload, job, False, True)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Arquivo enviado não encontrado")
+        job.queue_name = route["queue_name"]
+        job.row_estimate = route["row_estimate"]
     job.status = "queued"
     job.error_message = None
     job.output_csv_path = None
     job.report_json_path = None
-    db.commit()
+    for name, value in job_results(None, None).items():
+        setattr(job, name, value)
+    job.queued_at = datetime.utcnow()
+    job.started_at = None
+    job.delivery_status = None
+    job.delivery_error = None
+    await db.commit()
 
-    queue.enqueue(process_job, job.id)
+    await run_in_threadpool(events.publish_job_status, job.id, "queued")
+    await run_in_threadpool(scheduler.submit, job.id, job.user_id, job.queue_name)
 
     return {
         "id": job.id,
         "status": job.status,
         "message": "Job enfileirado para reprocessamento",
     }
+
+
+def _inspect_upload(job: Job, header: bool = True, route: bool = False) -> tuple[list[str] | None, dict | None]:
+    """
+    Cabeçalho e/ou fila do upload do job. Se este host não tiver a cópia, lê do bucket sem deixar
+    cópia local: de um CSV só os primeiros CSV_SNIFF_BYTES (Range); um XLSX vai para um temporário.
+    """
+    head_bytes = CSV_SNIFF_BYTES if Path(job.file_path).suffix.lower() == ".csv" else None
+    with storage.local_copy(job.file_path, head_bytes) as (file_path, size):
+        columns = read_header(str(file_path), job.content_hash) if header else None
+        queue = scheduler.classify(str(file_path), size) if route else None
+    return columns, queue
+
+
+async def _read_job_header(job: Job, route: bool = False) -> tuple[list[str], dict | None]:
+    try:
+        return await run_in_threadpool(_inspect_upload, job, True, route)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Arquivo enviado não encontrado")
+
+
+@router.get("/{job_id}/mapping")
+async def get_mapping(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Cabeçalho da planilha e mapeamento de colunas (detectado e efetivo). Lê só a linha de
+    cabeçalho, então responde logo após o upload, em qualquer status do job.
+    """
+    job = await _get_job_or_404(job_id, db, current_user)
+    columns, _ = await _read_job_header(job)
+    overrides = json.loads(job.column_mapping) if job.column_mapping else None
+    mapping = detect_column_mapping(columns, overrides)
+    mapped = {str(c) for c in mapping.values() if c is not None}
+    return {
+        "columns": columns,
+        "ghl_columns": GHL_COLUMNS,
+        "detected": detect_column_mapping(columns),
+        "overrides": overrides,
+        "mapping": mapping,
+        # Colunas sem coluna GHL vão para Notes ("coluna: valor")
+        "unmapped": [c for c in columns if c not in mapped],
+    }
+
+
+@router.post("/{job_id}/mapping", status_code=202)
+async def set_mapping(
+    job_id: str,
+    body: MappingRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Salva um mapeamento de colunas e reprocessa o job com ele. Disponível quando status=done ou failed.
+    O reprocessamento lê o intermediário já parseado do upload (sem novo upload nem nova leitura da planilha).
+    """
+    job = await _get_job_or_404(job_id, db, current_user)
+    if job.status not in ("done", "failed"):
+        raise HTTPException(status_code=409, detail="Mapeamento só pode ser alterado com o job concluído ou falho")
+    # Sem fila gravada (job de antes das filas), a rota sai da mesma leitura do upload
+    columns, route = await _read_job_header(job, route=not job.queue_name)
+    try:
+        validate_mapping_overrides(body.mapping, columns)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    overrides = body.mapping or None
+
+    # Mesmo arquivo com o mesmo mapeamento já processado: resultado do cache, sem enfileirar
+    cached = None
+    if job.content_hash:
+        cached = await run_in_threadpool(
+            result_cache.lookup, result_cache_key(job.content_hash, job.file_path, overrides), job.id
+        )
+    results = await run_in_threadpool(load_job_results, job.id) if cached else job_results(None, None)
+    if not cached and not job.queue_name:
+        job.queue_name = route["queue_name"]
+        job.row_estimate = route["row_estimate"]
+    job.column_mapping = json.dumps(overrides, ensure_ascii=False) if overrides else None
+    job.status = "done" if cached else "queued"
+    job.error_message = None
+    job.output_csv_path = cached[0] if cached else None
+    job.report_json_path = cached[1] if cached else None
+    for name, value in results.items():
+        setattr(job, name, value)
+    job.delivery_status = "queued" if cached and GHL_DELIVERY_ENABLED else None
+    job.delivery_error = None
+    if not cached:
+        job.queued_at = datetime.utcnow()
+        job.started_at = None
+    await db.commit()
+
+    await run_in_threadpool(events.publish_job_status, job.id, job.status)
+    if not cached:
+        await run_in_threadpool(scheduler.submit, job.id, job.user_id, job.queue_name)
+    elif GHL_DELIVERY_ENABLED:
+        await _schedule_delivery(job, db)
+
+    return {
+        "id": job.id,
+        "status": job.status,
+        "mapping": detect_column_mapping(columns, overrides),
+        "message": "Resultado do cache para este mapeamento" if cached else "Job enfileirado com o novo mapeamento",
+    }
+
+
+@router.post("/{job_id}/delivery", status_code=202)
+async def start_delivery(
+    job_id: str,
+    restart: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Envia (ou reenvia) os contatos do job para a API de contatos. Só disponível quando status=done.
+    Por padrão retoma do checkpoint, pulando os lotes já aceitos; restart=true envia tudo de novo.
+    Uma entrega "em andamento" sem avanço há muito tempo (worker caiu) pode ser retomada.
+    """
+    if not GHL_DELIVERY_ENABLED:
+        raise HTTPException(status_code=409, detail="Entrega para a API de contatos desativada (GHL_DELIVERY_ENABLED)")
+    job = await _get_job_or_404(job_id, db, current_user)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail="Entrega só disponível quando o job estiver concluído")
+    if job.delivery_status in ("queued", "running") and not delivery.is_stalled(
+        job.updated_at, await delivery.get_delivery_progress(job.id)
+    ):
+        raise HTTPException(status_code=409, detail="Entrega já em andamento")
+    job.delivery_status = "queued"
+    job.delivery_error = None
+    await db.commit()
+    if not await _schedule_delivery(job, db, restart):
+        raise HTTPException(status_code=503, detail=f"Não foi possível enfileirar a entrega: {job.delivery_error}")
+    return {"id": job.id, "delivery_status": job.delivery_status}
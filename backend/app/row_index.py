@@ -0,0 +1,127 @@
+# Índice de linhas do CSV de saída: a posição em bytes de uma a cada ROW_INDEX_STRIDE linhas, montado
+# enquanto o CSV é gravado (ou depois, numa leitura do arquivo, para resultados antigos/do cache).
+# Com ele, GET /jobs/{id}/rows vai direto à página pedida: seek + no máximo STRIDE-1 linhas puladas,
+# custo constante em qualquer ponto do arquivo. Fica ao lado do CSV em "<nome>.idx.npy" (e no bucket,
+# com STORAGE_BACKEND=s3: aí a página é uma leitura com Range só dos bytes dela).
+import csv
+import io
+import os
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+
+from app.config import ROW_INDEX_STRIDE
+from app.object_store import get_store
+from app.storage import local_path, publish, release, storage_key
+
+_QUOTE = ord('"')
+_NEWLINE = ord("\n")
+# O cabeçalho do CSV GHL cabe folgado nisso
+_HEADER_BYTES = 4096
+
+
+def row_index_path(csv_path: Path) -> Path:
+    csv_path = Path(csv_path)
+    return csv_path.with_name(f"{csv_path.stem}.idx.npy")
+
+
+class RowIndexWriter:
+    """
+    Recebe os bytes do CSV na ordem do arquivo (blocos quaisquer) e guarda o início de uma a cada
+    stride linhas de dados. Fim de linha = "\\n" fora de aspas (campos podem ter quebras de linha).
+    """
+
+    def __init__(self, stride: int = ROW_INDEX_STRIDE, position: int = 0):
+        self.stride = max(stride, 1)
+        self.position = position
+        self.rows = -1  # a primeira linha completa é o cabeçalho
+        self.next_start = position
+        self.odd_quotes = False
+        self._offsets: list[np.ndarray] = []
+
+    def add(self, data: bytes) -> None:
+        arr = np.frombuffer(data, dtype=np.uint8)
+        ends = np.flatnonzero(arr == _NEWLINE)
+        if self.odd_quotes or b'"' in data:
+            quotes = np.flatnonzero(arr == _QUOTE)
+            before = np.searchsorted(quotes, ends) + int(self.odd_quotes)
+            ends = ends[before % 2 == 0]
+            self.odd_quotes = (len(quotes) + int(self.odd_quotes)) % 2 == 1
+        if len(ends):
+            starts = np.r_[self.next_start, ends[:-1] + 1 + self.position]
+            if self.rows < 0:
+                starts = starts[1:]
+                self.rows = 0
+            # Linha global self.rows + i: guarda as múltiplas de stride
+            first = -self.rows % self.stride
+            self._offsets.append(starts[first::self.stride].astype(np.uint64))
+            self.rows += len(starts)
+            self.next_start = int(ends[-1]) + 1 + self.position
+        self.position += len(data)
+
+    def save(self, path: Path) -> None:
+        """Grava [stride, total de linhas, offsets...] (uint64) com os.replace."""
+        header = np.array([self.stride, max(self.rows, 0)], dtype=np.uint64)
+        data = np.concatenate([header, *self._offsets]) if self._offsets else header
+        tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        with open(tmp, "wb") as f:
+            np.save(f, data)
+        os.replace(tmp, path)
+
+
+def build_row_index(csv_path: Path) -> Path:
+    """
+    Monta o índice lendo o CSV já gravado (resultados do cache ou anteriores ao índice), de onde ele
+    estiver armazenado, e publica o índice ao lado dele.
+    """
+    writer = RowIndexWriter()
+    for block in get_store().iter_range(storage_key(csv_path)):
+        writer.add(block)
+    path = local_path(row_index_path(csv_path))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    writer.save(path)
+    publish(path)
+    return path
+
+
+def _load(csv_path: Path) -> np.ndarray:
+    store = get_store()
+    csv_info = store.stat(storage_key(csv_path))
+    if csv_info is None:
+        raise FileNotFoundError(str(csv_path))
+    key = storage_key(row_index_path(csv_path))
+    index_info = store.stat(key)
+    # Índice mais velho que o CSV (arquivo regravado): refaz
+    if index_info is None or index_info.mtime_ns < csv_info.mtime_ns:
+        path = build_row_index(csv_path)
+        release(path)
+    if store.remote:
+        return np.load(io.BytesIO(store.read_bytes(key)))
+    return np.load(store.local_path(key), mmap_mode="r")
+
+
+def read_rows(csv_path: Path, offset: int, limit: int) -> dict:
+    """
+    Linhas [offset, offset + limit) do CSV GHL como dicts, sem ler o arquivo desde o começo: lê só o
+    intervalo de bytes entre as entradas do índice que cercam a página.
+    """
+    store = get_store()
+    key = storage_key(csv_path)
+    index = _load(csv_path)
+    stride, total = int(index[0]), int(index[1])
+    header = store.read_range(key, 0, _HEADER_BYTES - 1).decode("utf-8-sig", errors="replace")
+    columns = next(csv.reader(io.StringIO(header, newline="")), [])
+    rows: list[dict] = []
+    if offset < total:
+        limit_in_file = min(limit, total - offset)
+        start = int(index[2 + offset // stride])
+        # Primeira linha depois da página que tem posição no índice: lê até antes dela
+        after = -(-(offset + limit_in_file) // stride)
+        end = int(index[2 + after]) - 1 if 2 + after < len(index) else None
+        data = store.read_range(key, start, end).decode("utf-8")
+        reader = csv.reader(io.StringIO(data, newline=""))
+        for _ in range(offset % stride):
+            next(reader)
+        rows = [dict(zip(columns, values)) for values in islice(reader, limit_in_file)]
+    return {"offset": offset, "limit": limit, "total_rows": total, "columns": columns, "rows": rows}
@@ -0,0 +1,108 @@
+# Roteamento e escalonamento justo dos jobs: cada job vai para a fila fast ou bulk conforme
+# tamanho/linhas estimadas, e cada usuário tem no máximo MAX_INFLIGHT_PER_USER jobs nas filas RQ.
+# Os excedentes esperam numa lista por usuário no Redis e entram quando um job do mesmo usuário termina.
+import os
+import time
+
+from app.config import (
+    FAST_QUEUE_MAX_BYTES,
+    FAST_QUEUE_MAX_ROWS,
+    INFLIGHT_STALE_SECONDS,
+    MAX_INFLIGHT_PER_USER,
+)
+from app import queue_rq
+from app.processing import estimate_rows, process_job
+
+KEY_PREFIX = "flowbase:sched:"
+
+# Atômico: limpa vagas antigas, e se houver vaga tira o próximo pendente (fast antes de bulk)
+# e o marca como em andamento. Retorna {job_id, fila} ou nil.
+_CLAIM_NEXT = queue_rq.redis_conn.register_script(
+    """
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+    if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+        return nil
+    end
+    for i = 2, #KEYS do
+        local job_id = redis.call('LPOP', KEYS[i])
+        if job_id then
+            redis.call('ZADD', KEYS[1], ARGV[1], job_id)
+            return {job_id, ARGV[2 + i]}
+        end
+    end
+    return nil
+    """
+)
+
+_PRIORITY = [queue_rq.FAST_QUEUE, queue_rq.BULK_QUEUE]
+
+
+def classify(file_path: str, size: int | None = None) -> dict:
+    """
+    Decide a fila do job pelo tamanho do arquivo e pelas linhas estimadas. size é o tamanho do objeto
+    armazenado quando file_path for só uma cópia parcial (o começo de um CSV do bucket).
+    """
+    size = os.path.getsize(file_path) if size is None else size
+    rows = estimate_rows(file_path, size=size)
+    fast = size <= FAST_QUEUE_MAX_BYTES and (rows is None or rows <= FAST_QUEUE_MAX_ROWS)
+    return {"queue_name": queue_rq.FAST_QUEUE if fast else queue_rq.BULK_QUEUE, "row_estimate": rows}
+
+
+def _inflight_key(user_id: str | None) -> str:
+    return f"{KEY_PREFIX}inflight:{user_id or 'anon'}"
+
+
+def _pending_key(user_id: str | None, queue_name: str) -> str:
+    return f"{KEY_PREFIX}pending:{user_id or 'anon'}:{queue_name}"
+
+
+def _enqueue(job_id: str, user_id: str | None, queue_name: str) -> None:
+    queue_rq.queues[queue_name].enqueue(run_job, job_id, user_id)
+
+
+def submit(job_id: str, user_id: str | None, queue_name: str) -> None:
+    """Coloca o job na vez do usuário; entra na fila RQ agora se o usuário tiver vaga."""
+    if MAX_INFLIGHT_PER_USER <= 0:
+        _enqueue(job_id, user_id, queue_name)
+        return
+    queue_rq.redis_conn.rpush(_pending_key(user_id, queue_name), job_id)
+    dispatch(user_id)
+
+
+def dispatch(user_id: str | None) -> None:
+    """Preenche as vagas livres do usuário com os próximos jobs pendentes."""
+    keys = [_inflight_key(user_id)] + [_pending_key(user_id, q) for q in _PRIORITY]
+    while True:
+        now = time.time()
+        claimed = _CLAIM_NEXT(keys=keys, args=[now, now - INFLIGHT_STALE_SECONDS, MAX_INFLIGHT_PER_USER, *_PRIORITY])
+        if not claimed:
+            return
+        job_id, queue_name = (v.decode() if isinstance(v, bytes) else v for v in claimed)
+        _enqueue(job_id, user_id, queue_name)
+
+
+def touch(job_id: str, user_id: str | None) -> None:
+    """
+    Marca a vaga do job com a hora de início (só se ela ainda existir): INFLIGHT_STALE_SECONDS passa
+    a contar do início da execução, não de quando o job entrou na fila RQ.
+    """
+    if MAX_INFLIGHT_PER_USER <= 0:
+        return
+    queue_rq.redis_conn.zadd(_inflight_key(user_id), {job_id: time.time()}, xx=True)
+
+
+def release(job_id: str, user_id: str | None) -> None:
+    """Libera a vaga do job e chama o próximo pendente do mesmo usuário."""
+    if MAX_INFLIGHT_PER_USER <= 0:
+        return
+    queue_rq.redis_conn.zrem(_inflight_key(user_id), job_id)
+    dispatch(user_id)
+
+
+def run_job(job_id: str, user_id: str | None) -> None:
+    """Tarefa executada pelo worker: processa o job e libera a vaga do usuário."""
+    touch(job_id, user_id)
+    try:
+        process_job(job_id)
+    finally:
+        release(job_id, user_id)
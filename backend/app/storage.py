@@ -1,26 +1,190 @@
-# Funções para salvar e localizar arquivos (uploads, CSVs gerados, reports)
+# Funções para salvar e localizar arquivos (uploads, CSVs gerados, reports).
+# O banco guarda caminhos locais (backend/storage/...); com STORAGE_BACKEND=s3 eles viram chaves
+# no bucket (app.object_store) e cada host baixa/publica sua cópia local com ensure_local/publish.
+import hashlib
+import os
+import tempfile
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
+from typing import Iterator
 
-from app.config import UPLOADS_DIR
+from app.config import STORAGE_DIR, UPLOADS_DIR
+from app.object_store import get_store
 
 ALLOWED_EXTENSIONS = {".xlsx", ".csv"}
 
+# Tamanho de cada leitura ao gravar o upload em blocos
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class FileTooLargeError(ValueError):
+    """Upload passou do limite de tamanho (o arquivo parcial já foi removido)."""
+
 
 def allowed_file(filename: str) -> bool:
     """Verifica se o arquivo tem extensão permitida (.xlsx ou .csv)."""
     return Path(filename).suffix.lower() in ALLOWED_EXTENSIONS
 
 
-def save_upload(job_id: str, filename_original: str, content: bytes) -> str:
-    """
-    Salva o arquivo enviado na pasta de uploads.
-    Nome no disco: job_id + extensão do arquivo original.
-    Retorna o caminho absoluto do arquivo salvo (para guardar no banco).
-    """
-    UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+def _upload_path(job_id: str, filename_original: str) -> Path:
+    """Nome no disco: job_id + extensão do arquivo original."""
     ext = Path(filename_original).suffix.lower() or ".bin"
     if ext not in ALLOWED_EXTENSIONS:
         ext = ".csv"
-    path = UPLOADS_DIR / f"{job_id}{ext}"
-    path.write_bytes(content)
-    return str(path.resolve())
+    return UPLOADS_DIR / f"{job_id}{ext}"
+
+
+class UploadWriter:
+    """
+    Grava o upload em blocos direto no caminho final (num .part ao lado, renomeado em commit), sem
+    carregar o arquivo na memória. Valida o tamanho a cada bloco (FileTooLargeError assim que passar de
+    max_bytes) e calcula o SHA-256 durante a escrita. Com armazenamento remoto, os mesmos blocos seguem
+    em streaming para o bucket (multipart), concluído em commit e abortado em abort.
+    """
+
+    def __init__(self, job_id: str, filename_original: str, max_bytes: int):
+        UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+        self.path = _upload_path(job_id, filename_original)
+        self.size = 0
+        self._max_bytes = max_bytes
+        self._tmp_path = self.path.with_name(self.path.name + ".part")
+        self._digest = hashlib.sha256()
+        self._stack = ExitStack()
+        try:
+            self._file = self._stack.enter_context(open(self._tmp_path, "wb"))
+            store = get_store()
+            self._remote = self._stack.enter_context(store.open_writer(storage_key(self.path))) if store.remote else None
+        except BaseException:
+            self._stack.close()
+            self._tmp_path.unlink(missing_ok=True)
+            raise
+
+    def write(self, block: bytes) -> None:
+        self.size += len(block)
+        if self.size > self._max_bytes:
+            raise FileTooLargeError(f"Arquivo excede {self._max_bytes} bytes")
+        self._digest.update(block)
+        self._file.write(block)
+        if self._remote is not None:
+            self._remote.write(block)
+
+    def commit(self) -> tuple[str, str]:
+        """Fecha e publica o arquivo. Retorna (caminho absoluto, hash hex do conteúdo)."""
+        try:
+            self._stack.close()
+            os.replace(self._tmp_path, self.path)
+        except BaseException:
+            self._tmp_path.unlink(missing_ok=True)
+            raise
+        return str(self.path.resolve()), self._digest.hexdigest()
+
+    def abort(self) -> None:
+        """Descarta o upload: remove o .part e aborta o multipart no bucket."""
+        error = RuntimeError("upload abortado")
+        try:
+            self._stack.__exit__(type(error), error, None)
+        finally:
+            self._tmp_path.unlink(missing_ok=True)
+
+
+def storage_key(path: str | Path) -> str:
+    """Chave no armazenamento de um caminho local (relativa a STORAGE_DIR, ex.: "outputs/<job>.csv")."""
+    p = Path(path)
+    try:
+        return p.resolve().relative_to(STORAGE_DIR.resolve()).as_posix()
+    except ValueError:
+        # Caminho gravado por outro host (outra raiz): pasta + nome
+        return f"{p.parent.name}/{p.name}"
+
+
+def local_path(path: str | Path) -> Path:
+    """Onde fica a cópia local deste arquivo neste host."""
+    return STORAGE_DIR / storage_key(path)
+
+
+def ensure_local(path: str | Path, missing_ok: bool = False) -> Path | None:
+    """
+    Garante uma cópia local do arquivo (baixa do bucket se preciso) e retorna o caminho.
+    Se não existir: FileNotFoundError, ou None com missing_ok.
+    """
+    if Path(path).is_file():
+        return Path(path)
+    local = local_path(path)
+    if local.is_file():
+        return local
+    try:
+        if not get_store().remote:
+            raise FileNotFoundError(str(path))
+        get_store().fetch(storage_key(path), local)
+    except FileNotFoundError:
+        if missing_ok:
+            return None
+        raise
+    return local
+
+
+@contextmanager
+def local_copy(path: str | Path, head_bytes: int | None = None) -> Iterator[tuple[Path, int]]:
+    """
+    Leitura pontual de um arquivo armazenado: (caminho local, tamanho do arquivo). Usa o próprio arquivo
+    se este host tiver a cópia; senão baixa para uma pasta temporária apagada na saída, sem deixar cópia
+    em storage/. Com head_bytes baixa só o começo do objeto (Range), o que basta para cabeçalho e amostra
+    de um CSV. FileNotFoundError se não existir.
+    """
+    for candidate in (Path(path), local_path(path)):
+        if candidate.is_file():
+            yield candidate, candidate.stat().st_size
+            return
+    store = get_store()
+    key = storage_key(path)
+    info = store.stat(key) if store.remote else None
+    if info is None:
+        raise FileNotFoundError(str(path))
+    with tempfile.TemporaryDirectory(prefix="flowbase-read-") as tmp:
+        # Mesmo nome do arquivo: quem lê decide o formato pela extensão
+        copy = Path(tmp) / Path(path).name
+        if head_bytes is not None and info.size > head_bytes:
+            copy.write_bytes(store.read_range(key, 0, head_bytes - 1))
+        else:
+            store.fetch(key, copy)
+        yield copy, info.size
+
+
+def publish(*paths: Path) -> None:
+    """Envia para o bucket os arquivos locais gerados neste host (nada a fazer no armazenamento local)."""
+    store = get_store()
+    if not store.remote:
+        return
+    for p in paths:
+        if p is not None and Path(p).is_file():
+            store.put_file(storage_key(p), Path(p))
+
+
+def remove(*paths: Path) -> None:
+    """Apaga a cópia local e o objeto no bucket."""
+    store = get_store()
+    for p in paths:
+        Path(p).unlink(missing_ok=True)
+        if store.remote:
+            store.delete(storage_key(p))
+
+
+def release(*paths: Path | None) -> None:
+    """Com armazenamento remoto, apaga as cópias locais de trabalho (o bucket continua com os arquivos)."""
+    if not get_store().remote:
+        return
+    for p in paths:
+        if p is not None:
+            Path(p).unlink(missing_ok=True)
+
+
+def exists(path: str | Path) -> bool:
+    return get_store().exists(storage_key(path))
+
+
+def read_bytes(path: str | Path) -> bytes | None:
+    """Conteúdo do arquivo (None se não existir), de onde ele estiver armazenado."""
+    try:
+        return get_store().read_bytes(storage_key(path))
+    except FileNotFoundError:
+        return None
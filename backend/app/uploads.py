@@ -0,0 +1,130 @@
+# Recebe o upload multipart lendo o corpo da requisição em streaming (request.stream()), sem o
+# UploadFile do Starlette, que guarda o corpo inteiro num arquivo temporário antes da rota rodar.
+# Os bytes do campo "file" vão direto para o caminho final (storage.UploadWriter): o tamanho é
+# conferido pelo Content-Length antes de ler qualquer byte e a cada bloco recebido, abortando assim
+# que passar de MAX_UPLOAD_MB. Os demais campos do formulário são ignorados.
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from multipart.multipart import MultipartParser, parse_options_header
+
+from app.storage import UPLOAD_CHUNK_SIZE, FileTooLargeError, UploadWriter, allowed_file
+
+# Folga para boundaries e cabeçalhos das partes na checagem do Content-Length
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Corpo do POST /jobs na documentação (a rota não declara UploadFile)
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary", "description": "Planilha .xlsx ou .csv"}
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+class InvalidUploadError(ValueError):
+    """Requisição sem o campo file, sem nome de arquivo, com extensão não aceita ou fora de multipart."""
+
+
+class _FormReader:
+    """Callbacks do MultipartParser: guarda nome e bytes do primeiro campo "file" até serem gravados."""
+
+    def __init__(self):
+        self.filename: str | None = None
+        self.pending = bytearray()
+        self.received = 0
+        self.in_file = False
+        self.file_done = False
+        self._headers: dict[bytes, bytes] = {}
+        self._field = bytearray()
+        self._value = bytearray()
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": lambda data, start, end: self._field.extend(data[start:end]),
+            "on_header_value": lambda data, start, end: self._value.extend(data[start:end]),
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _part_begin(self) -> None:
+        self._headers = {}
+
+    def _header_end(self) -> None:
+        self._headers[bytes(self._field).lower()] = bytes(self._value)
+        self._field.clear()
+        self._value.clear()
+
+    def _headers_finished(self) -> None:
+        _, params = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if params.get(b"name") != b"file" or self.file_done or self.filename is not None:
+            return
+        self.in_file = True
+        self.filename = params.get(b"filename", b"").decode("utf-8", "replace")
+
+    def _part_data(self, data: bytes, start: int, end: int) -> None:
+        if self.in_file:
+            self.pending += data[start:end]
+            self.received += end - start
+
+    def _part_end(self) -> None:
+        if self.in_file:
+            self.in_file = False
+            self.file_done = True
+
+
+async def receive_upload(request: Request, job_id: str, max_bytes: int) -> tuple[str, str, str]:
+    """
+    Lê o multipart da requisição e grava o campo "file" em uploads/<job_id>.<ext>.
+    Retorna (nome original, caminho absoluto, hash hex do conteúdo).
+    FileTooLargeError se passar de max_bytes (nada fica gravado); InvalidUploadError se o formulário
+    não trouxer um .xlsx/.csv no campo file.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD_BYTES:
+        raise FileTooLargeError(f"Arquivo excede {max_bytes} bytes")
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise InvalidUploadError("Envie o arquivo como multipart/form-data no campo file")
+
+    form = _FormReader()
+    parser = MultipartParser(boundary, form.callbacks())
+    writer: UploadWriter | None = None
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if form.filename is not None and writer is None:
+                if not form.filename:
+                    raise InvalidUploadError("Nome do arquivo é obrigatório")
+                if not allowed_file(form.filename):
+                    raise InvalidUploadError("Aceito apenas .xlsx ou .csv")
+                writer = await run_in_threadpool(UploadWriter, job_id, form.filename, max_bytes)
+            if form.received > max_bytes:
+                raise FileTooLargeError(f"Arquivo excede {max_bytes} bytes")
+            # Escrita em blocos de UPLOAD_CHUNK_SIZE no threadpool para não travar o event loop
+            if writer is not None and form.pending and (len(form.pending) >= UPLOAD_CHUNK_SIZE or form.file_done):
+                block = bytes(form.pending)
+                form.pending.clear()
+                await run_in_threadpool(writer.write, block)
+        parser.finalize()
+        if writer is None or not form.file_done:
+            raise InvalidUploadError("Campo file é obrigatório")
+        file_path, content_hash = await run_in_threadpool(writer.commit)
+    except BaseException:
+        if writer is not None:
+            await run_in_threadpool(writer.abort)
+        raise
+    return form.filename, file_path, content_hash
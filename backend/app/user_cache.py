@@ -0,0 +1,137 @@
+# Cache dos usuários autenticados (chave = "sub" do token): evita um SELECT em users a cada requisição.
+# L1 em memória por processo (TTL curto + limite de tamanho) e, opcionalmente, L2 no Redis
+# compartilhado entre os processos da API. Alterações em User pelo ORM invalidam a entrada.
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from redis import asyncio as aioredis
+from sqlalchemy import event
+
+from app.config import REDIS_URL, USER_CACHE_BACKEND, USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS
+from app.metrics import count_cache
+from app.models import User
+from app.queue_rq import redis_conn
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "flowbase:user:"
+
+_lock = threading.Lock()
+_entries: OrderedDict[str, tuple[float, User]] = OrderedDict()
+_counters = {"hits": 0, "misses": 0, "redis_hits": 0}
+_redis = aioredis.Redis.from_url(REDIS_URL) if USER_CACHE_BACKEND == "redis" else None
+
+
+def _snapshot(user: User) -> User:
+    """Cópia desanexada da sessão (sem password_hash), segura para compartilhar entre requisições."""
+    return User(id=user.id, email=user.email, password_hash="", created_at=user.created_at)
+
+
+def _put_local(user: User) -> None:
+    with _lock:
+        _entries[user.id] = (time.monotonic() + USER_CACHE_TTL_SECONDS, user)
+        _entries.move_to_end(user.id)
+        while len(_entries) > USER_CACHE_MAX_SIZE:
+            _entries.popitem(last=False)
+
+
+def _get_local(user_id: str) -> User | None:
+    with _lock:
+        entry = _entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del _entries[user_id]
+            return None
+        _entries.move_to_end(user_id)
+        return user
+
+
+async def get(user_id: str) -> User | None:
+    """Retorna o usuário em cache (ou None se não estiver / tiver expirado)."""
+    if USER_CACHE_TTL_SECONDS <= 0:
+        return None
+    user = _get_local(user_id)
+    if user is None and _redis is not None:
+        try:
+            raw = await _redis.get(_KEY_PREFIX + user_id)
+        except Exception as e:
+            logger.warning(f"[USER_CACHE] Redis indisponível: {e}")
+            raw = None
+        if raw:
+            data = json.loads(raw)
+            user = User(
+                id=data["id"], email=data["email"], password_hash="",
+                created_at=datetime.fromisoformat(data["created_at"]),
+            )
+            _put_local(user)
+            _counters["redis_hits"] += 1
+    _counters["hits" if user is not None else "misses"] += 1
+    count_cache("user", user is not None)
+    return user
+
+
+async def put(user: User) -> User:
+    """Guarda o usuário lido do banco e retorna a cópia que ficou em cache."""
+    snapshot = _snapshot(user)
+    if USER_CACHE_TTL_SECONDS <= 0:
+        return snapshot
+    _put_local(snapshot)
+    if _redis is not None:
+        data = {"id": snapshot.id, "email": snapshot.email, "created_at": snapshot.created_at.isoformat()}
+        try:
+            await _redis.set(_KEY_PREFIX + snapshot.id, json.dumps(data), ex=USER_CACHE_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"[USER_CACHE] Redis indisponível: {e}")
+    return snapshot
+
+
+async def invalidate(user_id: str) -> None:
+    """Remove o usuário do cache local e do Redis (ex.: depois de alterar email ou remover a conta)."""
+    with _lock:
+        _entries.pop(user_id, None)
+    if _redis is not None:
+        try:
+            await _redis.delete(_KEY_PREFIX + user_id)
+        except Exception as e:
+            logger.warning(f"[USER_CACHE] Redis indisponível: {e}")
+
+
+def clear() -> None:
+    """Esvazia o cache local deste processo."""
+    with _lock:
+        _entries.clear()
+
+
+def stats() -> dict:
+    """Hits, misses e tamanho do cache local deste processo."""
+    total = _counters["hits"] + _counters["misses"]
+    return {
+        "backend": USER_CACHE_BACKEND,
+        "hits": _counters["hits"],
+        "misses": _counters["misses"],
+        "redis_hits": _counters["redis_hits"],
+        "hit_rate": round(_counters["hits"] / total, 4) if total else 0.0,
+        "size": len(_entries),
+        "max_size": USER_CACHE_MAX_SIZE,
+        "ttl_seconds": USER_CACHE_TTL_SECONDS,
+    }
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_change(mapper, connection, target: User) -> None:
+    """Hook do ORM: qualquer UPDATE/DELETE em User derruba a entrada local na hora."""
+    with _lock:
+        _entries.pop(target.id, None)
+    if _redis is not None:
+        # O listener é síncrono: a chave do Redis é removida pelo cliente síncrono
+        try:
+            redis_conn.delete(_KEY_PREFIX + target.id)
+        except Exception as e:
+            logger.warning(f"[USER_CACHE] Redis indisponível: {e}")
@@ -1,5 +1,6 @@
 # Worker RQ: processa jobs em background (roda em processo separado do FastAPI)
-# Comando: python -m app.worker
+# Comando: python -m app.worker [filas...] (padrão: fast bulk default; "python -m app.worker delivery"
+# roda o worker próprio da entrega para a API de contatos)
 import os
 import sys
 from pathlib import Path
@@ -17,16 +18,20 @@ from redis import Redis
 from rq import Queue
 from rq.worker import SimpleWorker
 
-from app.config import REDIS_URL
+from app.config import REDIS_URL, WORKER_METRICS_PORT
+from app.metrics import start_worker_server
+from app.queue_rq import WORKER_QUEUES
 
 
-def run_worker():
+def run_worker(queue_names: list[str] | None = None):
+    start_worker_server(WORKER_METRICS_PORT)
     redis_conn = Redis.from_url(REDIS_URL)
-    queue = Queue("default", connection=redis_conn)
+    # Ordem = prioridade: fast antes de bulk (e "default", dos jobs antigos)
+    queues = [Queue(name, connection=redis_conn) for name in queue_names or WORKER_QUEUES]
     # SimpleWorker no Windows (RQ usa os.fork() que não existe no Windows)
-    worker = SimpleWorker([queue], connection=redis_conn)
+    worker = SimpleWorker(queues, connection=redis_conn)
     worker.work()
 
 
 if __name__ == "__main__":
-    run_worker()
+    run_worker(sys.argv[1:])
@@ -0,0 +1,261 @@
+# Pool de workers RQ: carrega pandas/phonenumbers/etc. uma vez e faz fork de N workers
+# que herdam esse estado já aquecido. O processo pai supervisiona (reinicia quem morrer)
+# e, no SIGTERM/SIGINT, espera os jobs em andamento terminarem (drain).
+# Comando: python -m app.worker_pool [-n N] [--queues fast bulk default]
+import argparse
+import gc
+import logging
+import os
+import signal
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Garante que o backend está no path e carrega .env
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+ROOT_DIR = BACKEND_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.chdir(BACKEND_DIR)
+
+from dotenv import load_dotenv
+load_dotenv(ROOT_DIR / ".env")
+
+# Métricas multiprocess: precisa estar definido antes de importar prometheus_client.
+# Os filhos gravam os valores nessa pasta e o servidor de métricas do pai soma todos.
+# Só a pasta criada pelo próprio pool é limpa (no início e no fim); uma PROMETHEUS_MULTIPROC_DIR
+# definida pelo operador pode ser compartilhada com outros processos e não é apagada.
+_OWN_METRICS_DIR = not os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if _OWN_METRICS_DIR:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(Path(tempfile.gettempdir()) / f"flowbase-metrics-{os.getpid()}")
+    # Sobra de uma execução antiga com o mesmo pid
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+from redis import Redis
+from rq import Queue
+from rq.worker import SimpleWorker
+
+from app.config import (
+    GHL_DELIVERY_ENABLED,
+    REDIS_URL,
+    WORKER_DELIVERY_RESERVED,
+    WORKER_DRAIN_TIMEOUT_SECONDS,
+    WORKER_FAST_RESERVED,
+    WORKER_MAX_JOBS,
+    WORKER_METRICS_PORT,
+    WORKER_POOL_SIZE,
+)
+from app.metrics import mark_process_dead, start_worker_server
+from app.queue_rq import DELIVERY_QUEUE, FAST_QUEUE, WORKER_QUEUES
+
+logger = logging.getLogger("flowbase.worker_pool")
+
+# Filho que morre antes disso conta como falha: o restart espera (backoff) para não entrar em loop
+MIN_HEALTHY_SECONDS = 5
+MAX_RESTART_DELAY_SECONDS = 30
+
+
+def warm_up() -> None:
+    """Importa e exercita os módulos pesados no pai, antes do fork."""
+    import pandas as pd
+
+    from app import db, processing, scheduler  # noqa: F401  (SQLAlchemy, pandas, phonenumbers, leitores de planilha)
+
+    # phonenumbers carrega os metadados de cada região sob demanda; BR é o caso comum
+    processing._normalize_phone_uncached("(11) 98765-4321", "BR")
+    processing._normalize_phone_uncached("+1 202 555 0143", "BR")
+    processing.process_to_ghl(pd.DataFrame({"Nome": ["Ana"], "E-mail": ["a@b.com"], "Telefone": ["11987654321"]}))
+    # Nenhuma conexão deve atravessar o fork
+    db.engine.dispose()
+    # Objetos criados até aqui vão para a geração permanente: o GC dos filhos não os toca,
+    # o que evita copy-on-write das páginas compartilhadas
+    gc.freeze()
+
+
+def _child_main(queue_names: list[str], max_jobs: int) -> None:
+    """Corpo de cada worker filho: um SimpleWorker (sem fork por job, o estado já está quente)."""
+    # Grupo próprio: o Ctrl+C do terminal chega só ao pai, que repassa um único SIGTERM
+    os.setpgid(0, 0)
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+        signal.signal(sig, signal.SIG_DFL)
+    from app.db import engine
+
+    engine.dispose(close=False)
+    redis_conn = Redis.from_url(REDIS_URL)
+    queues = [Queue(name, connection=redis_conn) for name in queue_names]
+    worker = SimpleWorker(queues, connection=redis_conn)
+    # SIGTERM no RQ = warm shutdown: termina o job atual e sai
+    worker.work(max_jobs=max_jobs or None)
+
+
+class WorkerPool:
+    """Supervisor: mantém size filhos vivos e faz o drain no encerramento."""
+
+    def __init__(
+        self,
+        size: int,
+        queue_names: list[str],
+        drain_timeout: int,
+        max_jobs: int,
+        fast_reserved: int = 0,
+        delivery_reserved: int = 0,
+    ):
+        self.size = size
+        self.queue_names = queue_names
+        # Os primeiros fast_reserved workers só atendem a fila fast e os últimos delivery_reserved só a
+        # delivery (sempre sobra ao menos um para o resto)
+        self.fast_reserved = min(fast_reserved, size - 1)
+        self.delivery_reserved = min(delivery_reserved, size - 1 - self.fast_reserved)
+        if delivery_reserved and not self.delivery_reserved:
+            # Pool pequeno demais para reservar: os workers gerais atendem a delivery, por último na prioridade
+            self.queue_names = [*queue_names, DELIVERY_QUEUE]
+        self.drain_timeout = drain_timeout
+        self.max_jobs = max_jobs
+        self.children: dict[int, tuple[int, float]] = {}  # pid -> (slot, início)
+        self.failures = [0] * size
+        self.restart_at = [0.0] * size
+        self.stopping = False
+        self.stop_signals = 0
+
+    def _queues_for(self, slot: int) -> list[str]:
+        if slot < self.fast_reserved:
+            return [FAST_QUEUE]
+        if slot >= self.size - self.delivery_reserved:
+            return [DELIVERY_QUEUE]
+        return self.queue_names
+
+    def _spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _child_main(self._queues_for(slot), self.max_jobs)
+            except BaseException:
+                logger.exception(f"[POOL] Worker {os.getpid()} terminou com erro")
+                code = 1
+            finally:
+                # os._exit: o filho não deve rodar handlers/atexit herdados do pai
+                os._exit(code)
+        self.children[pid] = (slot, time.monotonic())
+        logger.info(f"[POOL] Worker {slot} iniciado (pid {pid}, filas {self._queues_for(slot)})")
+
+    def _handle_stop(self, signum, frame) -> None:
+        self.stop_signals += 1
+        self.stopping = True
+
+    def _reap(self) -> None:
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            slot, started = self.children.pop(pid, (None, 0.0))
+            if slot is None:
+                continue
+            mark_process_dead(pid)
+            code = os.waitstatus_to_exitcode(status)
+            if self.stopping:
+                logger.info(f"[POOL] Worker {slot} (pid {pid}) encerrado")
+                continue
+            if code == 0:
+                # Saída normal (WORKER_MAX_JOBS atingido): recicla na hora
+                self.failures[slot] = 0
+                self.restart_at[slot] = 0.0
+                logger.info(f"[POOL] Worker {slot} (pid {pid}) reciclado")
+                continue
+            if time.monotonic() - started < MIN_HEALTHY_SECONDS:
+                self.failures[slot] += 1
+            else:
+                self.failures[slot] = 0
+            delay = min(2 ** self.failures[slot] - 1, MAX_RESTART_DELAY_SECONDS)
+            self.restart_at[slot] = time.monotonic() + delay
+            logger.warning(f"[POOL] Worker {slot} (pid {pid}) morreu (código {code}); reinicia em {delay}s")
+
+    def _signal_children(self, sig: int) -> None:
+        for pid in list(self.children):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def _drain(self) -> None:
+        logger.info(f"[POOL] Drain: aguardando {len(self.children)} worker(s) terminarem os jobs atuais")
+        self._signal_children(signal.SIGTERM)
+        forwarded = self.stop_signals
+        deadline = time.monotonic() + self.drain_timeout
+        while self.children and time.monotonic() < deadline:
+            # Segundo sinal no pai = cold shutdown nos filhos (RQ interrompe o job)
+            if self.stop_signals > forwarded:
+                forwarded = self.stop_signals
+                self._signal_children(signal.SIGTERM)
+            self._reap()
+            time.sleep(0.2)
+        if self.children:
+            logger.warning(f"[POOL] Timeout de drain: encerrando {len(self.children)} worker(s) à força")
+            self._signal_children(signal.SIGKILL)
+            while self.children:
+                self._reap()
+                time.sleep(0.1)
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        for slot in range(self.size):
+            self._spawn(slot)
+        while not self.stopping:
+            self._reap()
+            alive = {slot for slot, _ in self.children.values()}
+            now = time.monotonic()
+            for slot in range(self.size):
+                if slot not in alive and now >= self.restart_at[slot]:
+                    self._spawn(slot)
+            time.sleep(0.5)
+        self._drain()
+        logger.info("[POOL] Encerrado")
+
+
+def run_pool(size: int | None = None, queue_names: list[str] | None = None) -> None:
+    if not hasattr(os, "fork"):
+        # Windows não tem fork: cai para um único worker, que também atende a delivery (como um pool de 1)
+        from app.worker import run_worker
+
+        logger.warning("[POOL] os.fork indisponível; iniciando um único worker")
+        if not queue_names and GHL_DELIVERY_ENABLED:
+            queue_names = [*WORKER_QUEUES, DELIVERY_QUEUE]
+        run_worker(queue_names)
+        return
+    size = size or WORKER_POOL_SIZE or os.cpu_count() or 1
+    # Cada job só usa a sua parte dos núcleos no modo paralelo (PARALLEL_WORKERS=0), senão seriam
+    # size x núcleos processos convertendo ao mesmo tempo
+    from app import processing
+
+    processing.set_worker_processes(size)
+    # Filas explícitas: todos os workers iguais; padrão: reserva WORKER_FAST_RESERVED para a fila fast
+    # e, com a entrega ligada, WORKER_DELIVERY_RESERVED para a fila delivery
+    fast_reserved = 0 if queue_names else WORKER_FAST_RESERVED
+    delivery_reserved = WORKER_DELIVERY_RESERVED if GHL_DELIVERY_ENABLED and not queue_names else 0
+    queue_names = queue_names or WORKER_QUEUES
+    started = time.perf_counter()
+    warm_up()
+    logger.info(f"[POOL] Módulos carregados em {time.perf_counter() - started:.2f}s; iniciando {size} worker(s) em {queue_names}")
+    start_worker_server(WORKER_METRICS_PORT)
+    try:
+        WorkerPool(
+            size, queue_names, WORKER_DRAIN_TIMEOUT_SECONDS, WORKER_MAX_JOBS, fast_reserved, delivery_reserved
+        ).run()
+    finally:
+        if _OWN_METRICS_DIR:
+            shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pool de workers RQ com fork e imports pré-carregados")
+    parser.add_argument("-n", "--workers", type=int, default=None, help="número de workers (padrão: WORKER_POOL_SIZE ou núcleos)")
+    parser.add_argument("--queues", nargs="+", default=None, help="filas a consumir, em ordem de prioridade (padrão: fast bulk default, mais os workers de delivery)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    run_pool(args.workers, args.queues)
@@ -0,0 +1 @@
+# Benchmarks do pipeline de processamento (rodam sem Postgres/Redis)
@@ -0,0 +1,95 @@
+# Benchmark da entrega para a API de contatos (app.delivery.deliver_csv) contra o mock local:
+# gera uma planilha sintética, converte para CSV GHL e envia, medindo contatos/s, 429 e 5xx repetidos.
+# --interrupt-after simula uma queda no meio da entrega e retoma do checkpoint (cada contato deve chegar uma vez).
+# Não usa Postgres nem Redis (checkpoint em memória). Comando (de dentro de backend/):
+#   python -m benchmarks.bench_delivery --rows 20000 --spawn-mock --mock-rate 20 --rate 20 --concurrency 8
+#   python -m benchmarks.bench_delivery --url http://localhost:8700 --rows 5000   (mock já rodando)
+import argparse
+import asyncio
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import httpx
+import uvicorn
+
+from app import delivery, processing
+from app.progress import ProgressTracker
+from benchmarks import mock_ghl
+from benchmarks.synthetic import make_dataset
+
+
+def _spawn_mock(port: int) -> None:
+    """Sobe o mock numa thread deste processo e espera ficar pronto."""
+    server = uvicorn.Server(uvicorn.Config(mock_ghl.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+
+async def _deliver(csv_path: Path, args, checkpoint: delivery.Checkpoint, timeout: float | None) -> dict | None:
+    run = delivery.deliver_csv(
+        csv_path,
+        checkpoint,
+        base_url=args.url,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        burst=args.burst or max(int(args.rate), 1),
+        max_retries=args.max_retries,
+    )
+    try:
+        return await asyncio.wait_for(run, timeout)
+    except asyncio.TimeoutError:
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark da entrega em lotes para a API de contatos")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--url", default="http://127.0.0.1:8700")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0, help="requisições/s do cliente (0 = sem limite)")
+    parser.add_argument("--burst", type=int, default=None)
+    parser.add_argument("--max-retries", type=int, default=8)
+    parser.add_argument("--interrupt-after", type=float, default=None, help="cancela após N segundos e retoma")
+    parser.add_argument("--spawn-mock", action="store_true", help="sobe o mock neste processo (porta de --url)")
+    parser.add_argument("--mock-rate", type=float, default=0, help="limite do mock em requisições/s (0 = sem limite)")
+    parser.add_argument("--mock-error-rate", type=float, default=0.0)
+    parser.add_argument("--mock-latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    if args.spawn_mock:
+        mock_ghl.configure(args.mock_rate, None, args.mock_error_rate, args.mock_latency_ms, "")
+        _spawn_mock(httpx.URL(args.url).port or 80)
+    httpx.post(f"{args.url}/reset").raise_for_status()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = make_dataset(Path(tmp) / "synthetic.csv", args.rows, "csv", "pt")
+        csv_path = Path(tmp) / "ghl.csv"
+        processing.convert_file(str(source), csv_path, ProgressTracker("bench", publish=False), workers=1, deduplicate=False)
+
+        checkpoint = delivery.Checkpoint(batch_size=args.batch_size)
+        started = time.perf_counter()
+        result = asyncio.run(_deliver(csv_path, args, checkpoint, args.interrupt_after))
+        if result is None:
+            print(f"Interrompido após {args.interrupt_after}s: {len(checkpoint.done)} lotes no checkpoint; retomando")
+            result = asyncio.run(_deliver(csv_path, args, checkpoint, None))
+        elapsed = time.perf_counter() - started
+
+    server = httpx.get(f"{args.url}/stats").json()
+    print(f"Contatos enviados: {checkpoint.rows_sent:,} em {elapsed:.2f}s ({checkpoint.rows_sent / elapsed:,.0f}/s)")
+    print(f"Repetições no cliente: {({k: v for k, v in result.items() if k not in ('contacts_sent', 'batches_sent', 'seconds')})}")
+    print(f"Mock: {server}")
+    if server["contacts"] != args.rows:
+        print(f"ATENÇÃO: o mock recebeu {server['contacts']:,} contatos para {args.rows:,} linhas")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
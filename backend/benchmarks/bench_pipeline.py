@@ -0,0 +1,176 @@
+# Benchmark do pipeline de processamento (read_file, process_to_ghl, escrita e convert_file, o miolo
+# do process_job, com e sem deduplicação) sobre planilhas sintéticas. Mede linhas/s e pico de memória por etapa, grava os
+# resultados e compara com um baseline, apontando regressões acima do limite. Não usa Postgres nem Redis.
+# Comando (de dentro de backend/):
+#   python -m benchmarks.bench_pipeline --rows 1000 100000 --update-baseline   (grava o baseline)
+#   python -m benchmarks.bench_pipeline --rows 1000 100000                     (compara; sai com 1 se regrediu)
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import pandas as pd
+
+from app import processing
+from app.progress import ProgressTracker
+from benchmarks.synthetic import make_dataset
+
+STAGES = ("read", "transform", "write", "pipeline", "dedup")
+DEFAULT_BASELINE = BACKEND_DIR / "benchmarks" / "baseline.json"
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_mb(fn) -> float:
+    """Pico de memória alocada durante fn (tracemalloc: heap Python + buffers NumPy), em MB."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def bench_file(path: Path, repeat: int, workers: int, tmp: Path) -> dict:
+    """Mede cada etapa sobre um arquivo. Tempo = melhor de repeat execuções; memória numa execução à parte."""
+    dialect = processing.sniff_csv(str(path)) if path.suffix == ".csv" else None
+    df = processing.read_file(str(path), dialect)
+    ghl = processing.process_to_ghl(df)
+    rows = len(df)
+    out = tmp / "bench_output.csv"
+
+    def read():
+        d = processing.sniff_csv(str(path)) if path.suffix == ".csv" else None
+        return processing.read_file(str(path), d)
+
+    stages = {
+        "read": read,
+        "transform": lambda: processing.process_to_ghl(df),
+        "write": lambda: processing._write_ghl_output([(rows, ghl, {})], out),
+        "pipeline": lambda: processing.convert_file(
+            str(path), out, ProgressTracker("bench", path.stat().st_size, publish=False), workers, deduplicate=False
+        ),
+        # Pipeline completo com a deduplicação de contatos ligada
+        "dedup": lambda: processing.convert_file(
+            str(path), out, ProgressTracker("bench", path.stat().st_size, publish=False), workers, deduplicate=True
+        ),
+    }
+    results = {}
+    for stage, fn in stages.items():
+        seconds = _time(fn, repeat)
+        results[stage] = {
+            "seconds": round(seconds, 4),
+            "rows_per_s": round(rows / seconds) if seconds else None,
+            "peak_mb": round(_peak_mb(fn), 1),
+        }
+    return {"rows": rows, "file_bytes": path.stat().st_size, "stages": results}
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Regressões: linhas/s caiu ou pico de memória subiu mais que threshold (fração) em relação ao baseline."""
+    problems = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        for stage, now in result["stages"].items():
+            before = base["stages"].get(stage)
+            if not before:
+                continue
+            if before["rows_per_s"] and now["rows_per_s"] < before["rows_per_s"] * (1 - threshold):
+                problems.append(
+                    f"{name} [{stage}] linhas/s: {before['rows_per_s']:,} -> {now['rows_per_s']:,} "
+                    f"({now['rows_per_s'] / before['rows_per_s'] - 1:+.0%})"
+                )
+            # Abaixo de 1 MB a variação é ruído
+            if before["peak_mb"] >= 1 and now["peak_mb"] > before["peak_mb"] * (1 + threshold):
+                problems.append(
+                    f"{name} [{stage}] pico de memória: {before['peak_mb']} MB -> {now['peak_mb']} MB "
+                    f"({now['peak_mb'] / before['peak_mb'] - 1:+.0%})"
+                )
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de processamento")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000], help="de 1k a 1M")
+    parser.add_argument("--formats", nargs="+", choices=["csv", "xlsx"], default=["csv", "xlsx"])
+    parser.add_argument("--langs", nargs="+", choices=["pt", "en", "mixed"], default=["pt", "en"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1, help="PARALLEL_WORKERS da etapa pipeline (1 = serial)")
+    parser.add_argument("--data-dir", type=Path, default=None, help="pasta para guardar/reusar as planilhas geradas")
+    parser.add_argument("--output", type=Path, default=None, help="grava os resultados em JSON")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="grava os resultados como novo baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="regressão tolerada (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    current = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "processing_engine": processing.PROCESSING_ENGINE,
+            "xlsx_engine": processing._xlsx_engine(),
+            "processing_version": processing.PROCESSING_VERSION,
+            "workers": args.workers,
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or Path(tmp)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        print(f"{'dataset':22s} {'etapa':10s} {'tempo':>9s} {'linhas/s':>12s} {'pico MB':>9s}")
+        for fmt in args.formats:
+            for lang in args.langs:
+                for rows in args.rows:
+                    name = f"{fmt}-{lang}-{rows}"
+                    path = data_dir / f"synthetic_{name}.{fmt}"
+                    if not path.exists():
+                        make_dataset(path, rows, fmt, lang)
+                    result = bench_file(path, args.repeat, args.workers, Path(tmp))
+                    current["results"][name] = result
+                    for stage in STAGES:
+                        r = result["stages"][stage]
+                        print(f"{name:22s} {stage:10s} {r['seconds']:8.3f}s {r['rows_per_s']:12,} {r['peak_mb']:9.1f}")
+
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2), encoding="utf-8")
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(current, indent=2), encoding="utf-8")
+        print(f"Baseline gravado em {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"Sem baseline em {args.baseline} (rode com --update-baseline para criar)")
+        return
+
+    problems = compare(current, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+    if problems:
+        print(f"\nREGRESSÕES acima de {args.threshold:.0%}:")
+        for p in problems:
+            print(f"  - {p}")
+        sys.exit(1)
+    print(f"\nSem regressões acima de {args.threshold:.0%} em relação a {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Benchmark de leitura de XLSX: pd.read_excel padrão (caminho antigo) x read_file (caminho rápido)
+# Comando (de dentro de backend/): python -m benchmarks.bench_xlsx --rows 50000
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import pandas as pd
+from openpyxl import Workbook
+
+from app import processing
+
+HEADER = ["Nome", "E-mail", "Telefone", "Empresa", "Cidade", "UF", "Cargo", "Observações"]
+
+
+def make_workbook(path: Path, rows: int, seed: int = 42) -> None:
+    """Gera um XLSX com colunas típicas de lista de leads (write_only para não estourar memória)."""
+    rnd = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(HEADER)
+    for i in range(rows):
+        ws.append([
+            f"Contato {i}",
+            f"contato{i}@empresa{i % 500}.com.br",
+            f"(11) 9{rnd.randint(1000, 9999)}-{rnd.randint(1000, 9999)}",
+            f"Empresa {i % 500}",
+            rnd.choice(["São Paulo", "Rio de Janeiro", "Curitiba", None]),
+            rnd.choice(["SP", "RJ", "PR"]),
+            rnd.choice(["Diretor", "Gerente", "Analista", None]),
+            rnd.randint(0, 1000),
+        ])
+    wb.save(path)
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compara os caminhos de leitura de XLSX")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--file", type=str, default=None, help="XLSX existente (senão gera um sintético)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(args.file) if args.file else Path(tmp) / "bench.xlsx"
+        if not args.file:
+            make_workbook(path, args.rows)
+        rows = len(processing.read_file(str(path)))
+
+        cases = {"pd.read_excel (antigo)": lambda: pd.read_excel(path)}
+        for engine in ("openpyxl", "calamine"):
+            if engine == "calamine" and not processing._HAS_CALAMINE:
+                continue
+            cases[f"read_file [{engine}]"] = lambda e=engine: _read_with(e, path)
+
+        print(f"Arquivo: {path.name}  linhas: {rows}  repetições: {args.repeat}")
+        baseline = None
+        for name, fn in cases.items():
+            elapsed = _time(fn, args.repeat)
+            baseline = baseline or elapsed
+            print(f"{name:28s} {elapsed:8.3f}s  {rows / elapsed:12,.0f} linhas/s  {baseline / elapsed:5.1f}x")
+
+
+def _read_with(engine: str, path: Path) -> pd.DataFrame:
+    previous = processing.XLSX_ENGINE
+    processing.XLSX_ENGINE = engine
+    try:
+        return processing.read_file(str(path))
+    finally:
+        processing.XLSX_ENGINE = previous
+
+
+if __name__ == "__main__":
+    main()
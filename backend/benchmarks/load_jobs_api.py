@@ -0,0 +1,89 @@
+# Teste de carga das rotas autenticadas de jobs (GET /jobs/{id} e GET /jobs) com N requisições simultâneas.
+# Mede requisições/s e latência (p50/p95/p99). Precisa da API rodando e de httpx (pip install httpx).
+# Para comparar antes/depois, suba as duas versões em portas diferentes e passe as duas URLs:
+#   python -m benchmarks.load_jobs_api --target antes=http://localhost:8001 --target depois=http://localhost:8000
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+CSV_SAMPLE = "Nome,E-mail,Telefone\nJoão,joao@exemplo.com,(11) 98765-4321\n".encode("utf-8")
+
+
+async def _setup(client: httpx.AsyncClient, with_job: bool) -> tuple[dict, str | None]:
+    """Cria um usuário descartável e, se a rota pedir, um job para consultar. Retorna (headers, job_id)."""
+    r = await client.post(
+        "/auth/register", json={"email": f"load-{uuid.uuid4().hex[:12]}@exemplo.com", "password": "senha-carga"}
+    )
+    r.raise_for_status()
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    if not with_job:
+        return headers, None
+    r = await client.post("/jobs", files={"file": ("carga.csv", CSV_SAMPLE, "text/csv")}, headers=headers)
+    r.raise_for_status()
+    return headers, r.json()["id"]
+
+
+async def _run(base_url: str, concurrency: int, total: int, path: str) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        headers, job_id = await _setup(client, "{job_id}" in path)
+        url = path.format(job_id=job_id)
+        latencies: list[float] = []
+        errors = 0
+        remaining = total
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                r = await client.get(url, headers=headers)
+                latencies.append(time.perf_counter() - start)
+                if r.status_code >= 400:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": q[49] * 1000,
+        "p95_ms": q[94] * 1000,
+        "p99_ms": q[98] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Teste de carga das rotas de jobs")
+    parser.add_argument("--target", action="append", required=True, help="nome=url (pode repetir)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--path", default="/jobs/{job_id}", help="rota consultada ({job_id} é substituído)")
+    args = parser.parse_args()
+
+    print(f"{args.requests} requisições, concorrência {args.concurrency}, rota {args.path}")
+    for target in args.target:
+        name, _, url = target.partition("=")
+        try:
+            res = asyncio.run(_run(url or name, args.concurrency, args.requests, args.path))
+        except httpx.HTTPError as e:
+            # Ex.: a versão síncrona trava com o pool de conexões esgotado e as requisições estouram o timeout
+            print(f"{name:10s} falhou: {type(e).__name__} {e}")
+            continue
+        print(
+            f"{name:10s} {res['rps']:9.1f} req/s  p50 {res['p50_ms']:7.1f} ms  "
+            f"p95 {res['p95_ms']:7.1f} ms  p99 {res['p99_ms']:7.1f} ms  erros {res['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
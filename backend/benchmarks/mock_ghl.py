@@ -0,0 +1,141 @@
+# Servidor local que faz o papel da API de contatos (POST /contacts/batch) para testar app.delivery
+# sem rede: limite de requisições/s com 429 + Retry-After, erros 5xx aleatórios, latência configurável
+# e Idempotency-Key (lote repetido não conta duas vezes). GET /stats mostra o que chegou; POST /reset zera.
+# Comando (de dentro de backend/):
+#   python -m benchmarks.mock_ghl --port 8700 --rate 10 --error-rate 0.02 --latency-ms 50
+# e no .env: GHL_DELIVERY_ENABLED=true, GHL_API_URL=http://localhost:8700
+import argparse
+import asyncio
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import JSONResponse
+
+MAX_BATCH = 1000
+
+
+class _Settings:
+    rate = 10.0
+    burst = 10
+    error_rate = 0.0
+    latency_ms = 0.0
+    token = ""
+
+
+settings = _Settings()
+app = FastAPI(title="Mock da API de contatos")
+
+
+def _empty_stats() -> dict:
+    return {
+        "contacts": 0,
+        "batches": 0,
+        "replayed_batches": 0,
+        "rate_limited": 0,
+        "server_errors": 0,
+        "first_at": None,
+        "last_at": None,
+    }
+
+
+stats = _empty_stats()
+_seen_keys: set[str] = set()
+_emails: set[str] = set()
+_bucket = {"tokens": float(settings.burst), "updated": time.monotonic()}
+
+
+def _take_token() -> float:
+    """Token bucket do servidor: 0 se a requisição passa, senão segundos até o próximo token."""
+    if settings.rate <= 0:
+        return 0.0
+    now = time.monotonic()
+    _bucket["tokens"] = min(settings.burst, _bucket["tokens"] + (now - _bucket["updated"]) * settings.rate)
+    _bucket["updated"] = now
+    if _bucket["tokens"] >= 1:
+        _bucket["tokens"] -= 1
+        return 0.0
+    return (1 - _bucket["tokens"]) / settings.rate
+
+
+@app.post("/contacts/batch")
+async def contacts_batch(
+    request: Request,
+    authorization: str | None = Header(None),
+    idempotency_key: str | None = Header(None),
+):
+    if settings.token and authorization != f"Bearer {settings.token}":
+        return JSONResponse({"message": "Unauthorized"}, status_code=401)
+    wait = _take_token()
+    if wait:
+        stats["rate_limited"] += 1
+        return JSONResponse({"message": "Too Many Requests"}, status_code=429, headers={"Retry-After": f"{wait:.2f}"})
+    if settings.latency_ms:
+        await asyncio.sleep(settings.latency_ms / 1000 * random.uniform(0.5, 1.5))
+    if random.random() < settings.error_rate:
+        stats["server_errors"] += 1
+        return JSONResponse({"message": "Service Unavailable"}, status_code=503)
+    body = await request.json()
+    contacts = body.get("contacts")
+    if not isinstance(contacts, list) or not contacts:
+        return JSONResponse({"message": "contacts deve ser uma lista não vazia"}, status_code=422)
+    if len(contacts) > MAX_BATCH:
+        return JSONResponse({"message": f"no máximo {MAX_BATCH} contatos por lote"}, status_code=413)
+    if idempotency_key and idempotency_key in _seen_keys:
+        stats["replayed_batches"] += 1
+        return {"accepted": len(contacts), "replayed": True}
+    if idempotency_key:
+        _seen_keys.add(idempotency_key)
+    now = time.time()
+    stats["first_at"] = stats["first_at"] or now
+    stats["last_at"] = now
+    stats["contacts"] += len(contacts)
+    stats["batches"] += 1
+    _emails.update(c["email"] for c in contacts if c.get("email"))
+    return {"accepted": len(contacts), "replayed": False}
+
+
+@app.get("/stats")
+def get_stats():
+    elapsed = (stats["last_at"] - stats["first_at"]) if stats["first_at"] else 0
+    return {
+        **stats,
+        "distinct_emails": len(_emails),
+        "contacts_per_s": round(stats["contacts"] / elapsed, 1) if elapsed else None,
+    }
+
+
+@app.post("/reset")
+def reset():
+    stats.update(_empty_stats())
+    _seen_keys.clear()
+    _emails.clear()
+    return {"ok": True}
+
+
+def configure(rate: float, burst: int | None, error_rate: float, latency_ms: float, token: str) -> None:
+    settings.rate = rate
+    settings.burst = burst or max(int(rate), 1)
+    settings.error_rate = error_rate
+    settings.latency_ms = latency_ms
+    settings.token = token
+    _bucket["tokens"] = float(settings.burst)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mock local da API de contatos (lotes)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--rate", type=float, default=10, help="requisições/s antes de responder 429 (0 = sem limite)")
+    parser.add_argument("--burst", type=int, default=None, help="rajada permitida (padrão: igual a --rate)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de lotes respondidos com 503")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latência média de cada lote")
+    parser.add_argument("--token", default="", help="exige Authorization: Bearer <token>")
+    args = parser.parse_args()
+    configure(args.rate, args.burst, args.error_rate, args.latency_ms, args.token)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
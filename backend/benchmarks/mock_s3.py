@@ -0,0 +1,197 @@
+# Servidor local que faz o papel de um bucket S3 compatível (estilo MinIO, endereçamento por caminho) para
+# testar STORAGE_BACKEND=s3 sem rede: PutObject, GetObject com Range, HeadObject, CopyObject, DeleteObject
+# e multipart (create/upload part/complete/abort). Guarda tudo em memória e não confere assinatura.
+# GET /_stats mostra as operações recebidas (quantas leituras com Range, partes de multipart...); POST /_reset zera.
+# Comando (de dentro de backend/):
+#   python -m benchmarks.mock_s3 --port 9000
+# e no .env: STORAGE_BACKEND=s3, S3_BUCKET=flowbase, S3_ENDPOINT_URL=http://localhost:9000,
+# S3_ACCESS_KEY_ID=x, S3_SECRET_ACCESS_KEY=x
+import argparse
+import hashlib
+import time
+import uuid
+from collections import Counter
+from email.utils import formatdate
+from urllib.parse import unquote
+from xml.etree import ElementTree
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+
+_NS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+app = FastAPI(title="Mock de bucket S3")
+
+# (bucket, chave) -> (conteúdo, mtime, etag)
+_objects: dict[tuple[str, str], tuple[bytes, float, str]] = {}
+# upload_id -> {"bucket", "key", "parts": {número: bytes}}
+_uploads: dict[str, dict] = {}
+stats: Counter = Counter()
+
+
+def _xml(root: str, **fields) -> Response:
+    body = "".join(f"<{name}>{value}</{name}>" for name, value in fields.items())
+    return Response(
+        f'<?xml version="1.0" encoding="UTF-8"?><{root} xmlns="{_NS}">{body}</{root}>',
+        media_type="application/xml",
+    )
+
+
+def _error(status: int, code: str, message: str) -> Response:
+    body = f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code><Message>{message}</Message></Error>'
+    return Response(body, status_code=status, media_type="application/xml")
+
+
+def _put(bucket: str, key: str, data: bytes, etag: str | None = None) -> str:
+    etag = etag or f'"{hashlib.md5(data).hexdigest()}"'
+    _objects[(bucket, key)] = (data, time.time(), etag)
+    stats["bytes_in"] += len(data)
+    return etag
+
+
+def _decode_aws_chunked(data: bytes) -> bytes:
+    """Corpo em aws-chunked (clientes que mandam checksum no trailer): junta só os dados."""
+    out, pos = bytearray(), 0
+    while pos < len(data):
+        line_end = data.index(b"\r\n", pos)
+        size = int(data[pos:line_end].split(b";")[0], 16)
+        if size == 0:
+            break
+        out += data[line_end + 2 : line_end + 2 + size]
+        pos = line_end + 2 + size + 2
+    return bytes(out)
+
+
+async def _body(request: Request) -> bytes:
+    data = await request.body()
+    if "aws-chunked" in request.headers.get("content-encoding", ""):
+        data = _decode_aws_chunked(data)
+    return data
+
+
+def _object_headers(data: bytes, mtime: float, etag: str) -> dict:
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Content-Length": str(len(data)),
+    }
+
+
+@app.api_route("/{bucket}", methods=["PUT", "HEAD"])
+def bucket(bucket: str):
+    """CreateBucket/HeadBucket: qualquer bucket existe."""
+    return Response(status_code=200)
+
+
+@app.api_route("/{bucket}/{key:path}", methods=["GET", "HEAD", "PUT", "POST", "DELETE"])
+async def object_route(bucket: str, key: str, request: Request):
+    params = request.query_params
+    method = request.method
+
+    if method == "POST" and "uploads" in params:
+        stats["multipart_created"] += 1
+        upload_id = uuid.uuid4().hex
+        _uploads[upload_id] = {"bucket": bucket, "key": key, "parts": {}}
+        return _xml("InitiateMultipartUploadResult", Bucket=bucket, Key=key, UploadId=upload_id)
+
+    if "uploadId" in params:
+        upload = _uploads.get(params["uploadId"])
+        if upload is None:
+            return _error(404, "NoSuchUpload", "upload inexistente")
+        if method == "PUT":
+            stats["parts"] += 1
+            data = await _body(request)
+            upload["parts"][int(params["partNumber"])] = data
+            return Response(status_code=200, headers={"ETag": f'"{hashlib.md5(data).hexdigest()}"'})
+        if method == "DELETE":
+            stats["multipart_aborted"] += 1
+            del _uploads[params["uploadId"]]
+            return Response(status_code=204)
+        if method == "POST":
+            stats["multipart_completed"] += 1
+            root = ElementTree.fromstring(await request.body())
+            numbers = [int(el.text) for el in root.iter() if el.tag.endswith("PartNumber")]
+            data = b"".join(upload["parts"][n] for n in numbers)
+            etag = f'"{hashlib.md5(data).hexdigest()}-{len(numbers)}"'
+            _put(bucket, key, data, etag)
+            del _uploads[params["uploadId"]]
+            return _xml("CompleteMultipartUploadResult", Bucket=bucket, Key=key, ETag=etag.replace('"', "&quot;"))
+
+    if method == "PUT":
+        source = request.headers.get("x-amz-copy-source")
+        if source:
+            stats["copy"] += 1
+            src_bucket, _, src_key = unquote(source).lstrip("/").partition("/")
+            found = _objects.get((src_bucket, src_key))
+            if found is None:
+                return _error(404, "NoSuchKey", "origem da cópia inexistente")
+            etag = _put(bucket, key, found[0], found[2])
+            stats["bytes_in"] -= len(found[0])  # cópia no servidor: nada trafegou
+            return _xml(
+                "CopyObjectResult",
+                ETag=etag.replace('"', "&quot;"),
+                LastModified=time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+            )
+        stats["put"] += 1
+        etag = _put(bucket, key, await _body(request))
+        return Response(status_code=200, headers={"ETag": etag})
+
+    if method == "DELETE":
+        stats["delete"] += 1
+        _objects.pop((bucket, key), None)
+        return Response(status_code=204)
+
+    found = _objects.get((bucket, key))
+    if found is None:
+        stats["not_found"] += 1
+        return Response(status_code=404) if method == "HEAD" else _error(404, "NoSuchKey", "chave inexistente")
+    data, mtime, etag = found
+    headers = _object_headers(data, mtime, etag)
+    if method == "HEAD":
+        stats["head"] += 1
+        return Response(status_code=200, headers=headers)
+
+    byte_range = request.headers.get("range")
+    if not byte_range:
+        stats["get"] += 1
+        stats["bytes_out"] += len(data)
+        return Response(data, headers=headers, media_type="application/octet-stream")
+    stats["ranged_get"] += 1
+    first, _, last = byte_range.removeprefix("bytes=").partition("-")
+    if first:
+        start, end = int(first), min(int(last) if last else len(data) - 1, len(data) - 1)
+    else:
+        start, end = max(len(data) - int(last), 0), len(data) - 1
+    if start >= len(data):
+        return _error(416, "InvalidRange", "intervalo fora do objeto")
+    chunk = data[start : end + 1]
+    stats["bytes_out"] += len(chunk)
+    headers.update({"Content-Length": str(len(chunk)), "Content-Range": f"bytes {start}-{end}/{len(data)}"})
+    return Response(chunk, status_code=206, headers=headers, media_type="application/octet-stream")
+
+
+@app.get("/_stats")
+def get_stats():
+    return {**stats, "objects": len(_objects), "open_uploads": len(_uploads)}
+
+
+@app.post("/_reset")
+def reset():
+    _objects.clear()
+    _uploads.clear()
+    stats.clear()
+    return {"ok": True}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mock local de bucket S3 (em memória)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# Gerador de planilhas sintéticas para benchmark: colunas PT/EN tiradas de COLUMN_SYNONYMS,
+# telefones/emails bagunçados, duplicados e colunas extras sem mapeamento, em CSV ou XLSX.
+# Comando (de dentro de backend/): python -m benchmarks.synthetic --rows 100000 --format csv --lang pt out.csv
+import argparse
+import csv
+import random
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from openpyxl import Workbook
+
+from app.processing import COLUMN_SYNONYMS
+
+# Cabeçalho fixo por idioma (cada nome precisa existir em COLUMN_SYNONYMS); "mixed" sorteia entre todos
+HEADERS = {
+    "pt": {
+        "Full Name": "Nome",
+        "Company Name": "Empresa",
+        "Email": "E-mail",
+        "Phone": "Telefone",
+        "Additional Phone Numbers": "Telefones",
+        "Website": "Site",
+        "City": "Cidade",
+        "State": "UF",
+        "Tags": "Tags",
+        "Notes": "Observações",
+        "Source": "Origem",
+    },
+    "en": {
+        "Full Name": "Full Name",
+        "Company Name": "Company",
+        "Email": "Email",
+        "Phone": "Phone",
+        "Additional Phone Numbers": "Additional Phone Numbers",
+        "Website": "Website",
+        "City": "City",
+        "State": "State",
+        "Tags": "Tags",
+        "Notes": "Notes",
+        "Source": "Source",
+    },
+}
+for _headers in HEADERS.values():
+    assert all(COLUMN_SYNONYMS.get(h.lower()) == ghl for ghl, h in _headers.items()), _headers
+
+# Colunas que o mapeamento não reconhece (viram "Notes" na saída)
+EXTRA_COLUMNS = ["Cargo", "ID Interno", "Data Cadastro", "Score"]
+
+FIRST_NAMES = ["Ana", "João", "Maria", "José", "Luíza", "Pedro", "Carla", "Rafael", "Bruna", "Thiago"]
+LAST_NAMES = ["Silva", "Souza", "Oliveira", "Santos", "Pereira", "Lima", "Costa", "Gomes", "Ribeiro", "Almeida"]
+CITIES = [("São Paulo", "SP"), ("Rio de Janeiro", "RJ"), ("Curitiba", "PR"), ("Belo Horizonte", "MG"), ("Recife", "PE")]
+DOMAINS = ["gmail.com", "hotmail.com", "empresa.com.br", "outlook.com", "yahoo.com.br"]
+SOURCES = ["Facebook Ads", "Google Ads", "Indicação", "Site", ""]
+
+
+def _headers_for(lang: str, rnd: random.Random) -> dict:
+    if lang in HEADERS:
+        return HEADERS[lang]
+    by_ghl: dict[str, list[str]] = {}
+    for synonym, ghl in COLUMN_SYNONYMS.items():
+        by_ghl.setdefault(ghl, []).append(synonym)
+    # Capitalização e espaços variados, como em planilhas reais
+    styles = [str.title, str.upper, str.lower, lambda h: f" {h} "]
+    return {ghl: rnd.choice(styles)(rnd.choice(names)) for ghl, names in by_ghl.items() if ghl in HEADERS["pt"]}
+
+
+def _messy_phone(rnd: random.Random) -> str:
+    ddd = rnd.choice(["11", "21", "41", "31", "81"])
+    number = f"9{rnd.randint(1000, 9999)}{rnd.randint(1000, 9999)}"
+    kind = rnd.random()
+    if kind < 0.25:
+        return f"({ddd}) {number[:5]}-{number[5:]}"
+    if kind < 0.45:
+        return f"{ddd}{number}"
+    if kind < 0.60:
+        return f"+55 {ddd} {number[:5]}-{number[5:]}"
+    if kind < 0.70:
+        return f"0{ddd} {number[:5]} {number[5:]}"
+    if kind < 0.78:
+        return f"+1 202-555-{rnd.randint(1000, 9999)}"
+    if kind < 0.86:
+        return f"{ddd}{number}; ({ddd}) {rnd.randint(3000, 3999)}-{rnd.randint(1000, 9999)}"
+    if kind < 0.93:
+        return rnd.choice(["", "sem telefone", "0000"])
+    return number[:5]  # curto demais: inválido
+
+
+def _messy_email(rnd: random.Random, first: str, last: str, i: int) -> str:
+    user = f"{first}.{last}{i}".lower()
+    domain = rnd.choice(DOMAINS)
+    kind = rnd.random()
+    if kind < 0.55:
+        return f"{user}@{domain}"
+    if kind < 0.70:
+        return f"  {user.upper()}@{domain.upper()} "
+    if kind < 0.80:
+        return f"{user}@{domain}; {user}.alt@{rnd.choice(DOMAINS)}"
+    if kind < 0.88:
+        return f"{user}@{domain}, {user}@{domain}"
+    if kind < 0.95:
+        return ""
+    return f"{user} arroba {domain}"  # inválido
+
+
+def iter_rows(rows: int, seed: int = 42, dup_rate: float = 0.05):
+    """Gera as linhas (dicts por coluna GHL + extras); dup_rate das linhas repete um contato anterior."""
+    rnd = random.Random(seed)
+    emitted: list[dict] = []
+    for i in range(rows):
+        if emitted and rnd.random() < dup_rate:
+            # Duplicado: mesmo contato, às vezes com caixa diferente no email
+            row = dict(rnd.choice(emitted))
+            row["Email"] = row["Email"].upper() if rnd.random() < 0.5 else row["Email"]
+            yield row
+            continue
+        first, last = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+        city, uf = rnd.choice(CITIES)
+        row = {
+            "Full Name": f"{first} {last}",
+            "Company Name": rnd.choice(["", f"{last} Ltda", f"{last} & Cia", f"{first} ME"]),
+            "Email": _messy_email(rnd, first, last, i),
+            "Phone": _messy_phone(rnd),
+            "Additional Phone Numbers": _messy_phone(rnd) if rnd.random() < 0.2 else "",
+            "Website": rnd.choice(["", f"https://{last.lower()}.com.br", f"www.{last.lower()}{i % 100}.com"]),
+            "City": city if rnd.random() < 0.9 else "",
+            "State": uf,
+            "Tags": rnd.choice(["", "lead", "cliente, vip", "frio"]),
+            "Notes": rnd.choice(["", "Ligar depois", "Pediu orçamento"]),
+            "Source": rnd.choice(SOURCES),
+            "Cargo": rnd.choice(["Diretor", "Gerente", "Analista", ""]),
+            "ID Interno": str(100000 + i),
+            "Data Cadastro": f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            "Score": str(rnd.randint(0, 100)),
+        }
+        if len(emitted) < 10000:
+            emitted.append(row)
+        yield row
+
+
+def make_dataset(path: Path, rows: int, fmt: str = "csv", lang: str = "pt", seed: int = 42, dup_rate: float = 0.05) -> Path:
+    """Grava a planilha sintética em path (CSV com ';' ou XLSX) e devolve o caminho."""
+    rnd = random.Random(seed)
+    headers = _headers_for(lang, rnd)
+    columns = list(headers) + EXTRA_COLUMNS
+    header_row = [headers[c] for c in headers] + EXTRA_COLUMNS
+    path = Path(path)
+    if fmt == "csv":
+        # Separador ';' como nos exports de Excel em pt-BR
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(header_row)
+            for row in iter_rows(rows, seed, dup_rate):
+                writer.writerow([row[c] for c in columns])
+    elif fmt == "xlsx":
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(header_row)
+        for row in iter_rows(rows, seed, dup_rate):
+            values = [row[c] for c in columns]
+            # Score numérico no XLSX (tipo misto, como planilhas reais)
+            values[-1] = int(values[-1])
+            ws.append(values)
+        wb.save(path)
+    else:
+        raise ValueError(f"Formato não suportado: {fmt}")
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Gera planilha sintética para benchmark")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--format", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("--lang", choices=["pt", "en", "mixed"], default="pt")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dup-rate", type=float, default=0.05)
+    args = parser.parse_args()
+    make_dataset(args.output, args.rows, args.format, args.lang, args.seed, args.dup_rate)
+    print(f"{args.output}: {args.rows} linhas ({args.format}, {args.lang})")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,39 @@
  * Proxy para o backend FlowBase (evita CORS e expõe o backend apenas server-side).
  * O frontend chama /api/proxy/auth/register, /api/proxy/jobs, etc.
  * Esta rota encaminha para API_URL (variável de ambiente no Vercel).
+ * No GET as respostas saem em streaming com os headers de Range, ETag e Content-Encoding do backend,
+ * para downloads retomáveis, 304 e variantes pré-comprimidas funcionarem através do proxy.
  */
 
+import { request as httpRequest, IncomingMessage } from "node:http";
+import { request as httpsRequest } from "node:https";
+import { Readable } from "node:stream";
 import { NextRequest, NextResponse } from "next/server";
 
+// node:http/https em vez de fetch no GET: o fetch do Node descomprime o corpo sozinho, e o proxy
+// precisa repassar os bytes exatamente como o backend mandou (variantes .gz/.zst, Range, ETag)
+export const runtime = "nodejs";
+
 const API_URL = process.env.API_URL || "https://flowbase-y89b.onrender.com";
 
+// Headers do navegador repassados ao backend no GET: download com Range/retomada, requisições
+// condicionais (304) e escolha da variante comprimida
+const FORWARDED_REQUEST_HEADERS = ["range", "if-range", "if-none-match", "if-modified-since", "accept-encoding"];
+
+// Headers da resposta do backend devolvidos ao navegador
+const FORWARDED_RESPONSE_HEADERS = [
+  "content-type",
+  "content-disposition",
+  "content-length",
+  "content-encoding",
+  "content-range",
+  "accept-ranges",
+  "etag",
+  "last-modified",
+  "vary",
+  "cache-control",
+];
+
 function getBackendUrl(path: string[], request: NextRequest): string {
   const pathStr = path.join("/");
   const search = request.nextUrl.searchParams.toString();
@@ -30,6 +57,16 @@ function buildHeaders(request: NextRequest, skipContentType = false): Headers {
   return headers;
 }
 
+/** GET no backend sem decodificar o corpo; resolve assim que os headers da resposta chegam. */
+function rawGet(url: string, headers: Headers, signal: AbortSignal): Promise<IncomingMessage> {
+  const send = url.startsWith("https:") ? httpsRequest : httpRequest;
+  return new Promise((resolve, reject) => {
+    const req = send(url, { method: "GET", headers: Object.fromEntries(headers), signal }, resolve);
+    req.on("error", reject);
+    req.end();
+  });
+}
+
 export async function GET(
   request: NextRequest,
   { params }: { params: Promise<{ path: string[] }> }
@@ -37,29 +74,42 @@ export async function GET(
   const { path } = await params;
   const url = getBackendUrl(path, request);
   const headers = buildHeaders(request);
+  for (const name of FORWARDED_REQUEST_HEADERS) {
+    const value = request.headers.get(name);
+    if (value) headers.set(name, value);
+  }
+  let res: IncomingMessage;
   try {
-    const res = await fetch(url, { method: "GET", headers, cache: "no-store" });
-    const data = await res.text();
-    const contentType = res.headers.get("content-type") || "";
-    try {
-      if (contentType.includes("application/json")) {
-        const json = JSON.parse(data);
-        return NextResponse.json(json, { status: res.status });
-      }
-      const nextRes = new NextResponse(data, { status: res.status });
-      nextRes.headers.set("Content-Type", contentType);
-      const disposition = res.headers.get("content-disposition");
-      if (disposition) nextRes.headers.set("Content-Disposition", disposition);
-      return nextRes;
-    } catch {
-      return new NextResponse(data, { status: res.status });
-    }
+    res = await rawGet(url, headers, request.signal);
   } catch (e) {
     return NextResponse.json(
       { detail: String(e) },
       { status: 502 }
     );
   }
+  const status = res.statusCode || 502;
+  const outHeaders = new Headers();
+  for (const name of FORWARDED_RESPONSE_HEADERS) {
+    const value = res.headers[name];
+    if (value !== undefined) outHeaders.set(name, Array.isArray(value) ? value.join(", ") : value);
+  }
+  const contentType = outHeaders.get("content-type") || "";
+  if (contentType.includes("text/event-stream")) {
+    // SSE (status do job): sem buffer no proxy nem no nginx
+    outHeaders.set("Cache-Control", "no-cache");
+    outHeaders.set("X-Accel-Buffering", "no");
+  } else {
+    // ETag, Range e Content-Encoding valem para estes bytes: o Next não pode recomprimir a resposta
+    const cacheControl = outHeaders.get("cache-control");
+    outHeaders.set("Cache-Control", cacheControl ? `${cacheControl}, no-transform` : "no-transform");
+  }
+  // 204/304 (e 1xx) não têm corpo; o resto sai em streaming, sem bufferizar o arquivo no proxy
+  if (status === 204 || status === 304) {
+    res.resume();
+    return new Response(null, { status, headers: outHeaders });
+  }
+  const body = Readable.toWeb(res) as unknown as ReadableStream<Uint8Array>;
+  return new Response(body, { status, headers: outHeaders });
 }
 
 export async function POST(
@@ -6,6 +6,7 @@ import Link from "next/link";
 import { useAuth } from "@/components/AuthProvider";
 import {
   apiJobsList,
+  apiJobEvents,
   apiJobGet,
   apiJobUpload,
   apiJobPreview,
@@ -45,21 +46,38 @@ export default function DashboardPage() {
 
   useEffect(() => {
     if (!currentJobId || !polling) return;
-    const t = setInterval(async () => {
-      try {
-        const job = await apiJobGet(currentJobId);
-        setCurrentStatus(job.status);
-        if (job.status === "done" || job.status === "failed") {
-          setPolling(false);
-          setCurrentJobId(null);
-          loadJobs();
-        }
-      } catch {
-        setPolling(false);
-        setCurrentJobId(null);
-      }
-    }, 2000);
-    return () => clearInterval(t);
+    const jobId = currentJobId;
+    const controller = new AbortController();
+    let fallback: ReturnType<typeof setInterval> | null = null;
+
+    function finish() {
+      setPolling(false);
+      setCurrentJobId(null);
+      loadJobs();
+    }
+
+    // Preferência: stream SSE com as transições de status; se cair, volta para o polling
+    apiJobEvents(jobId, (event) => setCurrentStatus(event.status), controller.signal)
+      .then(finish)
+      .catch(() => {
+        if (controller.signal.aborted) return;
+        fallback = setInterval(async () => {
+          try {
+            const job = await apiJobGet(jobId);
+            setCurrentStatus(job.status);
+            if (job.status === "done" || job.status === "failed") {
+              finish();
+            }
+          } catch {
+            setPolling(false);
+            setCurrentJobId(null);
+          }
+        }, 2000);
+      });
+    return () => {
+      controller.abort();
+      if (fallback) clearInterval(fallback);
+    };
   }, [currentJobId, polling, loadJobs]);
 
   async function handleUpload(e: React.ChangeEvent<HTMLInputElement>) {
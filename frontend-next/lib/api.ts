@@ -44,9 +44,10 @@ export async function apiLogin(email: string, password: string) {
   return data as { access_token: string; token_type: string; user_id: string };
 }
 
-export async function apiJobsList(params?: { limit?: number; offset?: number; status?: string }) {
+export async function apiJobsList(params?: { limit?: number; offset?: number; cursor?: string; status?: string }) {
   const q = new URLSearchParams();
   if (params?.limit) q.set("limit", String(params.limit));
+  if (params?.cursor) q.set("cursor", params.cursor);
   if (params?.offset) q.set("offset", String(params.offset));
   if (params?.status) q.set("status", params.status);
   const query = q.toString();
@@ -56,7 +57,7 @@ export async function apiJobsList(params?: { limit?: number; offset?: number; st
   if (!res.ok) {
     throw new Error(data.detail || `Erro ${res.status}`);
   }
-  return data as { total: number; jobs: Array<{ id: string; status: string; filename_original: string; created_at: string; error_message?: string }> };
+  return data as { total: number | null; next_cursor: string | null; jobs: Array<{ id: string; status: string; filename_original: string; created_at: string; error_message?: string }> };
 }
 
 export async function apiJobGet(id: string) {
@@ -88,6 +89,48 @@ export async function apiJobUpload(file: File) {
   return data as { id: string; status: string; filename_original: string; created_at: string };
 }
 
+/**
+ * Acompanha o status do job via Server-Sent Events (GET /jobs/{id}/events).
+ * Chama onStatus a cada transição; a promise termina quando o job chega em done/failed
+ * (ou rejeita se o stream cair, para o chamador voltar ao polling).
+ */
+export async function apiJobEvents(
+  id: string,
+  onStatus: (event: { job_id: string; status: string; error_message?: string | null }) => void,
+  signal?: AbortSignal
+) {
+  const res = await fetch(`${PROXY}/jobs/${id}/events`, { headers: getAuthHeaders(), cache: "no-store", signal });
+  if (!res.ok || !res.body) {
+    throw new Error(`Erro ${res.status}`);
+  }
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let sep: number;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const block = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      const data = block
+        .split("\n")
+        .filter((line) => line.startsWith("data:"))
+        .map((line) => line.slice(5).trim())
+        .join("");
+      if (!data) continue;
+      const event = JSON.parse(data);
+      onStatus(event);
+      if (event.status === "done" || event.status === "failed") {
+        reader.cancel().catch(() => {});
+        return;
+      }
+    }
+  }
+  throw new Error("Stream de eventos encerrado antes do fim do job");
+}
+
 export async function apiJobPreview(id: string) {
   const res = await fetch(`${PROXY}/jobs/${id}/preview`, { headers: getAuthHeaders(), cache: "no-store" });
   if (!res.ok) {